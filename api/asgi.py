@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api.settings')
 
+# Bajo ASGI cada petición puede ejecutarse en un hilo distinto, por lo que las conexiones
+# persistentes por hilo no se reutilizan. Por defecto se usa el pool acotado de api/mysql_pool;
+# exportar DB_POOL=0 para volver al backend MySQL estándar.
+os.environ.setdefault('DB_POOL', '1')
+
 application = get_asgi_application()
@@ -0,0 +1,114 @@
+import csv
+import json
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+# Filas leídas por consulta al exportar
+TAMANO_CHUNK_EXPORTACION = 2000
+FORMATOS_EXPORTACION = ('csv', 'ndjson')
+CONTENT_TYPE_EXPORTACION = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+
+class _RendererExportacion(BaseRenderer):
+    """
+    DRF usa ?format= para elegir el renderer, así que las acciones de exportación declaran
+    un renderer por formato. Los datos se escriben con StreamingHttpResponse; estos renderers
+    solo se usan para las respuestas de error, que se envían como JSON.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False).encode(self.charset)
+
+
+class CSVExportRenderer(_RendererExportacion):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONExportRenderer(_RendererExportacion):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+RENDERERS_EXPORTACION = [JSONRenderer, CSVExportRenderer, NDJSONExportRenderer]
+
+
+class _Eco:
+    """Buffer mínimo para csv.writer: retorna la línea en lugar de guardarla"""
+
+    def write(self, valor):
+        return valor
+
+
+def _filas_por_lotes(queryset, lookups, tamano_chunk):
+    """
+    Recorrer el queryset por lotes de tamano_chunk filas ordenados por pk (keyset: pk > último).
+    Cada lote es una consulta independiente leída con values_list().iterator(), así la memoria
+    se mantiene acotada incluso con drivers que cargan el resultado completo de cada consulta
+    (como PyMySQL) y no se mantiene una transacción abierta durante toda la descarga.
+    """
+    ultimo = None
+    base = queryset.order_by('pk').values_list('pk', *lookups)
+    while True:
+        lote = base if ultimo is None else base.filter(pk__gt=ultimo)
+        cantidad = 0
+        for fila in lote[:tamano_chunk].iterator(chunk_size=tamano_chunk):
+            ultimo = fila[0]
+            cantidad += 1
+            yield fila[1:]
+        if cantidad < tamano_chunk:
+            return
+
+
+def _lineas_csv(columnas, filas):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(columnas)
+    for fila in filas:
+        yield escritor.writerow(fila)
+
+
+def _lineas_ndjson(columnas, filas):
+    for fila in filas:
+        yield json.dumps(dict(zip(columnas, fila)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def _agrupar(lineas, lineas_por_bloque=500):
+    """Enviar bloques de varias líneas en lugar de una escritura por fila"""
+    bloque = []
+    for linea in lineas:
+        bloque.append(linea)
+        if len(bloque) >= lineas_por_bloque:
+            yield ''.join(bloque)
+            bloque = []
+    if bloque:
+        yield ''.join(bloque)
+
+
+def formato_exportacion(request):
+    """Formato pedido en ?format= (csv por defecto), o None si no es válido"""
+    formato = request.query_params.get('format', 'csv')
+    return formato if formato in FORMATOS_EXPORTACION else None
+
+
+def respuesta_exportacion(queryset, campos, nombre, formato, tamano_chunk=TAMANO_CHUNK_EXPORTACION):
+    """
+    StreamingHttpResponse con el queryset exportado como CSV o NDJSON (una fila JSON por línea).
+    `campos` es una lista de (columna, lookup) en el orden de salida, por ejemplo
+    [('producto', 'inventario_id__nombre_producto')]. Las filas salen ordenadas por id.
+    """
+    columnas = [columna for columna, _ in campos]
+    filas = _filas_por_lotes(queryset, [lookup for _, lookup in campos], tamano_chunk)
+    lineas = _lineas_csv(columnas, filas) if formato == 'csv' else _lineas_ndjson(columnas, filas)
+
+    response = StreamingHttpResponse(_agrupar(lineas), content_type=CONTENT_TYPE_EXPORTACION[formato])
+    marca = datetime.now().strftime('%Y%m%d_%H%M%S')
+    response['Content-Disposition'] = f'attachment; filename="{nombre}_{marca}.{formato}"'
+    return response
@@ -0,0 +1,142 @@
+"""
+Backend MySQL con un pool acotado de conexiones PyMySQL.
+
+Pensado para el punto de entrada ASGI (api/asgi.py): allí cada petición síncrona puede
+ejecutarse en un hilo distinto, por lo que las conexiones persistentes por hilo
+(CONN_MAX_AGE > 0) no se reutilizan y quedan abiertas. Con este backend Django "cierra"
+la conexión al terminar cada petición (CONN_MAX_AGE = 0) y esta vuelve al pool,
+que limita el total de conexiones abiertas y verifica cada una antes de entregarla.
+
+Configuración en DATABASES['default']['POOL']:
+    MAX_CONEXIONES   conexiones abiertas como máximo (en uso + libres)
+    TIMEOUT          segundos de espera por una conexión libre antes de fallar
+    MAX_INACTIVIDAD  segundos que una conexión puede estar libre antes de descartarla
+"""
+import queue
+import threading
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.mysql.base import Database
+from django.db.backends.mysql.base import DatabaseWrapper as MySQLDatabaseWrapper
+
+
+class PoolConexiones:
+    """Pool LIFO de conexiones acotado por un semáforo"""
+
+    def __init__(self, max_conexiones=10, timeout=10, max_inactividad=300):
+        if max_conexiones < 1:
+            raise ImproperlyConfigured("POOL['MAX_CONEXIONES'] debe ser al menos 1.")
+        self._libres = queue.LifoQueue()
+        self._cupos = threading.BoundedSemaphore(max_conexiones)
+        self.max_conexiones = max_conexiones
+        self.timeout = timeout
+        self.max_inactividad = max_inactividad
+        self.creadas = 0
+        self.reutilizadas = 0
+        self.descartadas = 0
+
+    def obtener(self, crear_conexion):
+        """Entregar una conexión libre verificada, o crear una nueva con crear_conexion() si hay cupo"""
+        if not self._cupos.acquire(timeout=self.timeout):
+            raise Database.OperationalError(
+                f"No hay conexiones libres en el pool después de {self.timeout} segundos "
+                f"(máximo {self.max_conexiones})."
+            )
+        try:
+            while True:
+                try:
+                    conexion, liberada_en = self._libres.get_nowait()
+                except queue.Empty:
+                    break
+                if time.monotonic() - liberada_en > self.max_inactividad:
+                    self._cerrar(conexion)
+                    continue
+                try:
+                    # Verificar que la conexión siga viva (el servidor pudo cerrarla por wait_timeout)
+                    conexion.ping(reconnect=False)
+                except Exception:
+                    self._cerrar(conexion)
+                    continue
+                self.reutilizadas += 1
+                return conexion
+
+            conexion = crear_conexion()
+            self.creadas += 1
+            return conexion
+        except BaseException:
+            self._cupos.release()
+            raise
+
+    def devolver(self, conexion):
+        self._libres.put((conexion, time.monotonic()))
+        self._cupos.release()
+
+    def descartar(self, conexion):
+        self._cerrar(conexion)
+        self._cupos.release()
+
+    def cerrar_libres(self):
+        while True:
+            try:
+                conexion, _ = self._libres.get_nowait()
+            except queue.Empty:
+                return
+            self._cerrar(conexion)
+
+    def _cerrar(self, conexion):
+        self.descartadas += 1
+        try:
+            conexion.close()
+        except Exception:
+            pass
+
+    def estadisticas(self):
+        return {
+            'max_conexiones': self.max_conexiones,
+            'libres': self._libres.qsize(),
+            'creadas': self.creadas,
+            'reutilizadas': self.reutilizadas,
+            'descartadas': self.descartadas,
+        }
+
+
+class DatabaseWrapper(MySQLDatabaseWrapper):
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    @property
+    def pool(self):
+        with self._pools_lock:
+            if self.alias not in self._pools:
+                opciones = self.settings_dict.get('POOL') or {}
+                self._pools[self.alias] = PoolConexiones(
+                    max_conexiones=opciones.get('MAX_CONEXIONES', 10),
+                    timeout=opciones.get('TIMEOUT', 10),
+                    max_inactividad=opciones.get('MAX_INACTIVIDAD', 300),
+                )
+            return self._pools[self.alias]
+
+    def get_new_connection(self, conn_params):
+        if self.settings_dict['CONN_MAX_AGE'] != 0:
+            raise ImproperlyConfigured(
+                "El backend con pool requiere CONN_MAX_AGE = 0: la conexión vuelve al pool al terminar cada petición."
+            )
+        return self.pool.obtener(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+
+    def _close(self):
+        if self.connection is None:
+            return
+        conexion = self.connection
+        if self.errors_occurred:
+            # No devolver al pool una conexión que pudo quedar en mal estado
+            self.pool.descartar(conexion)
+            return
+        try:
+            if self.in_atomic_block or not self.autocommit:
+                conexion.rollback()
+                conexion.autocommit(self.settings_dict['AUTOCOMMIT'])
+        except Exception:
+            self.pool.descartar(conexion)
+            return
+        self.pool.devolver(conexion)
@@ -0,0 +1,53 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+def _config_paginacion():
+    return getattr(settings, 'PAGINACION_CURSOR', {})
+
+
+class CursorPaginationOpcional(CursorPagination):
+    """
+    Paginación por cursor (keyset) para los listados de la API.
+
+    Es opcional para mantener compatibilidad con el frontend: mientras
+    PAGINACION_CURSOR['PAGINAR_SIEMPRE'] sea False, solo se pagina cuando la petición
+    incluye ?page_size= o ?cursor=; en caso contrario se retorna la lista completa como antes.
+
+    Cada vista define `cursor_ordering` con un orden estable que termine en una columna
+    única (por ejemplo ('-fecha', '-id')). En modo paginado ese orden reemplaza a ?ordering=.
+
+    Limitación de CursorPagination de DRF: la posición del cursor se arma solo con el primer
+    campo del orden; los demás solo fijan el ORDER BY. Las filas que empatan en el primer campo
+    se saltan con un OFFSET dentro del grupo, así que ese campo debe ser único o casi único
+    (un timestamp o el id). Un campo con muchos empates (un mes, una fecha sin hora) degrada
+    cada página a un OFFSET del tamaño del grupo: en esos casos usar el id como primer campo.
+    """
+    page_size_query_param = 'page_size'
+    ordering = ('-id',)
+
+    def __init__(self):
+        config = _config_paginacion()
+        self.page_size = config.get('PAGE_SIZE', 50)
+        self.max_page_size = config.get('MAX_PAGE_SIZE', 500)
+
+    def paginacion_solicitada(self, request):
+        if _config_paginacion().get('PAGINAR_SIEMPRE', False):
+            return True
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.paginacion_solicitada(request):
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        return tuple(getattr(view, 'cursor_ordering', self.ordering))
+
+
+class CursorPaginationObligatoria(CursorPaginationOpcional):
+    """Paginación por cursor siempre activa, para tablas que no se pueden listar completas"""
+
+    def paginacion_solicitada(self, request):
+        return True
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 import pymysql
 
@@ -48,6 +49,7 @@ INSTALLED_APPS = [
     'inventario',
     'sistema',
     'proveedores',
+    'ventas',
 ]
 
 MIDDLEWARE = [
@@ -59,6 +61,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'sistema.middleware.AuditoriaMiddleware',
 ]
 
 ROOT_URLCONF = 'api.urls'
@@ -84,14 +87,18 @@ WSGI_APPLICATION = 'api.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Las variables de entorno DB_* permiten apuntar a otra instancia (por ejemplo un MySQL/MariaDB local).
+# DB_POOL=1 activa el backend con pool acotado de conexiones (api/mysql_pool), que api/asgi.py usa por defecto.
+DB_USAR_POOL = os.environ.get('DB_POOL', '0') == '1'
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'monkeycoffee_app',
-        'USER': 'admin',
-        'PASSWORD': 'monkeycoffeedb',
-        'HOST': 'monkeycoffeedb.c74euucg2tgd.us-east-1.rds.amazonaws.com',
-        'PORT': '3306',
+        'ENGINE': 'api.mysql_pool' if DB_USAR_POOL else 'django.db.backends.mysql',
+        'NAME': os.environ.get('DB_NAME', 'monkeycoffee_app'),
+        'USER': os.environ.get('DB_USER', 'admin'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', 'monkeycoffeedb'),
+        'HOST': os.environ.get('DB_HOST', 'monkeycoffeedb.c74euucg2tgd.us-east-1.rds.amazonaws.com'),
+        'PORT': os.environ.get('DB_PORT', '3306'),
         'OPTIONS': {
             'charset': 'utf8mb4',
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
@@ -99,8 +106,18 @@ DATABASES = {
             'read_timeout': 30,
             'write_timeout': 30,
         },
-        'CONN_MAX_AGE': 0,  # Desactivar conexiones persistentes para evitar problemas
+        # Conexiones persistentes: se reutilizan entre peticiones durante DB_CONN_MAX_AGE segundos
+        # y CONN_HEALTH_CHECKS verifica que sigan vivas antes de reutilizarlas (evita errores
+        # "MySQL server has gone away"). Con el pool la conexión vuelve al pool al terminar
+        # cada petición, por lo que CONN_MAX_AGE debe ser 0.
+        'CONN_MAX_AGE': 0 if DB_USAR_POOL else int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
         'AUTOCOMMIT': True,
+        'POOL': {
+            'MAX_CONEXIONES': int(os.environ.get('DB_POOL_MAX_CONEXIONES', '10')),
+            'TIMEOUT': int(os.environ.get('DB_POOL_TIMEOUT', '10')),
+            'MAX_INACTIVIDAD': int(os.environ.get('DB_POOL_MAX_INACTIVIDAD', '300')),
+        },
     }
 }
 
@@ -175,4 +192,57 @@ CORS_ALLOW_HEADERS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.CursorPaginationOpcional',
+}
+
+# Paginación por cursor de los listados (ver api/pagination.py).
+# Con PAGINAR_SIEMPRE en False solo se pagina cuando el cliente envía ?page_size= o ?cursor=,
+# lo que permite migrar el frontend página por página antes de activarla para todos.
+PAGINACION_CURSOR = {
+    'PAGINAR_SIEMPRE': False,
+    'PAGE_SIZE': 50,
+    'MAX_PAGE_SIZE': 500,
+}
+
+# Motor de alertas de inventario (inventario/alertas.py)
+ALERTAS_INVENTARIO = {
+    'DIAS_POR_VENCER': 30,
+    'FACTOR_STOCK_CRITICO': 0.5,
+    'TAMANO_LOTE': 1000,
+}
+
+# Reportes generados en el servidor (sistema/reportes.py). Los archivos se guardan en
+# DIRECTORIO y se generan en un pool de MAX_WORKERS hilos por proceso
+REPORTES = {
+    'DIRECTORIO': os.environ.get('REPORTES_DIR', str(BASE_DIR / 'reportes_generados')),
+    'MAX_WORKERS': int(os.environ.get('REPORTES_MAX_WORKERS', 2)),
+    'SINCRONO': False,
+}
+
+# Auditoría de cambios en logs_actividad (sistema/auditoria.py). Los registros se escriben
+# en segundo plano en lotes; si la cola llega a MAX_COLA los nuevos se descartan y se cuentan
+AUDITORIA = {
+    'ACTIVA': os.environ.get('AUDITORIA_ACTIVA', '1') == '1',
+    'MODELOS': [
+        'empleado.Empleado',
+        'empleado.Asistencia',
+        'empleado.Turno',
+        'empleado.Solicitudes',
+        'empleado.Tareas',
+        'inventario.Inventario',
+        'proveedores.Proveedor',
+        'proveedores.OrdenCompra',
+        'ventas.Venta',
+    ],
+    'MAX_COLA': 10000,
+    'TAMANO_LOTE': 500,
+    'INTERVALO_SEGUNDOS': 1.0,
+    'SINCRONO': False,
+}
+
+# Caché en memoria (por proceso) de RUT normalizado -> empleado usada por las vistas
+# que filtran según el header X-Empleado-Rut
+EMPLEADO_RUT_CACHE = {
+    'MAX_ENTRADAS': 2048,
+    'TTL_SEGUNDOS': 300,
 }
@@ -22,4 +22,6 @@ urlpatterns = [
     path('api/', include('empleado.urls')),
     path('api/', include('inventario.urls')),
     path('api/', include('proveedores.urls')),
+    path('api/', include('ventas.urls')),
+    path('api/', include('sistema.urls')),
 ]
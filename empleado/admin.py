@@ -1,4 +1,5 @@
 from django.contrib import admin
-from .models import Empleado
+from .models import AsistenciaResumenMensual, Empleado
 
-admin.site.register(Empleado)
\ No newline at end of file
+admin.site.register(Empleado)
+admin.site.register(AsistenciaResumenMensual)
\ No newline at end of file
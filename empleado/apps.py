@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class EmpleadosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'empleado'
+
+    def ready(self):
+        # Registrar las señales de la caché de RUT, la jornada y el resumen mensual de asistencias
+        from . import signals  # noqa: F401
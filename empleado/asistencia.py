@@ -0,0 +1,391 @@
+import csv
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.db import OperationalError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .horarios import CAMPOS_JORNADA, IndiceHorarios, aplicar_horario, fecha_jornada
+from .models import Asistencia, Empleado
+from .resumen import programar_resumen_mensual
+from .utils import normalizar_rut
+
+
+# Marcas del mismo empleado a menos de esta distancia de la entrada se consideran repetidas
+VENTANA_MARCA_DUPLICADA = timedelta(minutes=2)
+TIPOS_MARCA = ('entrada', 'salida')
+TIPOS_DISPOSITIVO = {valor for valor, _ in Asistencia.TIPO_ENTRADA_CHOICES}
+CAMPOS_MARCA = [
+    'hora_entrada', 'hora_salida', 'tipo_entrada', 'tipo_salida',
+    'ubicacion_entrada', 'ubicacion_salida', 'horas_trabajadas',
+]
+TAMANO_LOTE_ASISTENCIAS = 500
+# Máximo de marcas aceptadas por petición en /punches/bulk/
+MAX_MARCAS_POR_LOTE = 5000
+# Marcas procesadas por transacción al importar archivos de relojes biométricos
+TAMANO_CHUNK_IMPORTACION = 2000
+# Errores de línea que se reportan con detalle; el resto solo se cuenta
+MAX_ERRORES_REPORTADOS = 100
+# Intentos de un lote de marcas cuando InnoDB lo elige como víctima de un deadlock
+MAX_INTENTOS_MARCAS = 3
+# Código de MySQL "Deadlock found when trying to get lock": la transacción ya fue revertida
+ER_LOCK_DEADLOCK = 1213
+# Formatos de fecha/hora aceptados además de ISO 8601 (exportaciones de relojes)
+FORMATOS_MARCA_HORA = ('%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d-%m-%Y %H:%M:%S', '%d-%m-%Y %H:%M')
+# Valores de la columna de estado/tipo de los relojes (0 = entrada y 1 = salida en ZKTeco)
+TIPOS_MARCA_ARCHIVO = {
+    '0': 'entrada', '1': 'salida',
+    'i': 'entrada', 'o': 'salida',
+    'in': 'entrada', 'out': 'salida',
+    'entrada': 'entrada', 'salida': 'salida',
+}
+COLUMNAS_MARCA_ARCHIVO = {
+    'rut': 'rut', 'timestamp': 'timestamp', 'fecha_hora': 'timestamp',
+    'fecha': 'fecha', 'hora': 'hora', 'dispositivo': 'dispositivo',
+    'tipo': 'tipo', 'estado': 'tipo',
+}
+
+
+def parsear_marca_hora(valor):
+    """
+    Convertir el timestamp de una marca (ISO 8601 o FORMATOS_MARCA_HORA) a datetime con zona
+    horaria. Las horas sin zona se interpretan como hora local (TIME_ZONE), igual que en
+    AsistenciaSerializer.
+    """
+    if isinstance(valor, datetime):
+        marca = valor
+    else:
+        texto = str(valor).strip()
+        try:
+            marca = datetime.fromisoformat(texto)
+        except ValueError:
+            for formato in FORMATOS_MARCA_HORA:
+                try:
+                    marca = datetime.strptime(texto, formato)
+                    break
+                except ValueError:
+                    continue
+            else:
+                raise
+    if timezone.is_naive(marca):
+        marca = timezone.make_aware(marca)
+    return marca
+
+
+def resolver_ruts(ruts):
+    """
+    Resolver muchos RUT (con o sin formato) en una sola consulta sobre rut_normalizado.
+    Retorna {rut_normalizado: (rut, activo)}.
+    """
+    normalizados = {normalizar_rut(rut) for rut in ruts} - {None}
+    return {
+        fila['rut_normalizado']: (fila['rut'], fila['activo'])
+        for fila in Empleado.objects.filter(rut_normalizado__in=normalizados).values('rut', 'rut_normalizado', 'activo')
+    }
+
+
+def calcular_horas_trabajadas(hora_entrada, hora_salida):
+    if not hora_entrada or not hora_salida or hora_salida <= hora_entrada:
+        return None
+    return Decimal(str(round((hora_salida - hora_entrada).total_seconds() / 3600, 2)))
+
+
+def _emparejar(asistencia, marcas, resultados):
+    """
+    Aplicar las marcas de un empleado en un día a su asistencia (nueva o existente).
+    La entrada es la marca más temprana y la salida la más tardía, así que el resultado no
+    depende del orden de llegada y reenviar el mismo lote no cambia nada. Una marca con tipo
+    explícito ('entrada' o 'salida') solo compite por ese extremo; una salida explícita anterior
+    a la entrada registrada se rechaza como error.
+    Retorna True si la asistencia cambió.
+    """
+    cambio = False
+    indice_salida = None
+    for indice, marca in sorted(marcas, key=lambda item: item[1]['hora']):
+        hora = marca['hora']
+        tipo = marca.get('tipo')
+        entrada = asistencia.hora_entrada
+        salida = asistencia.hora_salida
+
+        if tipo != 'salida' and (entrada is None or hora < entrada):
+            asistencia.hora_entrada = hora
+            asistencia.tipo_entrada = marca['tipo_entrada']
+            asistencia.ubicacion_entrada = marca.get('dispositivo')
+            resultados[indice] = {'resultado': 'entrada'}
+            cambio = True
+        elif hora == entrada or hora == salida:
+            resultados[indice] = {'resultado': 'duplicado'}
+        elif tipo == 'salida' and entrada is not None and hora < entrada:
+            resultados[indice] = {'resultado': 'error', 'error': 'La salida es anterior a la entrada registrada'}
+        elif tipo != 'entrada' and entrada is not None and timedelta(0) <= hora - entrada < VENTANA_MARCA_DUPLICADA:
+            resultados[indice] = {'resultado': 'duplicado'}
+        elif tipo != 'entrada' and (salida is None or hora > salida):
+            if indice_salida is not None:
+                # La salida anterior del mismo lote queda como marca intermedia
+                resultados[indice_salida] = {'resultado': 'intermedia'}
+            asistencia.hora_salida = hora
+            asistencia.tipo_salida = marca['tipo_entrada']
+            asistencia.ubicacion_salida = marca.get('dispositivo')
+            resultados[indice] = {'resultado': 'salida'}
+            indice_salida = indice
+            cambio = True
+        else:
+            # Marca entre la entrada y la salida ya registradas (por ejemplo, colación)
+            resultados[indice] = {'resultado': 'intermedia'}
+
+    if cambio:
+        asistencia.horas_trabajadas = calcular_horas_trabajadas(asistencia.hora_entrada, asistencia.hora_salida)
+    return cambio
+
+
+def registrar_marcas(marcas):
+    """
+    Registrar un lote de marcas de reloj en asistencias con un número fijo de consultas.
+
+    Cada marca es un dict con rut, timestamp y opcionalmente dispositivo, tipo_entrada
+    ('biometrico' por defecto) y tipo ('entrada'/'salida'; si no viene se empareja sola).
+      1. Los RUT se resuelven con una sola consulta (resolver_ruts) y los horarios con un
+         IndiceHorarios; cada marca va a la asistencia de su fecha local, salvo la salida de un
+         turno nocturno, que va al día en que empezó el turno (fecha_jornada)
+      2. Se insertan las filas (empleado_rut, fecha) que falten con INSERT ... ON DUPLICATE KEY
+         UPDATE, que toma el bloqueo exclusivo de cada fila exista o no; después se leen con
+         SELECT ... FOR UPDATE (ya bloqueadas, no hay que escalar el bloqueo)
+      3. Se emparejan entrada/salida en memoria, se calculan atraso y horas extra según el turno
+         (aplicar_horario) y se escriben con un bulk_update
+    Dos lotes con los mismos días se serializan en 2 en vez de chocar con un IntegrityError. Si
+    InnoDB igual elige el lote como víctima de un deadlock (error 1213), se reintenta completo
+    hasta MAX_INTENTOS_MARCAS veces.
+
+    Retorna una lista de resultados en el mismo orden: {'indice', 'resultado', ...} donde
+    resultado es entrada, salida, duplicado, intermedia o error.
+    Las asistencias creadas o modificadas quedan en resultados[i]['asistencia_id'].
+    """
+    resultados = [None] * len(marcas)
+    validas = []
+    empleados = resolver_ruts(marca.get('rut') for marca in marcas if isinstance(marca, dict))
+
+    for indice, marca in enumerate(marcas):
+        if not isinstance(marca, dict):
+            resultados[indice] = {'resultado': 'error', 'error': 'Formato de marca inválido'}
+            continue
+        empleado = empleados.get(normalizar_rut(marca.get('rut')))
+        if empleado is None:
+            resultados[indice] = {'resultado': 'error', 'error': 'No existe un empleado con este RUT'}
+            continue
+        if not empleado[1]:
+            resultados[indice] = {'resultado': 'error', 'error': 'El empleado está inactivo'}
+            continue
+        try:
+            hora = parsear_marca_hora(marca.get('timestamp'))
+        except (TypeError, ValueError):
+            resultados[indice] = {'resultado': 'error', 'error': 'timestamp inválido (use ISO 8601)'}
+            continue
+        tipo = marca.get('tipo') or None
+        tipo_entrada = marca.get('tipo_entrada') or 'biometrico'
+        if tipo is not None and tipo not in TIPOS_MARCA:
+            resultados[indice] = {'resultado': 'error', 'error': 'tipo debe ser entrada o salida'}
+            continue
+        if tipo_entrada not in TIPOS_DISPOSITIVO:
+            resultados[indice] = {'resultado': 'error', 'error': f"tipo_entrada inválido. Opciones: {', '.join(sorted(TIPOS_DISPOSITIVO))}"}
+            continue
+        dispositivo = marca.get('dispositivo')
+        validas.append((indice, {
+            'rut': empleado[0],
+            'hora': hora,
+            'tipo': tipo,
+            'tipo_entrada': tipo_entrada,
+            'dispositivo': str(dispositivo)[:255] if dispositivo else None,
+        }))
+
+    if validas:
+        # Un solo índice de horarios (tres consultas) para asignar la fecha de cada marca y
+        # calcular la jornada; incluye el día anterior por los turnos nocturnos
+        fechas = [timezone.localdate(marca['hora']) for _, marca in validas]
+        indice_horarios = IndiceHorarios(
+            {marca['rut'] for _, marca in validas}, min(fechas) - timedelta(days=1), max(fechas)
+        )
+        for _, marca in validas:
+            marca['fecha'] = fecha_jornada(indice_horarios, marca['rut'], marca['hora'])
+
+        for intento in range(1, MAX_INTENTOS_MARCAS + 1):
+            try:
+                _guardar_marcas(validas, resultados, indice_horarios)
+                break
+            except OperationalError as e:
+                if not _es_deadlock(e) or intento == MAX_INTENTOS_MARCAS:
+                    raise
+                print(f"Deadlock al registrar marcas, reintento {intento}: {e}")
+
+    for indice, resultado in enumerate(resultados):
+        resultado['indice'] = indice
+    return resultados
+
+
+def _es_deadlock(error):
+    return bool(error.args) and error.args[0] == ER_LOCK_DEADLOCK
+
+
+def _guardar_marcas(validas, resultados, indice_horarios=None):
+    por_dia = {}
+    for indice, marca in validas:
+        por_dia.setdefault((marca['rut'], marca['fecha']), []).append((indice, marca))
+
+    with transaction.atomic():
+        # Primero se insertan las filas que falten, en orden de clave para que dos lotes tomen
+        # los bloqueos en el mismo orden
+        Asistencia.objects.bulk_create(
+            [Asistencia(empleado_rut_id=rut, fecha=fecha) for rut, fecha in sorted(por_dia)],
+            update_conflicts=True,
+            unique_fields=['empleado_rut', 'fecha'],
+            update_fields=['fecha_actualizacion'],
+            batch_size=TAMANO_LOTE_ASISTENCIAS,
+        )
+        # Solo los pares (rut, fecha) del lote: un rango, o ruts × fechas, también bloquearía
+        # días de esos empleados que el lote no toca y que otro lote podría estar registrando
+        claves = Q()
+        for rut, fecha in por_dia:
+            claves |= Q(empleado_rut_id=rut, fecha=fecha)
+        existentes = {
+            (asistencia.empleado_rut_id, asistencia.fecha): asistencia
+            for asistencia in Asistencia.objects.select_for_update().filter(claves).order_by('pk')
+        }
+
+        modificadas = []
+        for clave, marcas_dia in por_dia.items():
+            asistencia = existentes[clave]
+            # Una fila recién insertada no tiene marcas, así que siempre cambia
+            if _emparejar(asistencia, marcas_dia, resultados):
+                modificadas.append((asistencia, marcas_dia))
+
+        if modificadas:
+            # Atraso, horas extra y estado según el turno (sin índice, tres consultas para todo el lote)
+            aplicar_horario([a for a, _ in modificadas], indice_horarios)
+            ahora = timezone.now()
+            for asistencia, _ in modificadas:
+                asistencia.fecha_actualizacion = ahora
+            Asistencia.objects.bulk_update(
+                [a for a, _ in modificadas], CAMPOS_MARCA + CAMPOS_JORNADA + ['fecha_actualizacion'],
+                batch_size=TAMANO_LOTE_ASISTENCIAS,
+            )
+            programar_resumen_mensual([a for a, _ in modificadas])
+
+    for asistencia, marcas_dia in modificadas:
+        for indice, _ in marcas_dia:
+            resultados[indice]['asistencia_id'] = asistencia.pk
+    return [a for a, _ in modificadas]
+
+
+# ---------------------------------------------------------------------------
+# Importación de archivos de relojes biométricos
+# ---------------------------------------------------------------------------
+
+def _detectar_delimitador(linea):
+    try:
+        return csv.Sniffer().sniff(linea, delimiters=',;\t|').delimiter
+    except csv.Error:
+        return ','
+
+
+def leer_marcas_archivo(lineas, dispositivo=None):
+    """
+    Leer marcas desde las líneas de un archivo delimitado (coma, punto y coma, tabulación o |),
+    sin cargarlo completo. El delimitador se detecta en la primera línea. Si esa línea tiene
+    encabezados (rut, timestamp o fecha_hora, fecha y hora, dispositivo, tipo o estado) se usan
+    por nombre; si no, las columnas se leen en orden: rut, timestamp, dispositivo, tipo.
+    Genera (numero_linea, marca) con marca en el formato de registrar_marcas.
+    """
+    lineas = iter(lineas)
+    primera = next(lineas, None)
+    if primera is None:
+        return
+    delimitador = _detectar_delimitador(primera)
+
+    def todas():
+        yield primera
+        yield from lineas
+
+    columnas = None
+    for numero, fila in enumerate(csv.reader(todas(), delimiter=delimitador), start=1):
+        fila = [valor.strip() for valor in fila]
+        if not any(fila):
+            continue
+        if numero == 1 and 'rut' in [valor.lower() for valor in fila]:
+            columnas = [COLUMNAS_MARCA_ARCHIVO.get(valor.lower()) for valor in fila]
+            continue
+
+        if columnas:
+            datos = {columna: valor for columna, valor in zip(columnas, fila) if columna}
+        else:
+            datos = dict(zip(('rut', 'timestamp', 'dispositivo', 'tipo'), fila))
+        if 'timestamp' not in datos and datos.get('fecha'):
+            datos['timestamp'] = f"{datos['fecha']} {datos.get('hora', '')}".strip()
+
+        tipo = (datos.get('tipo') or '').lower()
+        yield numero, {
+            'rut': datos.get('rut'),
+            'timestamp': datos.get('timestamp'),
+            'dispositivo': datos.get('dispositivo') or dispositivo,
+            'tipo_entrada': 'biometrico',
+            'tipo': TIPOS_MARCA_ARCHIVO.get(tipo),
+        }
+
+
+def importar_marcas(lineas, dispositivo=None, tamano_chunk=TAMANO_CHUNK_IMPORTACION, al_procesar_chunk=None):
+    """
+    Importar un archivo de marcas por chunks de tamano_chunk líneas: cada chunk se registra con
+    registrar_marcas (una consulta de RUT, los horarios, un SELECT ... FOR UPDATE de los pares
+    (rut, fecha) del chunk y escrituras en bloque) y se descarta, así la memoria no depende del
+    largo del archivo.
+    Las marcas de un mismo día pueden quedar en chunks distintos: el emparejamiento se hace
+    contra la asistencia ya guardada, así que el resultado es el mismo. Cuando un chunk posterior
+    reemplaza la entrada o la salida que otro chunk ya contó, esa marca anterior se cuenta como
+    intermedia; para eso se guardan los id de las asistencias con entrada o salida contada.
+
+    al_procesar_chunk(estadisticas) se llama después de cada chunk (progreso).
+    Retorna un dict con totales por resultado, filas por segundo y una muestra de errores.
+    """
+    estadisticas = {
+        'filas': 0,
+        'resultados': {},
+        'errores': [],
+        'segundos': 0.0,
+        'filas_por_segundo': 0.0,
+    }
+    inicio = time.perf_counter()
+    # {'entrada': ids, 'salida': ids} de las asistencias cuyo extremo se contó en un chunk anterior
+    contadas = {tipo: set() for tipo in TIPOS_MARCA}
+
+    def contar(tipo, cantidad):
+        estadisticas['resultados'][tipo] = estadisticas['resultados'].get(tipo, 0) + cantidad
+
+    def procesar(chunk):
+        resultados = registrar_marcas([marca for _, marca in chunk])
+        for tipo in TIPOS_MARCA:
+            ids = {r['asistencia_id'] for r in resultados if r['resultado'] == tipo}
+            reemplazadas = len(ids & contadas[tipo])
+            if reemplazadas:
+                contar(tipo, -reemplazadas)
+                contar('intermedia', reemplazadas)
+            contadas[tipo] |= ids
+        for (numero, _), resultado in zip(chunk, resultados):
+            tipo = resultado['resultado']
+            contar(tipo, 1)
+            if tipo == 'error' and len(estadisticas['errores']) < MAX_ERRORES_REPORTADOS:
+                estadisticas['errores'].append({'linea': numero, 'error': resultado['error']})
+        estadisticas['filas'] += len(chunk)
+        estadisticas['segundos'] = round(time.perf_counter() - inicio, 3)
+        if estadisticas['segundos']:
+            estadisticas['filas_por_segundo'] = round(estadisticas['filas'] / estadisticas['segundos'], 1)
+        if al_procesar_chunk:
+            al_procesar_chunk(estadisticas)
+
+    chunk = []
+    for numero, marca in leer_marcas_archivo(lineas, dispositivo):
+        chunk.append((numero, marca))
+        if len(chunk) >= tamano_chunk:
+            procesar(chunk)
+            chunk = []
+    if chunk:
+        procesar(chunk)
+    return estadisticas
@@ -0,0 +1,118 @@
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .asistencia import TAMANO_LOTE_ASISTENCIAS
+from .horarios import IndiceHorarios
+from .models import Asistencia, Empleado, Solicitudes
+from .resumen import programar_resumen_mensual
+
+
+# Empleados por lote y días por ventana: acotan la memoria a tamano_lote × DIAS_POR_VENTANA filas
+TAMANO_LOTE_AUSENCIAS = 500
+DIAS_POR_VENTANA = 31
+
+
+def _ventanas(desde, hasta, dias=DIAS_POR_VENTANA):
+    inicio = desde
+    while inicio <= hasta:
+        fin = min(inicio + timedelta(days=dias - 1), hasta)
+        yield inicio, fin
+        inicio = fin + timedelta(days=1)
+
+
+def materializar_ausencias(desde, hasta, tamano_lote=TAMANO_LOTE_AUSENCIAS):
+    """
+    Crear las asistencias 'ausente' de los empleados que tenían turno y no marcaron entre
+    desde y hasta (inclusive). Si el día está cubierto por una solicitud aprobada se crea como
+    'permiso'. Solo se consideran empleados activos y los días dentro de su contrato.
+
+    Por cada ventana de días y lote de empleados:
+      1. IndiceHorarios precarga horarios, asignaciones y turnos (tres consultas)
+      2. Una consulta por rango trae los (empleado, fecha) que ya tienen asistencia, y los días
+         con turno que no están en ese conjunto son las ausencias (anti-join en memoria)
+      3. Una consulta trae las solicitudes aprobadas que se cruzan con la ventana
+      4. bulk_create con ignore_conflicts: volver a ejecutar el mismo rango no duplica filas,
+         aunque otro proceso registre una asistencia entre 2 y 4
+    Los días de hoy en adelante no se procesan: aún se puede marcar.
+    Retorna {'empleados', 'ausentes', 'permisos', 'segundos'}. ausentes y permisos son las
+    filas candidatas enviadas al INSERT: bulk_create con ignore_conflicts no informa cuántas
+    se omitieron, así que si otro proceso registró el día entre 2 y 4 el conteo es mayor que
+    las filas realmente creadas.
+    """
+    if hasta >= timezone.localdate():
+        raise ValueError('Solo se pueden procesar días anteriores a hoy')
+
+    inicio = time.perf_counter()
+    estadisticas = {'empleados': 0, 'ausentes': 0, 'permisos': 0}
+    empleados = (
+        Empleado.objects.filter(activo=True, estado='activo', fecha_contratacion__lte=hasta)
+        .filter(Q(fecha_termino__isnull=True) | Q(fecha_termino__gte=desde))
+        .order_by('pk')
+        .values_list('id', 'rut', 'fecha_contratacion', 'fecha_termino')
+    )
+
+    lote = []
+    for empleado in empleados.iterator(chunk_size=tamano_lote):
+        lote.append(empleado)
+        if len(lote) >= tamano_lote:
+            _procesar_lote(lote, desde, hasta, estadisticas)
+            lote = []
+    if lote:
+        _procesar_lote(lote, desde, hasta, estadisticas)
+
+    estadisticas['segundos'] = round(time.perf_counter() - inicio, 3)
+    return estadisticas
+
+
+def _procesar_lote(empleados, desde, hasta, estadisticas):
+    estadisticas['empleados'] += len(empleados)
+    ruts = [rut for _, rut, _, _ in empleados]
+    ids = [empleado_id for empleado_id, _, _, _ in empleados]
+
+    for inicio, fin in _ventanas(desde, hasta):
+        indice = IndiceHorarios(ruts, inicio, fin)
+        registradas = set(
+            Asistencia.objects.filter(empleado_rut_id__in=ruts, fecha__range=(inicio, fin))
+            .values_list('empleado_rut_id', 'fecha')
+        )
+        permisos = {}
+        for empleado_id, solicitud_id, fecha_inicio, fecha_fin in (
+            Solicitudes.objects.filter(
+                empleado_id__in=ids, estado='aprobada', fecha_inicio__lte=fin, fecha_fin__gte=inicio
+            ).values_list('empleado_id', 'id', 'fecha_inicio', 'fecha_fin')
+        ):
+            permisos.setdefault(empleado_id, []).append((solicitud_id, fecha_inicio, fecha_fin))
+
+        nuevas = []
+        for empleado_id, rut, fecha_contratacion, fecha_termino in empleados:
+            dia = max(inicio, fecha_contratacion)
+            ultimo = min(fin, fecha_termino) if fecha_termino else fin
+            while dia <= ultimo:
+                if (rut, dia) not in registradas and indice.turno_para(rut, dia) is not None:
+                    solicitud_id = next(
+                        (s_id for s_id, s_inicio, s_fin in permisos.get(empleado_id, ()) if s_inicio <= dia <= s_fin),
+                        None
+                    )
+                    if solicitud_id is None:
+                        nuevas.append(Asistencia(
+                            empleado_rut_id=rut, fecha=dia, estado='ausente',
+                            observaciones='Ausencia registrada automáticamente: sin marcas en un día con turno',
+                        ))
+                    else:
+                        nuevas.append(Asistencia(
+                            empleado_rut_id=rut, fecha=dia, estado='permiso',
+                            observaciones=f'Permiso por solicitud aprobada #{solicitud_id}',
+                        ))
+                dia += timedelta(days=1)
+
+        if nuevas:
+            with transaction.atomic():
+                Asistencia.objects.bulk_create(nuevas, batch_size=TAMANO_LOTE_ASISTENCIAS, ignore_conflicts=True)
+                programar_resumen_mensual(nuevas)
+            # Candidatas: incluye las que el INSERT omitió por una marca concurrente
+            for asistencia in nuevas:
+                estadisticas['permisos' if asistencia.estado == 'permiso' else 'ausentes'] += 1
+
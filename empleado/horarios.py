@@ -0,0 +1,252 @@
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import Asistencia, EmpleadosTurnos, Horarios, Turno
+from .resumen import programar_resumen_mensual
+
+
+TurnoRef = namedtuple('TurnoRef', ['id', 'hora_entrada', 'hora_salida', 'tolerancia_minutos', 'dias_semana'])
+
+# Prioridad de las fuentes del horario de un empleado: un horario explícito manda sobre una
+# asignación de turno, y ésta sobre el turno propio del empleado (turnos.empleados_rut)
+PRIORIDAD_HORARIO = 0
+PRIORIDAD_ASIGNACION = 1
+PRIORIDAD_TURNO = 2
+
+# Estados que el motor puede cambiar. justificado y permiso los define una persona
+ESTADOS_CALCULADOS = ('presente', 'tarde', 'ausente')
+CAMPOS_JORNADA = ['minutos_tarde', 'minutos_extras', 'estado']
+TAMANO_LOTE_RECALCULO = 2000
+# Tiempo después del fin de un turno nocturno en que una marca del día siguiente aún es su salida
+MARGEN_SALIDA_NOCTURNA = timedelta(hours=4)
+
+
+def dia_semana(fecha):
+    """Día de la semana con la convención de dias_semana en el frontend: 0 = domingo ... 6 = sábado"""
+    return (fecha.weekday() + 1) % 7
+
+
+def _dias(valor):
+    """Conjunto de días de un campo dias_semana, o None si aplica todos los días (vacío o nulo)"""
+    if not valor:
+        return None
+    dias = set()
+    for dia in valor:
+        try:
+            dias.add(int(dia))
+        except (TypeError, ValueError):
+            continue
+    return dias or None
+
+
+class IndiceHorarios:
+    """
+    Horarios de un grupo de empleados precargados con tres consultas (horarios, asignaciones
+    en empleados_turnos y turnos), para resolver el turno de cada (rut, fecha) en memoria.
+
+    turno_para(rut, fecha) elige, en orden de PRIORIDAD_*, la primera entrada vigente en la
+    fecha que aplique a ese día de la semana; dentro de la misma fuente gana la de fecha_inicio
+    más reciente. Los dias_semana de un horario reemplazan a los del turno.
+    """
+
+    def __init__(self, ruts=None, desde=None, hasta=None):
+        vigente = Q(activo=True)
+        if hasta is not None:
+            vigente &= Q(fecha_inicio__lte=hasta)
+        if desde is not None:
+            vigente &= Q(fecha_fin__isnull=True) | Q(fecha_fin__gte=desde)
+
+        horarios = Horarios.objects.filter(vigente)
+        asignaciones = EmpleadosTurnos.objects.filter(vigente)
+        turnos = Turno.objects.filter(activo=True)
+        if ruts is not None:
+            ruts = list(set(ruts))
+            horarios = horarios.filter(empleado_rut_id__in=ruts)
+            asignaciones = asignaciones.filter(empleados_rut_id__in=ruts)
+
+        horarios = list(horarios.values_list('empleado_rut_id', 'turno_id_id', 'fecha_inicio', 'fecha_fin', 'dias_semana'))
+        asignaciones = list(asignaciones.values_list('empleados_rut_id', 'turno_id_id', 'fecha_inicio', 'fecha_fin'))
+        if ruts is not None:
+            ids = {fila[1] for fila in horarios} | {fila[1] for fila in asignaciones}
+            turnos = turnos.filter(Q(pk__in=ids) | Q(empleados_rut_id__in=ruts))
+
+        self.turnos = {}
+        self._entradas = {}
+        propios = []
+        for fila in turnos.values_list('id', 'empleados_rut_id', 'hora_entrada', 'hora_salida', 'tolerancia_minutos', 'dias_semana'):
+            self.turnos[fila[0]] = TurnoRef(fila[0], fila[2], fila[3], fila[4] or 0, _dias(fila[5]))
+            propios.append((fila[1], fila[0]))
+        for rut, turno_id, fecha_inicio, fecha_fin, dias in horarios:
+            if turno_id in self.turnos:
+                dias = _dias(dias) if dias else self.turnos[turno_id].dias_semana
+                self._agregar(rut, PRIORIDAD_HORARIO, fecha_inicio, fecha_fin, dias, turno_id)
+        for rut, turno_id, fecha_inicio, fecha_fin in asignaciones:
+            if turno_id in self.turnos:
+                self._agregar(rut, PRIORIDAD_ASIGNACION, fecha_inicio, fecha_fin, self.turnos[turno_id].dias_semana, turno_id)
+        # Un turno propio que el empleado tiene en un horario o asignación solo aplica en esas fechas
+        con_fechas = {(rut, entrada[4]) for rut, entradas in self._entradas.items() for entrada in entradas}
+        for rut, turno_id in propios:
+            if (rut, turno_id) not in con_fechas:
+                self._agregar(rut, PRIORIDAD_TURNO, None, None, self.turnos[turno_id].dias_semana, turno_id)
+
+        for entradas in self._entradas.values():
+            # Prioridad ascendente; en empate, la fecha_inicio (o el id) más reciente primero
+            entradas.sort(key=lambda e: (e[0], -(e[1].toordinal() if e[1] else 0), -e[4]))
+
+    def _agregar(self, rut, prioridad, fecha_inicio, fecha_fin, dias, turno_id):
+        self._entradas.setdefault(rut, []).append((prioridad, fecha_inicio, fecha_fin, dias, turno_id))
+
+    def turno_para(self, rut, fecha):
+        dia = dia_semana(fecha)
+        for _, fecha_inicio, fecha_fin, dias, turno_id in self._entradas.get(rut, ()):
+            if fecha_inicio is not None and fecha < fecha_inicio:
+                continue
+            if fecha_fin is not None and fecha > fecha_fin:
+                continue
+            if dias is not None and dia not in dias:
+                continue
+            return self.turnos[turno_id]
+        return None
+
+
+def _hora_local(valor):
+    if timezone.is_naive(valor):
+        return valor
+    return timezone.localtime(valor).replace(tzinfo=None)
+
+
+def turno_nocturno(turno):
+    return turno.hora_salida <= turno.hora_entrada
+
+
+def fecha_jornada(indice, rut, hora):
+    """
+    Fecha de la asistencia a la que pertenece una marca. Por defecto es la fecha local de la
+    marca, pero si el día anterior el empleado tenía un turno nocturno y la marca cae antes de
+    su fin más MARGEN_SALIDA_NOCTURNA, pertenece a la asistencia de ese día anterior (por
+    ejemplo, la salida a las 06:00 de un turno de 22:00 a 06:00). Si el mismo día empieza otro
+    turno, el límite es a mitad de camino entre ambos.
+    """
+    local = _hora_local(hora)
+    fecha = local.date()
+    anterior = fecha - timedelta(days=1)
+    turno = indice.turno_para(rut, anterior)
+    if turno is None or not turno_nocturno(turno):
+        return fecha
+
+    fin = datetime.combine(fecha, turno.hora_salida)
+    limite = fin + MARGEN_SALIDA_NOCTURNA
+    siguiente = indice.turno_para(rut, fecha)
+    if siguiente is not None:
+        inicio = datetime.combine(fecha, siguiente.hora_entrada)
+        if inicio > fin:
+            limite = min(limite, fin + (inicio - fin) / 2)
+    return anterior if local < limite else fecha
+
+
+def calcular_jornada(turno, fecha, hora_entrada, hora_salida):
+    """
+    Minutos de atraso y de horas extra de una jornada según el turno. Pasada la tolerancia, el
+    atraso se cuenta desde la hora de entrada del turno. Las horas extra son el tiempo trabajado
+    después de la hora de salida. Un turno nocturno termina al día siguiente: su salida llega a
+    la asistencia de la fecha de inicio porque registrar_marcas la asigna con fecha_jornada.
+    Retorna (minutos_tarde, minutos_extras).
+    """
+    inicio = datetime.combine(fecha, turno.hora_entrada)
+    fin = datetime.combine(fecha, turno.hora_salida)
+    if fin <= inicio:
+        fin += timedelta(days=1)
+
+    minutos_tarde = 0
+    if hora_entrada is not None:
+        atraso = _hora_local(hora_entrada) - inicio
+        if atraso > timedelta(minutes=turno.tolerancia_minutos):
+            minutos_tarde = int(atraso.total_seconds() // 60)
+
+    minutos_extras = 0
+    if hora_salida is not None:
+        extra = _hora_local(hora_salida) - fin
+        if extra > timedelta(0):
+            minutos_extras = int(extra.total_seconds() // 60)
+    return minutos_tarde, minutos_extras
+
+
+def aplicar_horario(asistencias, indice=None):
+    """
+    Calcular minutos_tarde, minutos_extras y estado de las asistencias (instancias, guardadas
+    o no) según el turno vigente de cada empleado en la fecha. Sin índice, se precarga uno para
+    los empleados y fechas de las asistencias (tres consultas).
+    Las asistencias sin turno no se modifican. Retorna las asistencias que cambiaron.
+    """
+    asistencias = [a for a in asistencias if isinstance(a.fecha, date)]
+    if not asistencias:
+        return []
+    if indice is None:
+        fechas = [a.fecha for a in asistencias]
+        indice = IndiceHorarios({a.empleado_rut_id for a in asistencias}, min(fechas), max(fechas))
+
+    cambiadas = []
+    for asistencia in asistencias:
+        turno = indice.turno_para(asistencia.empleado_rut_id, asistencia.fecha)
+        if turno is None:
+            continue
+        minutos_tarde, minutos_extras = calcular_jornada(
+            turno, asistencia.fecha, asistencia.hora_entrada, asistencia.hora_salida
+        )
+        estado = asistencia.estado
+        if estado in ESTADOS_CALCULADOS and asistencia.hora_entrada is not None:
+            estado = 'tarde' if minutos_tarde else 'presente'
+        if (minutos_tarde, minutos_extras, estado) != (asistencia.minutos_tarde, asistencia.minutos_extras, asistencia.estado):
+            asistencia.minutos_tarde = minutos_tarde
+            asistencia.minutos_extras = minutos_extras
+            asistencia.estado = estado
+            cambiadas.append(asistencia)
+    return cambiadas
+
+
+def recalcular_asistencias(desde, hasta, ruts=None, tamano_lote=TAMANO_LOTE_RECALCULO):
+    """
+    Recalcular atraso, horas extra y estado de las asistencias entre desde y hasta (inclusive),
+    por ejemplo después de cambiar un turno. Los horarios se precargan una sola vez en un
+    IndiceHorarios; las asistencias se leen por lotes de tamano_lote ordenados por id, cada lote
+    en su propia transacción con SELECT ... FOR UPDATE, y solo las filas que cambian se
+    escriben con bulk_update.
+    Retorna {'procesadas', 'actualizadas', 'segundos', 'filas_por_segundo'}.
+    """
+    inicio = time.perf_counter()
+    indice = IndiceHorarios(ruts, desde, hasta)
+    queryset = Asistencia.objects.filter(fecha__range=(desde, hasta))
+    if ruts is not None:
+        queryset = queryset.filter(empleado_rut_id__in=ruts)
+    queryset = queryset.only(
+        'id', 'empleado_rut_id', 'fecha', 'hora_entrada', 'hora_salida', *CAMPOS_JORNADA
+    ).order_by('pk')
+
+    procesadas = actualizadas = 0
+    ultimo = 0
+    while True:
+        with transaction.atomic():
+            lote = list(queryset.select_for_update().filter(pk__gt=ultimo)[:tamano_lote])
+            if not lote:
+                break
+            cambiadas = aplicar_horario(lote, indice)
+            if cambiadas:
+                Asistencia.objects.bulk_update(cambiadas, CAMPOS_JORNADA)
+                programar_resumen_mensual(cambiadas)
+        procesadas += len(lote)
+        actualizadas += len(cambiadas)
+        ultimo = lote[-1].pk
+        if len(lote) < tamano_lote:
+            break
+
+    segundos = time.perf_counter() - inicio
+    return {
+        'procesadas': procesadas,
+        'actualizadas': actualizadas,
+        'segundos': round(segundos, 3),
+        'filas_por_segundo': round(procesadas / segundos, 1) if segundos else 0.0,
+    }
@@ -0,0 +1,44 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from empleado.asistencia import TAMANO_CHUNK_IMPORTACION, importar_marcas
+
+
+class Command(BaseCommand):
+    help = 'Importa un archivo de marcas exportado por relojes biométricos (CSV, TSV, ; o |) a asistencias'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo de marcas')
+        parser.add_argument('--dispositivo', help='Dispositivo a registrar si el archivo no trae la columna (por defecto, el nombre del archivo)')
+        parser.add_argument('--encoding', default='utf-8-sig', help='Codificación del archivo (por ejemplo latin-1)')
+        parser.add_argument('--chunk-size', type=int, default=TAMANO_CHUNK_IMPORTACION, help='Marcas por transacción')
+
+    def handle(self, *args, **options):
+        ruta = options['archivo']
+        if not os.path.isfile(ruta):
+            raise CommandError(f'No existe el archivo {ruta}')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size debe ser mayor que 0')
+        dispositivo = options['dispositivo'] or os.path.basename(ruta)
+
+        def progreso(estadisticas):
+            self.stdout.write(
+                f"{estadisticas['filas']} filas, {estadisticas['filas_por_segundo']} filas/s"
+            )
+
+        try:
+            with open(ruta, encoding=options['encoding'], newline='') as archivo:
+                estadisticas = importar_marcas(
+                    archivo, dispositivo=dispositivo,
+                    tamano_chunk=options['chunk_size'], al_procesar_chunk=progreso,
+                )
+        except UnicodeDecodeError:
+            raise CommandError(f"El archivo no está en {options['encoding']}; indique --encoding")
+
+        for error in estadisticas['errores']:
+            self.stdout.write(self.style.WARNING(f"Línea {error['linea']}: {error['error']}"))
+        resumen = ', '.join(f"{cantidad} {tipo}" for tipo, cantidad in sorted(estadisticas['resultados'].items()))
+        self.stdout.write(self.style.SUCCESS(
+            f"{estadisticas['filas']} marcas importadas en {estadisticas['segundos']:.2f}s "
+            f"({estadisticas['filas_por_segundo']} filas/s): {resumen or 'sin marcas'}"
+        ))
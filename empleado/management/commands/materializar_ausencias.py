@@ -0,0 +1,38 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from empleado.ausencias import TAMANO_LOTE_AUSENCIAS, materializar_ausencias
+
+
+class Command(BaseCommand):
+    help = 'Registra como ausentes (o con permiso) a los empleados con turno que no marcaron asistencia'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Fecha inicial inclusive (YYYY-MM-DD, por defecto ayer)')
+        parser.add_argument('--hasta', help='Fecha final inclusive (YYYY-MM-DD, por defecto igual a --desde)')
+        parser.add_argument('--batch-size', type=int, default=TAMANO_LOTE_AUSENCIAS, help='Empleados por lote')
+
+    def handle(self, *args, **options):
+        desde = self._fecha(options['desde'], '--desde') or timezone.localdate() - timedelta(days=1)
+        hasta = self._fecha(options['hasta'], '--hasta') or desde
+        if desde > hasta:
+            raise CommandError('--desde no puede ser posterior a --hasta')
+
+        try:
+            estadisticas = materializar_ausencias(desde, hasta, tamano_lote=options['batch_size'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"{desde} a {hasta}: {estadisticas['ausentes']} ausencias y {estadisticas['permisos']} permisos "
+            f"candidatos para {estadisticas['empleados']} empleados en {estadisticas['segundos']:.2f}s "
+            f"(los días que otro proceso registró al mismo tiempo se omiten)"
+        ))
+
+    def _fecha(self, valor, opcion):
+        if not valor:
+            return None
+        try:
+            return date.fromisoformat(valor)
+        except ValueError:
+            raise CommandError(f'{opcion} debe tener formato YYYY-MM-DD')
@@ -0,0 +1,34 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from empleado.horarios import TAMANO_LOTE_RECALCULO, recalcular_asistencias
+
+
+class Command(BaseCommand):
+    help = 'Recalcula minutos de atraso, horas extra y estado de las asistencias según los turnos vigentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', required=True, help='Fecha inicial inclusive (YYYY-MM-DD)')
+        parser.add_argument('--hasta', help='Fecha final inclusive (YYYY-MM-DD, por defecto igual a --desde)')
+        parser.add_argument('--rut', action='append', help='Limitar a un empleado (se puede repetir)')
+        parser.add_argument('--batch-size', type=int, default=TAMANO_LOTE_RECALCULO, help='Asistencias por lote')
+
+    def handle(self, *args, **options):
+        desde = self._fecha(options['desde'], '--desde')
+        hasta = self._fecha(options['hasta'], '--hasta') or desde
+        if desde > hasta:
+            raise CommandError('--desde no puede ser posterior a --hasta')
+
+        estadisticas = recalcular_asistencias(desde, hasta, ruts=options['rut'], tamano_lote=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{estadisticas['procesadas']} asistencias procesadas, {estadisticas['actualizadas']} actualizadas "
+            f"en {estadisticas['segundos']:.2f}s ({estadisticas['filas_por_segundo']} filas/s)"
+        ))
+
+    def _fecha(self, valor, opcion):
+        if not valor:
+            return None
+        try:
+            return date.fromisoformat(valor)
+        except ValueError:
+            raise CommandError(f'{opcion} debe tener formato YYYY-MM-DD')
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from empleado.resumen import parsear_mes, reconstruir_resumen_mensual
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye asistencia_resumen_mensual desde asistencias (backfill o corrección de un rango de meses)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Mes inicial inclusive (YYYY-MM)')
+        parser.add_argument('--hasta', help='Mes final inclusive (YYYY-MM)')
+
+    def handle(self, *args, **options):
+        desde = self._mes(options['desde'], '--desde')
+        hasta = self._mes(options['hasta'], '--hasta')
+        if desde and hasta and desde > hasta:
+            raise CommandError('--desde no puede ser posterior a --hasta')
+
+        inicio = time.perf_counter()
+        insertadas = reconstruir_resumen_mensual(desde, hasta)
+        rango = f"{desde:%Y-%m}" if desde else 'inicio'
+        rango += f" a {hasta:%Y-%m}" if hasta else ' a hoy'
+        self.stdout.write(self.style.SUCCESS(
+            f"asistencia_resumen_mensual reconstruida ({rango}): {insertadas} filas en {time.perf_counter() - inicio:.2f}s"
+        ))
+
+    def _mes(self, valor, opcion):
+        if not valor:
+            return None
+        try:
+            return parsear_mes(valor)
+        except ValueError:
+            raise CommandError(f'{opcion} debe tener formato YYYY-MM')
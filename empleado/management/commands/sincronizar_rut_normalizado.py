@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from empleado.models import Empleado
+from empleado.utils import normalizar_rut
+
+
+class Command(BaseCommand):
+    help = 'Rellena la columna rut_normalizado de los empleados existentes (backfill en lotes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Cantidad de empleados por lote')
+        parser.add_argument('--dry-run', action='store_true', help='Solo mostrar los cambios, sin guardarlos')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        # Los empleados que ya tienen el RUT normalizado reservan su valor
+        vistos = dict(
+            Empleado.objects.filter(rut_normalizado__isnull=False).values_list('rut_normalizado', 'id')
+        )
+        conflictos = []
+        pendientes = []
+        actualizados = 0
+
+        empleados = Empleado.objects.only('id', 'rut', 'rut_normalizado').order_by('id')
+        for empleado in empleados.iterator(chunk_size=batch_size):
+            rut_normalizado = normalizar_rut(empleado.rut)
+
+            # Dos RUTs con distinto formato pueden colisionar en el índice único
+            id_existente = vistos.get(rut_normalizado)
+            if id_existente is not None and id_existente != empleado.id:
+                conflictos.append((id_existente, empleado.id, rut_normalizado))
+                continue
+            if rut_normalizado:
+                vistos[rut_normalizado] = empleado.id
+
+            if empleado.rut_normalizado != rut_normalizado:
+                empleado.rut_normalizado = rut_normalizado
+                pendientes.append(empleado)
+
+            if len(pendientes) >= batch_size:
+                actualizados += self._guardar_lote(pendientes, dry_run)
+                pendientes = []
+
+        if pendientes:
+            actualizados += self._guardar_lote(pendientes, dry_run)
+
+        for id_existente, id_duplicado, rut_normalizado in conflictos:
+            self.stdout.write(self.style.WARNING(
+                f"RUT duplicado {rut_normalizado}: empleados {id_existente} y {id_duplicado}. "
+                f"Corrija manualmente el empleado {id_duplicado}."
+            ))
+
+        prefijo = '[dry-run] ' if dry_run else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefijo}{actualizados} empleados actualizados, {len(conflictos)} conflictos"
+        ))
+
+    def _guardar_lote(self, empleados, dry_run):
+        if not dry_run:
+            with transaction.atomic():
+                Empleado.objects.bulk_update(empleados, ['rut_normalizado'])
+        return len(empleados)
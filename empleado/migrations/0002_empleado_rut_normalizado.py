@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empleado', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='empleado',
+            name='rut_normalizado',
+            field=models.CharField(blank=True, db_column='rut_normalizado', editable=False, max_length=12, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empleado', '0002_empleado_rut_normalizado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AsistenciaResumenMensual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(db_column='mes')),
+                ('dias_presente', models.IntegerField(db_column='dias_presente', default=0)),
+                ('dias_tarde', models.IntegerField(db_column='dias_tarde', default=0)),
+                ('dias_ausente', models.IntegerField(db_column='dias_ausente', default=0)),
+                ('dias_permiso', models.IntegerField(db_column='dias_permiso', default=0)),
+                ('minutos_tarde', models.IntegerField(db_column='minutos_tarde', default=0)),
+                ('minutos_extras', models.IntegerField(db_column='minutos_extras', default=0)),
+                ('horas_trabajadas', models.DecimalField(db_column='horas_trabajadas', decimal_places=2, default=0, max_digits=7)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, db_column='fecha_actualizacion')),
+                ('empleado_rut', models.ForeignKey(db_column='empleado_rut', on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_asistencia', to='empleado.empleado', to_field='rut')),
+            ],
+            options={
+                'verbose_name': 'Resumen Mensual de Asistencia',
+                'verbose_name_plural': 'Resúmenes Mensuales de Asistencia',
+                'db_table': 'asistencia_resumen_mensual',
+                'indexes': [models.Index(fields=['mes'], name='asistencia__mes_cff227_idx')],
+                'constraints': [models.UniqueConstraint(fields=('empleado_rut', 'mes'), name='uniq_asistencia_resumen_mensual')],
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from .utils import normalizar_rut
 
 class Asistencia(models.Model):
     TIPO_ENTRADA_CHOICES = [
@@ -48,6 +49,39 @@ class Asistencia(models.Model):
         rut_display = self.empleado_rut.rut if self.empleado_rut else 'N/A'
         return f"{rut_display} - {self.fecha} - {self.estado}"
 
+
+class AsistenciaResumenMensual(models.Model):
+    """
+    Resumen de asistencia por empleado y mes (tabla asistencia_resumen_mensual). `mes` es el
+    primer día del mes. Se actualiza de forma incremental cuando cambian las asistencias del
+    mes y se puede reconstruir con el comando reconstruir_resumen_asistencia.
+    dias_presente incluye los días con atraso; dias_permiso incluye los justificados.
+    """
+    empleado_rut = models.ForeignKey('Empleado', on_delete=models.CASCADE, to_field='rut', db_column='empleado_rut', related_name='resumenes_asistencia')
+    mes = models.DateField(db_column='mes')
+    dias_presente = models.IntegerField(default=0, db_column='dias_presente')
+    dias_tarde = models.IntegerField(default=0, db_column='dias_tarde')
+    dias_ausente = models.IntegerField(default=0, db_column='dias_ausente')
+    dias_permiso = models.IntegerField(default=0, db_column='dias_permiso')
+    minutos_tarde = models.IntegerField(default=0, db_column='minutos_tarde')
+    minutos_extras = models.IntegerField(default=0, db_column='minutos_extras')
+    horas_trabajadas = models.DecimalField(max_digits=7, decimal_places=2, default=0, db_column='horas_trabajadas')
+    fecha_actualizacion = models.DateTimeField(auto_now=True, db_column='fecha_actualizacion')
+
+    class Meta:
+        db_table = 'asistencia_resumen_mensual'
+        verbose_name = 'Resumen Mensual de Asistencia'
+        verbose_name_plural = 'Resúmenes Mensuales de Asistencia'
+        constraints = [
+            models.UniqueConstraint(fields=['empleado_rut', 'mes'], name='uniq_asistencia_resumen_mensual'),
+        ]
+        indexes = [
+            models.Index(fields=['mes']),
+        ]
+
+    def __str__(self):
+        return f"{self.empleado_rut_id} - {self.mes:%Y-%m}: {self.dias_presente} días"
+
 class Empleado(models.Model):
     TIPO_CONTRATO_CHOICES = [
         ('indefinido', 'Indefinido'),
@@ -72,6 +106,8 @@ class Empleado(models.Model):
 
     # Campos básicos
     rut = models.CharField(max_length=12, unique=True, db_column='rut')
+    # RUT sin puntos ni guion (ej: 12345678K), indexado para búsquedas puntuales
+    rut_normalizado = models.CharField(max_length=12, unique=True, blank=True, null=True, editable=False, db_column='rut_normalizado')
     nombre = models.CharField(max_length=100, db_column='nombres')
     apellido = models.CharField(max_length=100, blank=True, null=True, db_column='apellidos')
     apellido_paterno = models.CharField(max_length=100, db_column='apellido_paterno')
@@ -117,6 +153,14 @@ class Empleado(models.Model):
             apellidos.append(self.apellido_materno)
         return ' '.join(apellidos)
     
+    def save(self, *args, **kwargs):
+        """Mantener sincronizado el RUT normalizado con el RUT del empleado"""
+        self.rut_normalizado = normalizar_rut(self.rut)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'rut' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'rut_normalizado'}
+        super().save(*args, **kwargs)
+    
     def __str__(self):
         return f"{self.nombre} {self.apellido_completo} - {self.cargo}"
 
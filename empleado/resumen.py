@@ -0,0 +1,180 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+from .models import Asistencia, AsistenciaResumenMensual, Empleado
+
+
+TAMANO_LOTE_RESUMEN = 1000
+CAMPOS_RESUMEN = [
+    'dias_presente', 'dias_tarde', 'dias_ausente', 'dias_permiso',
+    'minutos_tarde', 'minutos_extras', 'horas_trabajadas',
+]
+
+
+def inicio_mes(fecha):
+    return fecha.replace(day=1)
+
+
+def parsear_mes(valor):
+    """Primer día del mes de un texto YYYY-MM (ValueError si no es válido)"""
+    anio, mes = valor.split('-')
+    return date(int(anio), int(mes), 1)
+
+
+def fin_mes(mes):
+    return (mes.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+
+
+def _agregados(asistencias):
+    """Un GROUP BY (empleado, mes) con los totales de CAMPOS_RESUMEN"""
+    return (
+        asistencias
+        .annotate(mes_resumen=TruncMonth('fecha'))
+        .values('empleado_rut_id', 'mes_resumen')
+        .annotate(
+            dias_presente=Count('id', filter=Q(estado__in=['presente', 'tarde'])),
+            dias_tarde=Count('id', filter=Q(estado='tarde')),
+            dias_ausente=Count('id', filter=Q(estado='ausente')),
+            dias_permiso=Count('id', filter=Q(estado__in=['permiso', 'justificado'])),
+            total_minutos_tarde=Sum('minutos_tarde'),
+            total_minutos_extras=Sum('minutos_extras'),
+            total_horas=Sum('horas_trabajadas'),
+        )
+        .order_by()
+    )
+
+
+def _valores(fila):
+    return {
+        'dias_presente': fila['dias_presente'],
+        'dias_tarde': fila['dias_tarde'],
+        'dias_ausente': fila['dias_ausente'],
+        'dias_permiso': fila['dias_permiso'],
+        'minutos_tarde': fila['total_minutos_tarde'] or 0,
+        'minutos_extras': fila['total_minutos_extras'] or 0,
+        'horas_trabajadas': fila['total_horas'] or Decimal('0'),
+    }
+
+
+def _mes(valor):
+    # TruncMonth sobre un DateField retorna date; algunos backends retornan datetime
+    return valor.date() if hasattr(valor, 'date') else valor
+
+
+def claves_resumen(asistencias):
+    """Pares (rut, mes) afectados por las asistencias indicadas"""
+    return {
+        (asistencia.empleado_rut_id, inicio_mes(asistencia.fecha))
+        for asistencia in asistencias if isinstance(asistencia.fecha, date)
+    }
+
+
+def refrescar_resumen_mensual(claves):
+    """
+    Recalcular las filas de asistencia_resumen_mensual de los pares (rut, mes) indicados,
+    con un número fijo de consultas sin importar cuántos sean:
+      0. SELECT de los empleados que siguen existiendo
+      1. INSERT ... ON DUPLICATE KEY UPDATE (bulk_create con update_conflicts) de las filas, en
+         orden de (rut, mes): toma directamente el bloqueo exclusivo de cada fila, exista o no.
+         Dos refrescos del mismo mes se serializan aquí, y el segundo lee las asistencias ya
+         confirmadas por el primero (su primera lectura es posterior al bloqueo)
+      2. GROUP BY de las asistencias de esos empleados y meses
+      3. INSERT ... ON DUPLICATE KEY UPDATE con los totales, y DELETE de los meses que
+         quedaron sin asistencias
+    No se usa INSERT IGNORE + SELECT ... FOR UPDATE: en InnoDB el INSERT IGNORE de una fila
+    existente toma un bloqueo compartido, y dos refrescos que luego piden el exclusivo se
+    bloquean mutuamente.
+    Retorna la cantidad de filas actualizadas.
+    """
+    # Las asistencias de un empleado eliminado se borran en cascada junto con su resumen
+    ruts = set(Empleado.objects.filter(rut__in={rut for rut, _ in claves}).values_list('rut', flat=True))
+    claves = sorted((rut, mes) for rut, mes in set(claves) if rut in ruts)
+    if not claves:
+        return 0
+    meses = {mes for _, mes in claves}
+
+    with transaction.atomic():
+        AsistenciaResumenMensual.objects.bulk_create(
+            [AsistenciaResumenMensual(empleado_rut_id=rut, mes=mes) for rut, mes in claves],
+            update_conflicts=True,
+            unique_fields=['empleado_rut', 'mes'],
+            update_fields=['fecha_actualizacion'],
+        )
+        totales = {
+            (fila['empleado_rut_id'], _mes(fila['mes_resumen'])): _valores(fila)
+            for fila in _agregados(Asistencia.objects.filter(
+                empleado_rut_id__in=ruts, fecha__range=(min(meses), fin_mes(max(meses)))
+            ))
+        }
+
+        actualizar = [
+            AsistenciaResumenMensual(empleado_rut_id=rut, mes=mes, **totales[(rut, mes)])
+            for rut, mes in claves if (rut, mes) in totales
+        ]
+        eliminar = [(rut, mes) for rut, mes in claves if (rut, mes) not in totales]
+        if actualizar:
+            AsistenciaResumenMensual.objects.bulk_create(
+                actualizar,
+                update_conflicts=True,
+                unique_fields=['empleado_rut', 'mes'],
+                update_fields=CAMPOS_RESUMEN + ['fecha_actualizacion'],
+                batch_size=TAMANO_LOTE_RESUMEN,
+            )
+        if eliminar:
+            condicion = Q()
+            for rut, mes in eliminar:
+                condicion |= Q(empleado_rut_id=rut, mes=mes)
+            AsistenciaResumenMensual.objects.filter(condicion).delete()
+    return len(actualizar)
+
+
+def programar_resumen_mensual(asistencias):
+    """
+    Refrescar el resumen de los meses de las asistencias cuando la transacción en curso se
+    confirme. Un fallo al refrescar no revierte las asistencias (el comando
+    reconstruir_resumen_asistencia lo corrige).
+    """
+    claves = claves_resumen(asistencias)
+    if claves:
+        transaction.on_commit(lambda: refrescar_resumen_mensual(claves), robust=True)
+
+
+def reconstruir_resumen_mensual(desde=None, hasta=None):
+    """
+    Recalcular asistencia_resumen_mensual desde asistencias para los meses entre desde y
+    hasta (primer día de cada mes, inclusive; sin rango se reconstruye todo). Borra el rango
+    y lo vuelve a insertar con un solo GROUP BY leído con iterator(), en lotes de
+    TAMANO_LOTE_RESUMEN. Retorna la cantidad de filas insertadas.
+    """
+    resumen = AsistenciaResumenMensual.objects.all()
+    asistencias = Asistencia.objects.all()
+    if desde:
+        resumen = resumen.filter(mes__gte=inicio_mes(desde))
+        asistencias = asistencias.filter(fecha__gte=inicio_mes(desde))
+    if hasta:
+        resumen = resumen.filter(mes__lte=inicio_mes(hasta))
+        asistencias = asistencias.filter(fecha__lte=fin_mes(inicio_mes(hasta)))
+
+    insertadas = 0
+    with transaction.atomic():
+        resumen.delete()
+        lote = []
+        # Por mes y empleado: el id de las filas sigue al mes, que es el orden del endpoint
+        filas = _agregados(asistencias).order_by('mes_resumen', 'empleado_rut_id')
+        for fila in filas.iterator(chunk_size=TAMANO_LOTE_RESUMEN):
+            lote.append(AsistenciaResumenMensual(
+                empleado_rut_id=fila['empleado_rut_id'],
+                mes=_mes(fila['mes_resumen']),
+                **_valores(fila),
+            ))
+            if len(lote) >= TAMANO_LOTE_RESUMEN:
+                AsistenciaResumenMensual.objects.bulk_create(lote)
+                insertadas += len(lote)
+                lote = []
+        if lote:
+            AsistenciaResumenMensual.objects.bulk_create(lote)
+            insertadas += len(lote)
+    return insertadas
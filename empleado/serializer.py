@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import Empleado, Asistencia, Turno, Solicitudes, TiposSolicitudes, Tareas
+from .models import Empleado, Asistencia, AsistenciaResumenMensual, Turno, Solicitudes, TiposSolicitudes, Tareas
+from .utils import normalizar_rut
 from datetime import date, datetime, time
 from django.utils import timezone
 from zoneinfo import ZoneInfo
@@ -40,6 +41,18 @@ class EmpleadoSerializer(serializers.ModelSerializer):
             representation['rol'] = getattr(instance, 'rol', 'empleado') or 'empleado'
         return representation
     
+    def validate_rut(self, value):
+        """Validar que no exista otro empleado con el mismo RUT normalizado (ej: 12.345.678-9 y 12345678-9)"""
+        rut_normalizado = normalizar_rut(value)
+        if not rut_normalizado:
+            raise serializers.ValidationError("El RUT no es válido.")
+        existentes = Empleado.objects.filter(rut_normalizado=rut_normalizado)
+        if self.instance:
+            existentes = existentes.exclude(pk=self.instance.pk)
+        if existentes.exists():
+            raise serializers.ValidationError("Ya existe un empleado con este RUT.")
+        return value
+    
     def validate_password(self, value):
         # Si es creación y no hay password, lanzar error
         if not self.instance and not value:
@@ -310,6 +323,24 @@ class AsistenciaSerializer(serializers.ModelSerializer):
         return data
 
 
+class AsistenciaResumenMensualSerializer(serializers.ModelSerializer):
+    """Fila de asistencia_resumen_mensual; requiere select_related('empleado_rut')"""
+    empleado_rut = serializers.CharField(source='empleado_rut_id', read_only=True)
+    empleado_nombre = serializers.CharField(source='empleado_rut.nombre', read_only=True)
+    empleado_apellido = serializers.CharField(source='empleado_rut.apellido_completo', read_only=True)
+    departamento = serializers.CharField(source='empleado_rut.departamento', read_only=True)
+    mes = serializers.DateField(format='%Y-%m', read_only=True)
+
+    class Meta:
+        model = AsistenciaResumenMensual
+        fields = [
+            'id', 'empleado_rut', 'empleado_nombre', 'empleado_apellido', 'departamento', 'mes',
+            'dias_presente', 'dias_tarde', 'dias_ausente', 'dias_permiso',
+            'minutos_tarde', 'minutos_extras', 'horas_trabajadas', 'fecha_actualizacion'
+        ]
+        read_only_fields = fields
+
+
 class TurnoSerializer(serializers.ModelSerializer):
     empleado_nombre = serializers.SerializerMethodField()
     empleado_apellido = serializers.SerializerMethodField()
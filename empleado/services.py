@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from django.conf import settings
+from .models import Empleado
+from .utils import normalizar_rut
+
+
+# Datos mínimos del empleado necesarios para filtrar por RUT en las vistas
+EmpleadoRef = namedtuple('EmpleadoRef', ['id', 'rut', 'rol', 'activo'])
+
+
+class CacheRutEmpleado:
+    """
+    Caché LRU con expiración (TTL) de RUT normalizado -> EmpleadoRef.
+    Es local a cada proceso: las escrituras sobre Empleado la invalidan mediante
+    señales, y el TTL acota el tiempo que otros procesos pueden ver datos antiguos.
+    También guarda los RUT no encontrados (valor None) para no repetir la consulta.
+    """
+
+    def __init__(self, max_entradas=2048, ttl_segundos=300):
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def obtener(self, rut_normalizado):
+        """Retorna (encontrado, valor). encontrado=False si no está en caché o expiró"""
+        with self._lock:
+            entrada = self._datos.get(rut_normalizado)
+            if entrada is None or entrada[1] < time.monotonic():
+                if entrada is not None:
+                    del self._datos[rut_normalizado]
+                self.misses += 1
+                return False, None
+            self._datos.move_to_end(rut_normalizado)
+            self.hits += 1
+            return True, entrada[0]
+
+    def guardar(self, rut_normalizado, valor):
+        with self._lock:
+            self._datos[rut_normalizado] = (valor, time.monotonic() + self.ttl_segundos)
+            self._datos.move_to_end(rut_normalizado)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def invalidar(self, *ruts, empleado_id=None):
+        """Eliminar las entradas de los RUT indicados y las que apunten al empleado_id"""
+        with self._lock:
+            for rut in ruts:
+                rut_normalizado = normalizar_rut(rut)
+                if rut_normalizado:
+                    self._datos.pop(rut_normalizado, None)
+            if empleado_id is not None:
+                claves = [
+                    clave for clave, (valor, _) in self._datos.items()
+                    if valor is not None and valor.id == empleado_id
+                ]
+                for clave in claves:
+                    del self._datos[clave]
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def estadisticas(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+                'entradas': len(self._datos),
+                'max_entradas': self.max_entradas,
+                'ttl_segundos': self.ttl_segundos,
+            }
+
+
+_config_cache = getattr(settings, 'EMPLEADO_RUT_CACHE', {})
+cache_rut_empleados = CacheRutEmpleado(
+    max_entradas=_config_cache.get('MAX_ENTRADAS', 2048),
+    ttl_segundos=_config_cache.get('TTL_SEGUNDOS', 300),
+)
+
+
+def buscar_empleado_por_rut(rut, queryset=None):
+    """
+    Buscar un empleado por RUT usando la columna indexada `rut_normalizado`.
+    Acepta el RUT con o sin formato (puntos, guion, K minúscula).
+    Por defecto solo considera empleados activos; se puede pasar un queryset
+    base para restringir la búsqueda (por ejemplo, estado='activo' en el login).
+    Retorna el objeto Empleado si se encuentra, None en caso contrario.
+    """
+    rut_normalizado = normalizar_rut(rut)
+    if not rut_normalizado:
+        return None
+
+    if queryset is None:
+        queryset = Empleado.objects.filter(activo=True)
+
+    # Consulta puntual sobre el índice único, en lugar de recorrer toda la tabla
+    return queryset.filter(rut_normalizado=rut_normalizado).first()
+
+
+def resolver_empleado_por_rut(rut):
+    """
+    Resolver el RUT de un header o query param a un EmpleadoRef de un empleado activo,
+    pasando por la caché en memoria. Retorna None si no existe o está inactivo.
+    No usar para autenticación: no incluye la contraseña y puede estar hasta
+    TTL segundos desactualizado respecto de otros procesos.
+    """
+    rut_normalizado = normalizar_rut(rut)
+    if not rut_normalizado:
+        return None
+
+    encontrado, referencia = cache_rut_empleados.obtener(rut_normalizado)
+    if not encontrado:
+        fila = (
+            Empleado.objects
+            .filter(rut_normalizado=rut_normalizado)
+            .values_list('id', 'rut', 'rol', 'activo')
+            .first()
+        )
+        referencia = EmpleadoRef(*fila) if fila else None
+        cache_rut_empleados.guardar(rut_normalizado, referencia)
+
+    if referencia is None or not referencia.activo:
+        return None
+    return referencia
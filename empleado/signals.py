@@ -0,0 +1,37 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from .horarios import aplicar_horario
+from .models import Asistencia, Empleado
+from .resumen import programar_resumen_mensual
+from .services import cache_rut_empleados
+
+
+@receiver(post_save, sender=Empleado)
+@receiver(post_delete, sender=Empleado)
+def invalidar_cache_rut_empleado(sender, instance, **kwargs):
+    """Invalidar la caché de RUT cuando se crea, modifica o elimina un empleado"""
+    rut = instance.rut
+    empleado_id = instance.pk
+    # Esperar al commit para que otra petición no vuelva a cachear el valor antiguo
+    transaction.on_commit(lambda: cache_rut_empleados.invalidar(rut, empleado_id=empleado_id))
+
+
+@receiver(pre_save, sender=Asistencia)
+def calcular_jornada_asistencia(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Calcular atraso, horas extra y estado según el turno al guardar una asistencia (API, admin).
+    Con update_fields el guardado es parcial y no se pueden agregar campos, así que se omite;
+    las marcas en bloque lo calculan en registrar_marcas.
+    """
+    if raw or update_fields is not None:
+        return
+    aplicar_horario([instance])
+
+
+@receiver(post_save, sender=Asistencia)
+@receiver(post_delete, sender=Asistencia)
+def refrescar_resumen_asistencia(sender, instance, raw=False, **kwargs):
+    """Refrescar el resumen mensual del empleado al confirmarse el cambio de una asistencia"""
+    if not raw:
+        programar_resumen_mensual([instance])
@@ -1,3 +1,415 @@
+import os
+import tempfile
+from datetime import date, datetime, time
+from decimal import Decimal
+from io import StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import (
+    Asistencia, AsistenciaResumenMensual, Empleado, Horarios, Solicitudes, TiposSolicitudes, Turno
+)
+from .asistencia import importar_marcas
+from .resumen import CAMPOS_RESUMEN
+
+
+class MarcasAsistenciaTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = '/api/asistencia/punches/bulk/'
+        self.empleados = [
+            Empleado.objects.create(
+                rut=f'1111111{i}-{i}',
+                nombre=f'Empleado {i}',
+                apellido_paterno='Marcas',
+                cargo='Barista',
+                fecha_contratacion=date(2024, 1, 1)
+            )
+            for i in range(3)
+        ]
+
+    def test_lote_empareja_entrada_y_salida(self):
+        marcas = []
+        for i, empleado in enumerate(self.empleados):
+            rut_con_puntos = f'1.111.111{i}-{i}'
+            marcas += [
+                {'rut': rut_con_puntos, 'timestamp': '2025-03-03T17:30:00', 'dispositivo': 'reloj-1'},
+                {'rut': empleado.rut, 'timestamp': '2025-03-03T08:00:00', 'dispositivo': 'reloj-1'},
+                {'rut': empleado.rut, 'timestamp': '2025-03-03T08:00:40', 'dispositivo': 'reloj-1'},
+            ]
+        marcas.append({'rut': '99999999-9', 'timestamp': '2025-03-03T08:00:00'})
+
+        # Consultas fijas: RUT, inserción, asistencias bloqueadas, horarios (3), actualización y savepoints
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.post(self.url, {'punches': marcas}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(consultas), 9)
+
+        resultados = [r['resultado'] for r in response.data['resultados']]
+        self.assertEqual(resultados[:3], ['salida', 'entrada', 'duplicado'])
+        self.assertEqual(resultados[-1], 'error')
+        self.assertEqual(response.data['resumen'], {'entrada': 3, 'salida': 3, 'duplicado': 3, 'error': 1})
+
+        asistencia = Asistencia.objects.get(empleado_rut=self.empleados[0], fecha=date(2025, 3, 3))
+        self.assertEqual(asistencia.horas_trabajadas, Decimal('9.50'))
+        self.assertEqual(asistencia.ubicacion_entrada, 'reloj-1')
+        self.assertEqual(Asistencia.objects.count(), 3)
+
+    def test_lote_reenviado_y_salida_posterior(self):
+        rut = self.empleados[0].rut
+        primero = [
+            {'rut': rut, 'timestamp': '2025-03-03T08:00:00'},
+            {'rut': rut, 'timestamp': '2025-03-03T13:00:00'},
+        ]
+        self.client.post(self.url, {'punches': primero}, format='json')
+        response = self.client.post(self.url, {'punches': primero}, format='json')
+        self.assertEqual(response.data['resumen'], {'duplicado': 2})
+
+        response = self.client.post(self.url, {'punches': [
+            {'rut': rut, 'timestamp': '2025-03-03T18:00:00', 'tipo_entrada': 'app_movil'},
+        ]}, format='json')
+        self.assertEqual(response.data['resultados'][0]['resultado'], 'salida')
+        asistencia = Asistencia.objects.get(empleado_rut_id=rut, fecha=date(2025, 3, 3))
+        self.assertEqual(asistencia.horas_trabajadas, Decimal('10.00'))
+        self.assertEqual(asistencia.tipo_salida, 'app_movil')
+        self.assertEqual(response.data['resultados'][0]['asistencia_id'], asistencia.id)
+
+        # Una salida explícita anterior a la entrada no es un duplicado
+        response = self.client.post(self.url, {'punches': [
+            {'rut': rut, 'timestamp': '2025-03-03T07:59:00', 'tipo': 'salida'},
+        ]}, format='json')
+        self.assertEqual(response.data['resultados'][0]['resultado'], 'error')
+
+
+class ImportarMarcasTest(TestCase):
+    def setUp(self):
+        for i in range(2):
+            Empleado.objects.create(
+                rut=f'1222222{i}-{i}',
+                nombre=f'Empleado {i}',
+                apellido_paterno='Reloj',
+                cargo='Barista',
+                fecha_contratacion=date(2024, 1, 1)
+            )
+
+    def test_comando_importa_por_chunks(self):
+        lineas = ['rut;fecha;hora;estado']
+        for dia in range(3, 8):
+            for i in range(2):
+                lineas.append(f'12.222.22{i}-{i};{dia:02d}/03/2025;08:0{i}:00;0')
+                lineas.append(f'12.222.22{i}-{i};{dia:02d}/03/2025;13:00:00;1')
+                lineas.append(f'12.222.22{i}-{i};{dia:02d}/03/2025;17:0{i}:00;1')
+        lineas.append('12.222.220-0;no es fecha;;0')
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as archivo:
+            archivo.write('\n'.join(lineas))
+        self.addCleanup(os.remove, archivo.name)
+
+        # chunk de 4: las marcas de un mismo día quedan en chunks distintos
+        salida = StringIO()
+        call_command('importar_marcas', archivo.name, '--chunk-size', '4', stdout=salida)
+        self.assertIn('filas/s', salida.getvalue())
+        self.assertIn('Línea 32', salida.getvalue())
+
+        self.assertEqual(Asistencia.objects.count(), 10)
+        asistencia = Asistencia.objects.get(empleado_rut_id='12222221-1', fecha=date(2025, 3, 5))
+        self.assertEqual(asistencia.horas_trabajadas, Decimal('9.00'))
+        self.assertEqual(asistencia.ubicacion_entrada, os.path.basename(archivo.name))
+
+        # Reimportar el mismo archivo no cambia nada
+        call_command('importar_marcas', archivo.name, stdout=StringIO())
+        self.assertEqual(Asistencia.objects.count(), 10)
+        self.assertFalse(Asistencia.objects.filter(horas_trabajadas__isnull=True).exists())
+
+    def test_salida_reemplazada_en_otro_chunk_cuenta_como_intermedia(self):
+        lineas = [
+            '12222220-0,2025-03-03 08:00:00,,0',
+            '12222220-0,2025-03-03 13:00:00,,1',
+            '12222220-0,2025-03-03 17:00:00,,1',
+        ]
+        estadisticas = importar_marcas(lineas, tamano_chunk=1)
+        self.assertEqual(estadisticas['resultados'], {'entrada': 1, 'salida': 1, 'intermedia': 1})
+
+    def test_endpoint_subida(self):
+        contenido = '12222220-0,2025-03-03 08:00:00,reloj-2\n12222220-0,2025-03-03 16:30:00,reloj-2\n'
+        archivo = SimpleUploadedFile('marcas.csv', contenido.encode('latin-1'))
+        response = APIClient().post(
+            '/api/asistencia/punches/import/', {'archivo': archivo, 'encoding': 'latin-1'}, format='multipart'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['resultados'], {'entrada': 1, 'salida': 1})
+        asistencia = Asistencia.objects.get(empleado_rut_id='12222220-0')
+        self.assertEqual(asistencia.ubicacion_salida, 'reloj-2')
+        self.assertEqual(asistencia.horas_trabajadas, Decimal('8.50'))
+
+
+class JornadaAsistenciaTest(TestCase):
+    def setUp(self):
+        self.empleado = Empleado.objects.create(
+            rut='13333333-3',
+            nombre='Empleado',
+            apellido_paterno='Turno',
+            cargo='Barista',
+            fecha_contratacion=date(2024, 1, 1)
+        )
+        # Turno propio de lunes a viernes, 08:00 a 17:00 con 10 minutos de tolerancia
+        self.turno = Turno.objects.create(
+            empleados_rut=self.empleado, nombre_turno='Mañana', hora_entrada=time(8, 0),
+            hora_salida=time(17, 0), tolerancia_minutos=10, horas_trabajo=Decimal('9.00'),
+            dias_semana=[1, 2, 3, 4, 5]
+        )
+
+    def _marcar(self, *timestamps):
+        marcas = [{'rut': self.empleado.rut, 'timestamp': t} for t in timestamps]
+        return APIClient().post('/api/asistencia/punches/bulk/', {'punches': marcas}, format='json')
+
+    def test_atraso_y_horas_extra_al_marcar(self):
+        # Lunes 3 de marzo: 8:25 es atraso; 17:40 son 40 minutos extra
+        self._marcar('2025-03-03T08:25:00', '2025-03-03T17:40:00')
+        # Martes dentro de la tolerancia
+        self._marcar('2025-03-04T08:09:00')
+        # Sábado: el turno no aplica
+        self._marcar('2025-03-08T10:00:00')
+
+        lunes = Asistencia.objects.get(fecha=date(2025, 3, 3))
+        self.assertEqual((lunes.minutos_tarde, lunes.minutos_extras, lunes.estado), (25, 40, 'tarde'))
+        martes = Asistencia.objects.get(fecha=date(2025, 3, 4))
+        self.assertEqual((martes.minutos_tarde, martes.estado), (0, 'presente'))
+        sabado = Asistencia.objects.get(fecha=date(2025, 3, 8))
+        self.assertEqual((sabado.minutos_tarde, sabado.estado), (0, 'presente'))
+
+    def test_horario_prevalece_y_recalculo(self):
+        self._marcar('2025-03-03T08:25:00', '2025-03-05T08:25:00')
+        self.assertEqual(Asistencia.objects.filter(estado='tarde').count(), 2)
+
+        # Desde el miércoles tiene un horario de 08:30 para lunes a miércoles
+        tarde = Turno.objects.create(
+            empleados_rut=self.empleado, nombre_turno='Tarde', hora_entrada=time(8, 30),
+            hora_salida=time(18, 0), tolerancia_minutos=0, horas_trabajo=Decimal('9.50')
+        )
+        Horarios.objects.create(
+            empleado_rut=self.empleado, turno_id=tarde, fecha_inicio=date(2025, 3, 5), dias_semana=[1, 2, 3]
+        )
+        salida = StringIO()
+        call_command('recalcular_asistencias', '--desde', '2025-03-01', '--hasta', '2025-03-31', stdout=salida)
+        self.assertIn('1 actualizadas', salida.getvalue())
+
+        miercoles = Asistencia.objects.get(fecha=date(2025, 3, 5))
+        self.assertEqual((miercoles.minutos_tarde, miercoles.estado), (0, 'presente'))
+        lunes = Asistencia.objects.get(fecha=date(2025, 3, 3))
+        self.assertEqual((lunes.minutos_tarde, lunes.estado), (25, 'tarde'))
+
+    def test_turno_nocturno_empareja_salida_del_dia_siguiente(self):
+        nocturno = Empleado.objects.create(
+            rut='13333334-1', nombre='Empleado', apellido_paterno='Noche', cargo='Barista',
+            fecha_contratacion=date(2024, 1, 1)
+        )
+        Turno.objects.create(
+            empleados_rut=nocturno, nombre_turno='Noche', hora_entrada=time(22, 0),
+            hora_salida=time(6, 0), horas_trabajo=Decimal('8.00')
+        )
+        response = APIClient().post('/api/asistencia/punches/bulk/', {'punches': [
+            {'rut': nocturno.rut, 'timestamp': '2025-03-03T22:00:00'},
+            {'rut': nocturno.rut, 'timestamp': '2025-03-04T07:00:00'},
+        ]}, format='json')
+        self.assertEqual(response.data['resumen'], {'entrada': 1, 'salida': 1})
+
+        asistencia = Asistencia.objects.get(empleado_rut=nocturno)
+        self.assertEqual(asistencia.fecha, date(2025, 3, 3))
+        self.assertEqual(asistencia.horas_trabajadas, Decimal('9.00'))
+        # Salida a las 07:00 de un turno que termina a las 06:00: una hora extra
+        self.assertEqual((asistencia.minutos_tarde, asistencia.minutos_extras, asistencia.estado), (0, 60, 'presente'))
+
+        # Entrada atrasada de la noche siguiente y salida a la hora: atraso sin horas extra
+        APIClient().post('/api/asistencia/punches/bulk/', {'punches': [
+            {'rut': nocturno.rut, 'timestamp': '2025-03-04T22:30:00'},
+            {'rut': nocturno.rut, 'timestamp': '2025-03-05T06:00:00'},
+        ]}, format='json')
+        siguiente = Asistencia.objects.get(empleado_rut=nocturno, fecha=date(2025, 3, 4))
+        self.assertEqual((siguiente.minutos_tarde, siguiente.minutos_extras, siguiente.estado), (30, 0, 'tarde'))
+        self.assertEqual(Asistencia.objects.filter(empleado_rut=nocturno).count(), 2)
+
+    def test_guardado_individual(self):
+        asistencia = Asistencia.objects.create(
+            empleado_rut=self.empleado, fecha=date(2025, 3, 6),
+            hora_entrada=timezone.make_aware(datetime(2025, 3, 6, 9, 0))
+        )
+        self.assertEqual((asistencia.minutos_tarde, asistencia.estado), (60, 'tarde'))
+        asistencia.estado = 'justificado'
+        asistencia.save()
+        asistencia.refresh_from_db()
+        self.assertEqual(asistencia.estado, 'justificado')
+
+
+class AusenciasTest(TestCase):
+    def setUp(self):
+        self.empleado = Empleado.objects.create(
+            rut='14444444-4',
+            nombre='Empleado',
+            apellido_paterno='Ausente',
+            cargo='Barista',
+            fecha_contratacion=date(2024, 1, 1)
+        )
+        # Contratado el jueves 6: antes no puede faltar
+        self.nuevo = Empleado.objects.create(
+            rut='15555555-5',
+            nombre='Empleado',
+            apellido_paterno='Nuevo',
+            cargo='Cajero',
+            fecha_contratacion=date(2025, 3, 6)
+        )
+        Empleado.objects.create(
+            rut='16666666-6',
+            nombre='Empleado',
+            apellido_paterno='Sin turno',
+            cargo='Cajero',
+            fecha_contratacion=date(2024, 1, 1)
+        )
+        for empleado in (self.empleado, self.nuevo):
+            Turno.objects.create(
+                empleados_rut=empleado, nombre_turno='Mañana', hora_entrada=time(8, 0),
+                hora_salida=time(17, 0), horas_trabajo=Decimal('9.00'), dias_semana=[1, 2, 3, 4, 5]
+            )
+        tipo = TiposSolicitudes.objects.create(nombre='Día administrativo')
+        Solicitudes.objects.create(
+            empleado_id=self.empleado, tipo_solicitud_id=tipo, fecha_inicio=date(2025, 3, 5),
+            fecha_fin=date(2025, 3, 5), motivo='Trámite', estado='aprobada'
+        )
+        Asistencia.objects.create(
+            empleado_rut=self.empleado, fecha=date(2025, 3, 3),
+            hora_entrada=timezone.make_aware(datetime(2025, 3, 3, 8, 0))
+        )
+
+    def test_ausencias_y_permisos_idempotente(self):
+        salida = StringIO()
+        call_command('materializar_ausencias', '--desde', '2025-03-03', '--hasta', '2025-03-09', stdout=salida)
+        self.assertIn('5 ausencias y 1 permisos', salida.getvalue())
+
+        estados = dict(
+            Asistencia.objects.filter(empleado_rut=self.empleado).values_list('fecha__day', 'estado')
+        )
+        self.assertEqual(estados, {3: 'presente', 4: 'ausente', 5: 'permiso', 6: 'ausente', 7: 'ausente'})
+        self.assertEqual(
+            sorted(Asistencia.objects.filter(empleado_rut=self.nuevo).values_list('fecha__day', flat=True)), [6, 7]
+        )
+        self.assertFalse(Asistencia.objects.filter(empleado_rut_id='16666666-6').exists())
+
+        call_command('materializar_ausencias', '--desde', '2025-03-03', '--hasta', '2025-03-09', stdout=StringIO())
+        self.assertEqual(Asistencia.objects.count(), 7)
+
+    def test_marca_posterior_reemplaza_ausencia(self):
+        call_command('materializar_ausencias', '--desde', '2025-03-04', stdout=StringIO())
+        APIClient().post('/api/asistencia/punches/bulk/', {'punches': [
+            {'rut': self.empleado.rut, 'timestamp': '2025-03-04T08:20:00'},
+        ]}, format='json')
+        asistencia = Asistencia.objects.get(empleado_rut=self.empleado, fecha=date(2025, 3, 4))
+        self.assertEqual((asistencia.estado, asistencia.minutos_tarde), ('tarde', 20))
+
+
+class ResumenMensualTest(TestCase):
+    def setUp(self):
+        self.empleados = [
+            Empleado.objects.create(
+                rut=f'1777777{i}-{i}',
+                nombre=f'Empleado {i}',
+                apellido_paterno='Resumen',
+                cargo='Barista',
+                departamento='Sala' if i else 'Caja',
+                fecha_contratacion=date(2024, 1, 1)
+            )
+            for i in range(2)
+        ]
+        for empleado in self.empleados:
+            Turno.objects.create(
+                empleados_rut=empleado, nombre_turno='Mañana', hora_entrada=time(8, 0),
+                hora_salida=time(17, 0), horas_trabajo=Decimal('9.00'), dias_semana=[1, 2, 3, 4, 5]
+            )
+
+    def _resumen(self, empleado, mes):
+        return AsistenciaResumenMensual.objects.get(empleado_rut=empleado, mes=mes)
+
+    def test_mantenimiento_incremental_igual_a_reconstruccion(self):
+        rut = self.empleados[0].rut
+        with self.captureOnCommitCallbacks(execute=True):
+            APIClient().post('/api/asistencia/punches/bulk/', {'punches': [
+                {'rut': rut, 'timestamp': '2025-03-03T08:00:00'},
+                {'rut': rut, 'timestamp': '2025-03-03T17:30:00'},
+                {'rut': rut, 'timestamp': '2025-03-04T08:20:00'},
+                {'rut': rut, 'timestamp': '2025-03-04T17:00:00'},
+                {'rut': rut, 'timestamp': '2025-04-01T08:00:00'},
+                {'rut': self.empleados[1].rut, 'timestamp': '2025-03-03T08:00:00'},
+            ]}, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('materializar_ausencias', '--desde', '2025-03-05', stdout=StringIO())
+
+        marzo = self._resumen(self.empleados[0], date(2025, 3, 1))
+        self.assertEqual(
+            (marzo.dias_presente, marzo.dias_tarde, marzo.dias_ausente, marzo.minutos_tarde, marzo.minutos_extras),
+            (2, 1, 1, 20, 30)
+        )
+        self.assertEqual(marzo.horas_trabajadas, Decimal('18.17'))
+        self.assertEqual(AsistenciaResumenMensual.objects.count(), 3)
+
+        # Cambios individuales por el ORM (API, admin) también actualizan el resumen
+        with self.captureOnCommitCallbacks(execute=True):
+            ausencia = Asistencia.objects.get(empleado_rut=self.empleados[0], estado='ausente')
+            ausencia.estado = 'justificado'
+            ausencia.save()
+            Asistencia.objects.get(empleado_rut=self.empleados[0], fecha=date(2025, 4, 1)).delete()
+        marzo.refresh_from_db()
+        self.assertEqual((marzo.dias_ausente, marzo.dias_permiso), (0, 1))
+        self.assertFalse(AsistenciaResumenMensual.objects.filter(mes=date(2025, 4, 1)).exists())
+
+        incremental = set(AsistenciaResumenMensual.objects.values_list('empleado_rut_id', 'mes', *CAMPOS_RESUMEN))
+        call_command('reconstruir_resumen_asistencia', stdout=StringIO())
+        reconstruido = set(AsistenciaResumenMensual.objects.values_list('empleado_rut_id', 'mes', *CAMPOS_RESUMEN))
+        self.assertEqual(incremental, reconstruido)
+
+    def test_endpoint_paginado_por_rol(self):
+        for mes in (1, 2, 3):
+            for empleado in self.empleados:
+                AsistenciaResumenMensual.objects.create(empleado_rut=empleado, mes=date(2025, mes, 1), dias_presente=mes)
+        client = APIClient()
+        url = '/api/asistencia/resumen/'
+
+        response = client.get(url, {'page_size': 4, 'desde': '2025-02'}, HTTP_X_EMPLEADO_ROL='gerente')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 4)
+        self.assertEqual(response.data['results'][0]['mes'], '2025-03')
+        self.assertIsNone(response.data['next'])
+
+        # Páginas de un mismo mes: sin filas repetidas ni perdidas
+        vistos = []
+        response = client.get(url, {'page_size': 1, 'mes': '2025-02'}, HTTP_X_EMPLEADO_ROL='gerente')
+        while True:
+            vistos += [fila['empleado_rut'] for fila in response.data['results']]
+            if not response.data['next']:
+                break
+            response = client.get(response.data['next'], HTTP_X_EMPLEADO_ROL='gerente')
+        self.assertEqual(sorted(vistos), sorted(empleado.rut for empleado in self.empleados))
+
+        response = client.get(
+            url, {'departamento': 'Caja'},
+            HTTP_X_EMPLEADO_ROL='empleado', HTTP_X_EMPLEADO_RUT=self.empleados[1].rut
+        )
+        self.assertEqual(response.data['results'], [])
+        response = client.get(url, HTTP_X_EMPLEADO_ROL='empleado', HTTP_X_EMPLEADO_RUT=self.empleados[1].rut)
+        self.assertEqual({fila['empleado_rut'] for fila in response.data['results']}, {self.empleados[1].rut})
+
+        response = client.get(url, {'mes': 'marzo'}, HTTP_X_EMPLEADO_ROL='gerente')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(client.get(url).data['results'], [])
+
 
-# Create your tests here.
+class EstadisticasAsistenciaTest(TestCase):
+    def test_rango_limitado(self):
+        url = '/api/asistencia/estadisticas/'
+        response = APIClient().get(url, {'fecha_inicio': '2024-01-01', 'fecha_fin': '2024-12-31'})
+        self.assertEqual(response.status_code, 200)
+        response = APIClient().get(url, {'fecha_inicio': '2024-01-01', 'fecha_fin': '2025-01-01'})
+        self.assertEqual(response.status_code, 400)
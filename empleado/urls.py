@@ -12,6 +12,12 @@ router.register(r'tareas', views.TareasViewSet, 'tareas')
 urlpatterns = [
     # Endpoint de estadísticas de asistencia (debe ir antes del router para evitar conflictos)
     path('asistencia/estadisticas/', views.estadisticas_asistencia, name='estadisticas_asistencia'),
+
+    # Resumen mensual de asistencia por empleado (antes del router, igual que estadísticas)
+    path('asistencia/resumen/', views.AsistenciaResumenViewSet.as_view({'get': 'list'}), name='asistencia-resumen'),
+    
+    # Endpoint de monitoreo de la caché de RUT
+    path('empleado/cache-rut/estadisticas/', views.estadisticas_cache_rut, name='estadisticas_cache_rut'),
     
     # Endpoint de autenticación
     path('auth/login/', views.login, name='login'),
@@ -0,0 +1,13 @@
+import re
+
+
+def normalizar_rut(rut):
+    """
+    Normaliza un RUT quitando puntos, guiones y espacios, y convirtiendo la K a mayúscula.
+    Ejemplo: '12.345.678-k' -> '12345678K'.
+    Retorna None si el valor está vacío o no contiene caracteres válidos.
+    """
+    if not rut:
+        return None
+    rut_normalizado = re.sub(r'[^0-9kK]', '', str(rut)).upper()
+    return rut_normalizado or None
@@ -3,26 +3,53 @@ from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.permissions import AllowAny
+from rest_framework.parsers import MultiPartParser
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q, Count, Sum
 from .serializer import (
     EmpleadoSerializer, AsistenciaSerializer, TurnoSerializer,
     SolicitudesSerializer, SolicitudesListSerializer, TiposSolicitudesSerializer,
-    TareasSerializer, TareasListSerializer
+    TareasSerializer, TareasListSerializer, AsistenciaResumenMensualSerializer
 )
-from .models import Empleado, Asistencia, Turno, Solicitudes, TiposSolicitudes, Tareas
+from .models import Empleado, Asistencia, AsistenciaResumenMensual, Turno, Solicitudes, TiposSolicitudes, Tareas
+from .services import buscar_empleado_por_rut, resolver_empleado_por_rut, cache_rut_empleados
+from .utils import normalizar_rut
+from .asistencia import MAX_MARCAS_POR_LOTE, importar_marcas, registrar_marcas
+from .resumen import parsear_mes
+from api.pagination import CursorPaginationObligatoria
+from api.exportacion import RENDERERS_EXPORTACION, formato_exportacion, respuesta_exportacion
 from django.db import connection, transaction
 from django.utils import timezone
 from datetime import date, datetime, timedelta
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError
 import bcrypt
+import io
 import traceback
 
+# Columnas de GET /api/asistencia/export/: (columna, lookup)
+CAMPOS_EXPORTACION_ASISTENCIA = [
+    ('id', 'id'),
+    ('empleado_rut', 'empleado_rut_id'),
+    ('nombres', 'empleado_rut__nombre'),
+    ('apellido_paterno', 'empleado_rut__apellido_paterno'),
+    ('fecha', 'fecha'),
+    ('hora_entrada', 'hora_entrada'),
+    ('hora_salida', 'hora_salida'),
+    ('tipo_entrada', 'tipo_entrada'),
+    ('tipo_salida', 'tipo_salida'),
+    ('minutos_tarde', 'minutos_tarde'),
+    ('minutos_extras', 'minutos_extras'),
+    ('horas_trabajadas', 'horas_trabajadas'),
+    ('estado', 'estado'),
+]
+
+
 # Create your views here.
 class EmpleadoView(viewsets.ModelViewSet):
     serializer_class = EmpleadoSerializer
     queryset = Empleado.objects.filter(activo=True)
+    cursor_ordering = ('-fecha_creacion', '-id')
     
     def create(self, request, *args, **kwargs):
         try:
@@ -57,6 +84,12 @@ class EmpleadoView(viewsets.ModelViewSet):
             
             # Si se está cambiando el RUT, necesitamos actualizar las referencias manualmente
             if new_rut and new_rut != old_rut:
+                # Evitar colisiones con otro empleado que tenga el mismo RUT normalizado
+                if Empleado.objects.filter(rut_normalizado=normalizar_rut(new_rut)).exclude(pk=instance.pk).exists():
+                    return Response(
+                        {"error": {"rut": ["Ya existe un empleado con este RUT."]}},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
                 print(f"Cambiando RUT de {old_rut} a {new_rut}")
                 with transaction.atomic():
                     try:
@@ -121,12 +154,19 @@ class EmpleadoView(viewsets.ModelViewSet):
                                 except Exception as e:
                                     print(f"Tabla tareas no existe o error al actualizar: {str(e)}")
                                 
+                                # 5b. Actualizar el resumen mensual de asistencia (también referencia el rut)
+                                cursor.execute(
+                                    "UPDATE asistencia_resumen_mensual SET empleado_rut = %s WHERE empleado_rut = %s",
+                                    [new_rut, old_rut]
+                                )
+                                print(f"Actualizados {cursor.rowcount} resúmenes mensuales de asistencia")
+                                
                                 # Nota: validado_por en asistencias referencia empleados.id, no rut, así que no necesita actualización
                                 
                                 # 6. Ahora actualizar el RUT del empleado directamente en la base de datos
                                 cursor.execute(
-                                    "UPDATE empleados SET rut = %s WHERE rut = %s",
-                                    [new_rut, old_rut]
+                                    "UPDATE empleados SET rut = %s, rut_normalizado = %s WHERE rut = %s",
+                                    [new_rut, normalizar_rut(new_rut), old_rut]
                                 )
                                 print(f"RUT actualizado en la tabla empleados de {old_rut} a {new_rut}")
                                 
@@ -138,6 +178,12 @@ class EmpleadoView(viewsets.ModelViewSet):
                         print(f"Error al actualizar referencias: {str(db_error)}")
                         raise db_error
                     
+                    # El UPDATE directo no dispara señales: invalidar la caché de RUT al confirmar
+                    empleado_id = instance.pk
+                    transaction.on_commit(
+                        lambda: cache_rut_empleados.invalidar(old_rut, new_rut, empleado_id=empleado_id)
+                    )
+                    
                     # Recargar la instancia desde la base de datos para obtener el nuevo RUT
                     instance.refresh_from_db()
                     
@@ -235,21 +281,10 @@ def login(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Normalizar el RUT: limpiar puntos y guiones, convertir a mayúsculas
-        import re
-        rut_normalizado = re.sub(r'[^0-9kK]', '', rut).upper()
-        
-        # Buscar empleado por RUT normalizado (sin formato)
-        # Como los RUTs en la BD pueden tener formato, necesitamos comparar normalizados
-        empleados = Empleado.objects.filter(activo=True, estado='activo')
-        empleado = None
-        
-        for emp in empleados:
-            # Normalizar el RUT del empleado de la BD
-            rut_empleado_limpio = re.sub(r'[^0-9kK]', '', emp.rut).upper()
-            if rut_empleado_limpio == rut_normalizado:
-                empleado = emp
-                break
+        # Buscar empleado por RUT normalizado (sin formato) usando la columna indexada
+        empleado = buscar_empleado_por_rut(
+            rut, queryset=Empleado.objects.filter(activo=True, estado='activo')
+        )
         
         if not empleado:
             # No revelar si el RUT existe o no por seguridad
@@ -340,31 +375,9 @@ def login(request):
 class AsistenciaView(viewsets.ModelViewSet):
     serializer_class = AsistenciaSerializer
     queryset = Asistencia.objects.all()
-    
-    def _buscar_empleado_por_rut(self, rut_str):
-        """
-        Función auxiliar para buscar un empleado por RUT, normalizando ambos valores.
-        Retorna el objeto Empleado si se encuentra, None en caso contrario.
-        """
-        import re
-        if not rut_str:
-            return None
-        
-        # Normalizar el RUT del request (limpiar puntos, guiones y espacios)
-        rut_normalizado = re.sub(r'[^0-9kK]', '', rut_str).upper()
-        
-        if not rut_normalizado:
-            return None
-        
-        # Buscar el empleado por RUT normalizado
-        # Como los RUTs en la BD pueden tener formato, necesitamos comparar normalizados
-        empleados = Empleado.objects.filter(activo=True)
-        for emp in empleados:
-            rut_empleado_limpio = re.sub(r'[^0-9kK]', '', emp.rut).upper()
-            if rut_empleado_limpio == rut_normalizado:
-                return emp
-        
-        return None
+    # fecha se repite en cada empleado del día: con ella como primer campo el cursor de DRF
+    # pagina con OFFSET dentro del día (ver CursorPaginationOpcional), así que se pagina por id
+    cursor_ordering = ('-id',)
     
     def get_queryset(self):
         # Obtener todas las asistencias, pero manejar empleados inexistentes en el serializer
@@ -392,9 +405,9 @@ class AsistenciaView(viewsets.ModelViewSet):
             # GERENTE/ADMINISTRADOR: Ver TODAS las asistencias por defecto
             # Solo filtrar por RUT si se especifica explícitamente en query params (para búsquedas específicas)
             if empleado_rut_request:
-                empleado_encontrado = self._buscar_empleado_por_rut(empleado_rut_request)
+                empleado_encontrado = resolver_empleado_por_rut(empleado_rut_request)
                 if empleado_encontrado:
-                    queryset = queryset.filter(empleado_rut=empleado_encontrado)
+                    queryset = queryset.filter(empleado_rut_id=empleado_encontrado.rut)
                 else:
                     # Si no se encuentra el empleado, no devolver nada
                     queryset = queryset.none()
@@ -409,9 +422,9 @@ class AsistenciaView(viewsets.ModelViewSet):
             empleado_rut = empleado_rut_header or empleado_rut_request
             
             if empleado_rut:
-                empleado_encontrado = self._buscar_empleado_por_rut(empleado_rut)
+                empleado_encontrado = resolver_empleado_por_rut(empleado_rut)
                 if empleado_encontrado:
-                    queryset = queryset.filter(empleado_rut=empleado_encontrado)
+                    queryset = queryset.filter(empleado_rut_id=empleado_encontrado.rut)
                 else:
                     # Si no se encuentra el empleado, no devolver nada (por seguridad)
                     queryset = queryset.none()
@@ -443,6 +456,85 @@ class AsistenciaView(viewsets.ModelViewSet):
         
         return queryset
     
+    @action(detail=False, methods=['get'], renderer_classes=RENDERERS_EXPORTACION)
+    def export(self, request):
+        """
+        Exportar asistencias como ?format=csv (por defecto) o ?format=ndjson en streaming.
+        Respeta el mismo filtrado por rol y los filtros de fecha/estado del listado.
+        """
+        formato = formato_exportacion(request)
+        if formato is None:
+            return Response(
+                {'error': 'format inválido. Opciones: csv, ndjson'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return respuesta_exportacion(self.get_queryset(), CAMPOS_EXPORTACION_ASISTENCIA, 'asistencia', formato)
+    
+    @action(detail=False, methods=['post'], url_path='punches/bulk')
+    def punches_bulk(self, request):
+        """
+        Registrar un lote de marcas de reloj (biométrico, app, etc.):
+        {"punches": [{"rut": "12.345.678-9", "timestamp": "2025-03-03T08:01:00",
+                      "dispositivo": "reloj-1", "tipo_entrada": "biometrico"}, ...]}
+        Cada marca se empareja como entrada o salida de la asistencia del día; el resultado
+        indica por marca si fue entrada, salida, duplicado, intermedia o error.
+        """
+        marcas = request.data.get('punches') if isinstance(request.data, dict) else request.data
+        if not isinstance(marcas, list) or not marcas:
+            return Response(
+                {'error': 'Se requiere una lista de marcas en "punches"'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(marcas) > MAX_MARCAS_POR_LOTE:
+            return Response(
+                {'error': f'Máximo {MAX_MARCAS_POR_LOTE} marcas por petición'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            resultados = registrar_marcas(marcas)
+        except Exception as e:
+            print("Error al registrar marcas:", str(e))
+            print("Traceback:", traceback.format_exc())
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        resumen = {}
+        for resultado in resultados:
+            resumen[resultado['resultado']] = resumen.get(resultado['resultado'], 0) + 1
+        return Response({'total': len(resultados), 'resumen': resumen, 'resultados': resultados})
+
+    @action(detail=False, methods=['post'], url_path='punches/import', parser_classes=[MultiPartParser])
+    def punches_import(self, request):
+        """
+        Importar un archivo de marcas exportado por un reloj biométrico (multipart, campo "archivo";
+        opcionales "dispositivo" y "encoding"). El archivo se procesa por chunks desde el archivo
+        temporal de la subida, sin cargarlo en memoria. Para archivos de varios meses conviene el
+        comando importar_marcas.
+        """
+        archivo = request.FILES.get('archivo')
+        if archivo is None:
+            return Response({'error': 'Se requiere el archivo en el campo "archivo"'}, status=status.HTTP_400_BAD_REQUEST)
+        encoding = request.data.get('encoding') or 'utf-8-sig'
+        try:
+            ''.encode(encoding)
+        except LookupError:
+            return Response({'error': f'encoding desconocido: {encoding}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            archivo.seek(0)
+            lineas = io.TextIOWrapper(archivo.file, encoding=encoding, newline='')
+            estadisticas = importar_marcas(lineas, dispositivo=request.data.get('dispositivo') or archivo.name)
+        except UnicodeDecodeError:
+            return Response(
+                {'error': f'El archivo no está en {encoding}; indique el campo "encoding"'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            print("Error al importar marcas:", str(e))
+            print("Traceback:", traceback.format_exc())
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response(estadisticas)
+
     def create(self, request, *args, **kwargs):
         try:
             serializer = self.get_serializer(data=request.data)
@@ -485,38 +577,188 @@ class AsistenciaView(viewsets.ModelViewSet):
             )
 
 
+class AsistenciaResumenViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Resumen mensual de asistencia por empleado (asistencia_resumen_mensual), siempre
+    paginado por cursor. Una fila por empleado y mes, sin recorrer las asistencias.
+    Gerentes y administradores ven todos los empleados; un empleado solo su propio resumen.
+    Filtros: ?mes, ?desde y ?hasta (YYYY-MM), ?empleado_rut y ?departamento.
+    Se ordena por id descendente: todos los empleados comparten el mismo mes, y el cursor de
+    DRF solo usa el primer campo del orden (ver CursorPaginationOpcional). Las filas se crean a
+    medida que avanzan los meses, así que el id sigue aproximadamente al mes.
+    """
+    serializer_class = AsistenciaResumenMensualSerializer
+    pagination_class = CursorPaginationObligatoria
+    cursor_ordering = ('-id',)
+
+    def get_queryset(self):
+        queryset = AsistenciaResumenMensual.objects.select_related('empleado_rut')
+        params = self.request.query_params
+
+        empleado_rol = (params.get('empleado_rol') or self.request.headers.get('X-Empleado-Rol') or '').lower().strip()
+        if empleado_rol in ['gerente', 'administrador']:
+            empleado_rut = params.get('empleado_rut')
+        elif empleado_rol == 'empleado':
+            empleado_rut = self.request.headers.get('X-Empleado-Rut') or params.get('empleado_rut')
+            if not empleado_rut:
+                return queryset.none()
+        else:
+            # Por seguridad, sin un rol conocido no se muestra nada (igual que en AsistenciaView)
+            return queryset.none()
+        if empleado_rut:
+            empleado = resolver_empleado_por_rut(empleado_rut)
+            if empleado is None:
+                return queryset.none()
+            queryset = queryset.filter(empleado_rut_id=empleado.rut)
+
+        try:
+            if params.get('mes'):
+                queryset = queryset.filter(mes=parsear_mes(params['mes']))
+            if params.get('desde'):
+                queryset = queryset.filter(mes__gte=parsear_mes(params['desde']))
+            if params.get('hasta'):
+                queryset = queryset.filter(mes__lte=parsear_mes(params['hasta']))
+        except ValueError:
+            raise ValidationError({'error': 'mes, desde y hasta deben tener formato YYYY-MM'})
+        if params.get('departamento'):
+            queryset = queryset.filter(empleado_rut__departamento=params['departamento'])
+        return queryset
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def estadisticas_cache_rut(request):
+    """
+    Endpoint de monitoreo de la caché de RUT -> empleado (hits, misses y ocupación).
+    La caché es local a cada proceso, por lo que los valores corresponden al worker que responde.
+    """
+    return Response(cache_rut_empleados.estadisticas(), status=status.HTTP_200_OK)
+
+
+# Días máximos (inclusive) del rango de estadísticas: el desglose por día crece con el rango
+MAX_DIAS_ESTADISTICAS = 366
+
+# Clave de la respuesta de estadísticas para cada estado de asistencia
+CLAVES_ESTADO_ASISTENCIA = {
+    'presente': 'presentes',
+    'ausente': 'ausentes',
+    'tarde': 'tardes',
+    'justificado': 'justificados',
+    'permiso': 'permisos',
+}
+
+
+def _conteos_vacios_asistencia():
+    return {clave: 0 for clave in CLAVES_ESTADO_ASISTENCIA.values()}
+
+
+def _total_registrados(conteos):
+    return conteos['presentes'] + conteos['tardes'] + conteos['justificados'] + conteos['permisos']
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def estadisticas_asistencia(request):
     """
-    Endpoint para obtener estadísticas de asistencia
+    Endpoint para obtener estadísticas de asistencia.
+    Acepta `fecha` (un día) o `fecha_inicio`/`fecha_fin` (rango, ambos inclusive, de hasta
+    MAX_DIAS_ESTADISTICAS días).
+    Además de los totales, retorna el desglose por día y por departamento.
+    Los conteos se obtienen con consultas agrupadas, sin importar el largo del rango.
     """
     try:
         fecha = request.query_params.get('fecha', None)
-        if not fecha:
-            fecha = date.today()
-        else:
-            fecha = datetime.strptime(fecha, '%Y-%m-%d').date()
+        fecha_inicio = request.query_params.get('fecha_inicio', None)
+        fecha_fin = request.query_params.get('fecha_fin', None)
         
-        # Contar asistencias por estado
-        presentes = Asistencia.objects.filter(fecha=fecha, estado='presente').count()
-        ausentes = Asistencia.objects.filter(fecha=fecha, estado='ausente').count()
-        tardes = Asistencia.objects.filter(fecha=fecha, estado='tarde').count()
-        justificados = Asistencia.objects.filter(fecha=fecha, estado='justificado').count()
-        permisos = Asistencia.objects.filter(fecha=fecha, estado='permiso').count()
+        try:
+            if fecha_inicio or fecha_fin:
+                fecha_inicio = datetime.strptime(fecha_inicio or fecha_fin, '%Y-%m-%d').date()
+                fecha_fin = datetime.strptime(fecha_fin or fecha_inicio.isoformat(), '%Y-%m-%d').date()
+            else:
+                fecha_inicio = datetime.strptime(fecha, '%Y-%m-%d').date() if fecha else date.today()
+                fecha_fin = fecha_inicio
+        except ValueError:
+            return Response(
+                {"error": "Formato de fecha inválido. Use YYYY-MM-DD"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Total de empleados activos
-        total_empleados = Empleado.objects.filter(activo=True).count()
+        if fecha_fin < fecha_inicio:
+            return Response(
+                {"error": "La fecha de fin debe ser posterior a la fecha de inicio"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if (fecha_fin - fecha_inicio).days + 1 > MAX_DIAS_ESTADISTICAS:
+            return Response(
+                {"error": f"El rango no puede superar {MAX_DIAS_ESTADISTICAS} días"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        asistencias = Asistencia.objects.filter(fecha__range=(fecha_inicio, fecha_fin)).order_by()
+        
+        # Una sola consulta agrupada por día y estado; los totales se derivan de ella
+        totales = _conteos_vacios_asistencia()
+        por_dia = {}
+        for fila in asistencias.values('fecha', 'estado').annotate(total=Count('id')):
+            clave = CLAVES_ESTADO_ASISTENCIA.get(fila['estado'])
+            if not clave:
+                continue
+            totales[clave] += fila['total']
+            por_dia.setdefault(fila['fecha'], _conteos_vacios_asistencia())[clave] += fila['total']
+        
+        # Desglose por departamento del empleado
+        por_departamento = {}
+        filas_departamento = asistencias.values('empleado_rut__departamento', 'estado').annotate(total=Count('id'))
+        for fila in filas_departamento:
+            clave = CLAVES_ESTADO_ASISTENCIA.get(fila['estado'])
+            if not clave:
+                continue
+            departamento = fila['empleado_rut__departamento'] or 'Sin departamento'
+            por_departamento.setdefault(departamento, _conteos_vacios_asistencia())[clave] += fila['total']
+        
+        # Total de empleados activos por departamento (el total general se deriva de aquí)
+        empleados_por_departamento = {}
+        filas_empleados = (
+            Empleado.objects.filter(activo=True).order_by()
+            .values('departamento').annotate(total=Count('id'))
+        )
+        for fila in filas_empleados:
+            departamento = fila['departamento'] or 'Sin departamento'
+            empleados_por_departamento[departamento] = empleados_por_departamento.get(departamento, 0) + fila['total']
+        total_empleados = sum(empleados_por_departamento.values())
+        
+        dias = []
+        dia = fecha_inicio
+        while dia <= fecha_fin:
+            conteos = por_dia.get(dia, _conteos_vacios_asistencia())
+            dias.append({
+                'fecha': dia.isoformat(),
+                **conteos,
+                'total_registrados': _total_registrados(conteos),
+            })
+            dia += timedelta(days=1)
+        
+        departamentos = []
+        for departamento in sorted(set(por_departamento) | set(empleados_por_departamento)):
+            conteos = por_departamento.get(departamento, _conteos_vacios_asistencia())
+            departamentos.append({
+                'departamento': departamento,
+                **conteos,
+                'total_empleados': empleados_por_departamento.get(departamento, 0),
+                'total_registrados': _total_registrados(conteos),
+            })
         
         return Response({
-            'fecha': fecha.isoformat(),
-            'presentes': presentes,
-            'ausentes': ausentes,
-            'tardes': tardes,
-            'justificados': justificados,
-            'permisos': permisos,
+            'fecha': fecha_inicio.isoformat(),
+            'fecha_inicio': fecha_inicio.isoformat(),
+            'fecha_fin': fecha_fin.isoformat(),
+            **totales,
             'total_empleados': total_empleados,
-            'total_registrados': presentes + tardes + justificados + permisos
+            'total_registrados': _total_registrados(totales),
+            'por_dia': dias,
+            'por_departamento': departamentos,
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -530,30 +772,7 @@ def estadisticas_asistencia(request):
 class TurnoView(viewsets.ModelViewSet):
     serializer_class = TurnoSerializer
     queryset = Turno.objects.all()
-    
-    def _buscar_empleado_por_rut_turno(self, rut_str):
-        """
-        Función auxiliar para buscar un empleado por RUT, normalizando ambos valores.
-        Retorna el objeto Empleado si se encuentra, None en caso contrario.
-        """
-        import re
-        if not rut_str:
-            return None
-        
-        # Normalizar el RUT del request (limpiar puntos, guiones y espacios)
-        rut_normalizado = re.sub(r'[^0-9kK]', '', rut_str).upper()
-        
-        if not rut_normalizado:
-            return None
-        
-        # Buscar el empleado por RUT normalizado
-        empleados = Empleado.objects.filter(activo=True)
-        for emp in empleados:
-            rut_empleado_limpio = re.sub(r'[^0-9kK]', '', emp.rut).upper()
-            if rut_empleado_limpio == rut_normalizado:
-                return emp
-        
-        return None
+    cursor_ordering = ('-fecha_creacion', '-id')
     
     def get_queryset(self):
         # Obtener todos los turnos, pero manejar empleados inexistentes en el serializer
@@ -589,9 +808,9 @@ class TurnoView(viewsets.ModelViewSet):
             # GERENTE/ADMINISTRADOR: Ver TODOS los turnos por defecto
             # Solo filtrar por RUT si se especifica explícitamente en query params (para búsquedas específicas)
             if empleado_rut_param:
-                empleado_encontrado = self._buscar_empleado_por_rut_turno(empleado_rut_param)
+                empleado_encontrado = resolver_empleado_por_rut(empleado_rut_param)
                 if empleado_encontrado:
-                    queryset = queryset.filter(empleados_rut=empleado_encontrado)
+                    queryset = queryset.filter(empleados_rut_id=empleado_encontrado.rut)
                     print(f"[TurnoView.get_queryset] Filtrando por RUT específico (búsqueda): {empleado_rut_param}")
                 else:
                     # Si no se encuentra el empleado, retornar queryset vacío
@@ -609,9 +828,9 @@ class TurnoView(viewsets.ModelViewSet):
             empleado_rut = empleado_rut_header or empleado_rut_param
             
             if empleado_rut:
-                empleado_encontrado = self._buscar_empleado_por_rut_turno(empleado_rut)
+                empleado_encontrado = resolver_empleado_por_rut(empleado_rut)
                 if empleado_encontrado:
-                    queryset = queryset.filter(empleados_rut=empleado_encontrado)
+                    queryset = queryset.filter(empleados_rut_id=empleado_encontrado.rut)
                     print(f"[TurnoView.get_queryset] Filtrando turnos para empleado RUT: {empleado_rut}")
                 else:
                     # Si no se encuentra el empleado, retornar queryset vacío (por seguridad)
@@ -655,6 +874,12 @@ class TurnoView(viewsets.ModelViewSet):
             total_queryset = queryset.count()
             print(f"[TurnoView.list] Queryset filtrado tiene {total_queryset} turnos")
             
+            # Paginación por cursor (solo si el cliente la solicita, ver api/pagination.py)
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
+            
             if total_queryset == 0:
                 # Verificar si hay turnos en la BD sin filtros
                 total_turnos_bd = Turno.objects.all().count()
@@ -819,6 +1044,7 @@ class SolicitudesViewSet(viewsets.ModelViewSet):
     search_fields = ['motivo', 'empleado_id__nombre', 'empleado_id__apellido']
     ordering_fields = ['fecha_creacion', 'fecha_inicio', 'fecha_fin']
     ordering = ['-fecha_creacion']
+    cursor_ordering = ('-fecha_creacion', '-id')
 
     def get_serializer_class(self):
         """Retornar el serializer apropiado según la acción"""
@@ -865,20 +1091,11 @@ class SolicitudesViewSet(viewsets.ModelViewSet):
             # EMPLEADO: Solo puede ver sus propias solicitudes
             if empleado_rut:
                 # Buscar el empleado por RUT
-                empleado_encontrado = None
                 try:
-                    # Normalizar el RUT
-                    import re
-                    rut_normalizado = re.sub(r'[^0-9kK]', '', empleado_rut).upper()
-                    empleados = Empleado.objects.filter(activo=True)
-                    for emp in empleados:
-                        rut_empleado_limpio = re.sub(r'[^0-9kK]', '', emp.rut).upper()
-                        if rut_empleado_limpio == rut_normalizado:
-                            empleado_encontrado = emp
-                            break
+                    empleado_encontrado = resolver_empleado_por_rut(empleado_rut)
                     
                     if empleado_encontrado:
-                        queryset = queryset.filter(empleado_id=empleado_encontrado)
+                        queryset = queryset.filter(empleado_id=empleado_encontrado.id)
                     else:
                         queryset = queryset.none()
                 except Exception as e:
@@ -1066,6 +1283,7 @@ class TiposSolicitudesViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['activo', 'requiere_aprobacion']
     search_fields = ['nombre', 'descripcion']
+    cursor_ordering = ('id',)
 
 
 class TareasViewSet(viewsets.ModelViewSet):
@@ -1078,6 +1296,7 @@ class TareasViewSet(viewsets.ModelViewSet):
     search_fields = ['titulo', 'descripcion', 'asignada_a_rut__nombre', 'asignada_a_rut__apellido']
     ordering_fields = ['fecha_creacion', 'fecha_vencimiento', 'prioridad']
     ordering = ['-fecha_creacion']
+    cursor_ordering = ('-fecha_creacion', '-id')
 
     def get_serializer_class(self):
         """Retornar el serializer apropiado según la acción"""
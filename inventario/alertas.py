@@ -0,0 +1,176 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Q, Value, When
+from django.utils import timezone
+from .models import Inventario, AlertasInventario
+
+
+_config_alertas = getattr(settings, 'ALERTAS_INVENTARIO', {})
+# Días de anticipación para alertar un vencimiento (igual que expiring_soon)
+DIAS_POR_VENCER = _config_alertas.get('DIAS_POR_VENCER', 30)
+# Bajo esta fracción de cantidad_minima el stock pasa de bajo a crítico
+FACTOR_STOCK_CRITICO = _config_alertas.get('FACTOR_STOCK_CRITICO', 0.5)
+# Productos evaluados por transacción en el barrido periódico
+TAMANO_LOTE_ALERTAS = _config_alertas.get('TAMANO_LOTE', 1000)
+
+PRIORIDAD_ALERTA = {
+    'sin_stock': 'critica',
+    'producto_vencido': 'critica',
+    'stock_critico': 'alta',
+    'por_vencer': 'alta',
+    'stock_bajo': 'media',
+    'sobre_stock': 'baja',
+}
+
+# Una alerta está vigente mientras está pendiente o revisada, o fue ignorada y la condición
+# que la originó sigue presente (fecha_resolucion nula). Las vigentes no se vuelven a crear.
+ALERTA_VIGENTE = Q(estado__in=['pendiente', 'revisada']) | Q(estado='ignorada', fecha_resolucion__isnull=True)
+
+CAMPOS_EVALUACION = (
+    'id', 'nombre_producto', 'unidad_medida', 'cantidad_actual', 'cantidad_minima',
+    'cantidad_maxima', 'fecha_vencimiento', 'activo', 'requiere_alerta',
+)
+
+
+def alertas_esperadas(producto, hoy):
+    """
+    Retorna {tipo_alerta: mensaje} con las alertas que corresponden al producto (un dict con
+    CAMPOS_EVALUACION). Los tipos de stock son excluyentes entre sí, igual que los de vencimiento.
+    """
+    if not producto['activo']:
+        return {}
+
+    alertas = {}
+    nombre = producto['nombre_producto']
+    cantidad = producto['cantidad_actual']
+    minima = producto['cantidad_minima']
+    maxima = producto['cantidad_maxima']
+    unidad = producto['unidad_medida']
+
+    if cantidad <= 0:
+        alertas['sin_stock'] = f"{nombre} no tiene stock disponible"
+    elif cantidad <= minima * FACTOR_STOCK_CRITICO:
+        alertas['stock_critico'] = f"{nombre} tiene stock crítico: {cantidad} {unidad} (mínimo {minima})"
+    elif cantidad <= minima:
+        alertas['stock_bajo'] = f"{nombre} tiene stock bajo: {cantidad} {unidad} (mínimo {minima})"
+    elif maxima is not None and cantidad > maxima:
+        alertas['sobre_stock'] = f"{nombre} supera el stock máximo: {cantidad} {unidad} (máximo {maxima})"
+
+    vencimiento = producto['fecha_vencimiento']
+    if vencimiento is not None:
+        if vencimiento < hoy:
+            alertas['producto_vencido'] = f"{nombre} venció el {vencimiento:%d-%m-%Y}"
+        elif vencimiento <= hoy + timedelta(days=DIAS_POR_VENCER):
+            alertas['por_vencer'] = f"{nombre} vence el {vencimiento:%d-%m-%Y}"
+
+    return alertas
+
+
+def evaluar_alertas(inventario_ids):
+    """
+    Sincronizar alertas_inventario con el estado actual de los productos indicados.
+
+    Con una cantidad fija de consultas por llamada, sin importar cuántos productos sean:
+      1. SELECT ... FOR UPDATE de los productos (ordenado por id); el bloqueo evita que dos
+         evaluaciones concurrentes del mismo producto creen la misma alerta dos veces
+      2. SELECT de las alertas vigentes de esos productos
+      3. bulk_create de las alertas nuevas
+      4. UPDATE de las alertas cuya condición ya no se cumple (resueltas automáticamente)
+      5. UPDATE de requiere_alerta en los productos cuyo valor cambió
+    Retorna (creadas, resueltas).
+    """
+    ids = sorted(set(inventario_ids))
+    if not ids:
+        return 0, 0
+
+    hoy = timezone.localdate()
+    ahora = timezone.now()
+    with transaction.atomic():
+        productos = list(
+            Inventario.objects.select_for_update()
+            .filter(pk__in=ids)
+            .order_by('pk')
+            .values(*CAMPOS_EVALUACION)
+        )
+        vigentes = {}
+        for alerta in (
+            AlertasInventario.objects.filter(ALERTA_VIGENTE, inventario_id__in=ids)
+            .values('id', 'inventario_id', 'tipo_alerta', 'estado')
+        ):
+            vigentes[(alerta['inventario_id'], alerta['tipo_alerta'])] = alerta
+
+        nuevas = []
+        requieren_alerta = set()
+        for producto in productos:
+            for tipo, mensaje in alertas_esperadas(producto, hoy).items():
+                alerta = vigentes.pop((producto['id'], tipo), None)
+                if alerta is None:
+                    nuevas.append(AlertasInventario(
+                        inventario_id_id=producto['id'],
+                        tipo_alerta=tipo,
+                        mensaje=mensaje,
+                        prioridad=PRIORIDAD_ALERTA[tipo],
+                    ))
+                if alerta is None or alerta['estado'] != 'ignorada':
+                    requieren_alerta.add(producto['id'])
+
+        # Lo que queda en vigentes ya no corresponde: las pendientes y revisadas se resuelven,
+        # y las ignoradas se cierran para que la condición pueda volver a alertar en el futuro
+        por_resolver = [a['id'] for a in vigentes.values() if a['estado'] != 'ignorada']
+        ignoradas = [a['id'] for a in vigentes.values() if a['estado'] == 'ignorada']
+
+        if nuevas:
+            AlertasInventario.objects.bulk_create(nuevas)
+        if por_resolver:
+            AlertasInventario.objects.filter(pk__in=por_resolver).update(
+                estado='resuelta',
+                fecha_resolucion=ahora,
+                notas_resolucion='Resuelta automáticamente: la condición ya no se cumple',
+            )
+        if ignoradas:
+            AlertasInventario.objects.filter(pk__in=ignoradas).update(fecha_resolucion=ahora)
+
+        activar = [p['id'] for p in productos if p['id'] in requieren_alerta and not p['requiere_alerta']]
+        desactivar = [p['id'] for p in productos if p['id'] not in requieren_alerta and p['requiere_alerta']]
+        if activar or desactivar:
+            # Un solo UPDATE: requiere_alerta queda en True solo para los ids de activar
+            Inventario.objects.filter(pk__in=activar + desactivar).update(
+                requiere_alerta=Case(When(pk__in=activar, then=Value(True)), default=Value(False))
+            )
+
+    return len(nuevas), len(por_resolver)
+
+
+def programar_evaluacion_alertas(inventario_ids):
+    """
+    Evaluar las alertas de los productos cuando la transacción en curso se confirme.
+    Así la venta o el movimiento no mantiene sus bloqueos mientras se evalúan las alertas,
+    y un fallo al evaluarlas no revierte el cambio de stock (el barrido lo corrige).
+    """
+    ids = list(inventario_ids)
+    if ids:
+        transaction.on_commit(lambda: evaluar_alertas(ids), robust=True)
+
+
+def barrer_alertas(queryset=None, tamano_lote=TAMANO_LOTE_ALERTAS):
+    """
+    Evaluar las alertas de todo el catálogo (o del queryset indicado) en lotes de productos.
+    Detecta además los cambios que dependen solo del paso de los días (por_vencer → vencido).
+    Retorna (productos, creadas, resueltas).
+    """
+    if queryset is None:
+        queryset = Inventario.objects.all()
+
+    productos = creadas = resueltas = 0
+    lote = []
+    for inventario_id in queryset.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=tamano_lote):
+        lote.append(inventario_id)
+        if len(lote) >= tamano_lote:
+            nuevas, cerradas = evaluar_alertas(lote)
+            productos, creadas, resueltas = productos + len(lote), creadas + nuevas, resueltas + cerradas
+            lote = []
+    if lote:
+        nuevas, cerradas = evaluar_alertas(lote)
+        productos, creadas, resueltas = productos + len(lote), creadas + nuevas, resueltas + cerradas
+    return productos, creadas, resueltas
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class InventarioConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'inventario'
+
+    def ready(self):
+        # Registrar la señal que reevalúa las alertas al guardar un producto
+        from . import signals  # noqa: F401
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+from inventario.alertas import TAMANO_LOTE_ALERTAS, barrer_alertas
+
+
+class Command(BaseCommand):
+    help = (
+        'Barrido periódico de alertas de inventario: evalúa stock y vencimiento de todo el catálogo '
+        'en lotes, crea las alertas que falten y resuelve las que ya no aplican. Pensado para cron diario.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=TAMANO_LOTE_ALERTAS, help='Productos por lote')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        productos, creadas, resueltas = barrer_alertas(tamano_lote=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{productos} productos evaluados en {time.perf_counter() - inicio:.2f}s: "
+            f"{creadas} alertas creadas, {resueltas} resueltas"
+        ))
@@ -1,8 +1,52 @@
 from rest_framework import serializers
 from .models import Inventario
+from .services import SIGNO_MOVIMIENTO
 from datetime import timedelta
 
 
+def _proveedor_id(obj):
+    """
+    Obtener el ID del proveedor a partir del valor crudo de la columna, sin activar la relación.
+    Retorna None si la columna todavía contiene texto (datos anteriores a la ForeignKey).
+    """
+    proveedor_value = obj.__dict__.get('proveedor_id', None)
+    if isinstance(proveedor_value, int):
+        return proveedor_value
+    if isinstance(proveedor_value, str) and proveedor_value.isdigit():
+        return int(proveedor_value)
+    return None
+
+
+def _proveedor_relacionado(obj):
+    """
+    Obtener el proveedor del producto. Las vistas cargan la relación con
+    select_related('proveedor'), por lo que no se ejecutan consultas por fila.
+    """
+    if _proveedor_id(obj) is None:
+        return None
+    try:
+        return obj.proveedor
+    except Exception:
+        return None
+
+
+def _proveedor_nombre(obj):
+    """
+    Obtener el nombre del proveedor. Si la columna todavía contiene el nombre como texto
+    (datos anteriores a la ForeignKey) se devuelve tal cual; si no hay proveedor,
+    se usa contacto_proveedor como respaldo.
+    """
+    proveedor = _proveedor_relacionado(obj)
+    if proveedor:
+        return proveedor.nombre
+    
+    proveedor_value = obj.__dict__.get('proveedor_id', None)
+    if isinstance(proveedor_value, str) and proveedor_value and not proveedor_value.isdigit():
+        return proveedor_value
+    
+    return getattr(obj, 'contacto_proveedor', None)
+
+
 class InventarioSerializer(serializers.ModelSerializer):
     categoria_display = serializers.CharField(source='get_categoria_display', read_only=True)
     unidad_medida_display = serializers.CharField(source='get_unidad_medida_display', read_only=True)
@@ -41,136 +85,24 @@ class InventarioSerializer(serializers.ModelSerializer):
     
     def get_proveedor(self, obj):
         """Obtener ID del proveedor sin activar la relación ForeignKey"""
-        try:
-            # Obtener el valor crudo del campo sin activar la relación
-            proveedor_value = obj.__dict__.get('proveedor_id', None)
-            if proveedor_value is None:
-                proveedor_value = obj.__dict__.get('proveedor', None)
-            
-            # Si es un número válido, devolverlo
-            if proveedor_value is not None:
-                if isinstance(proveedor_value, int):
-                    return proveedor_value
-                elif isinstance(proveedor_value, str) and proveedor_value.isdigit():
-                    return int(proveedor_value)
-        except (AttributeError, KeyError, ValueError, TypeError):
-            pass
-        return None
+        return _proveedor_id(obj)
     
     def get_proveedor_nombre(self, obj):
         """Obtener nombre del proveedor"""
-        try:
-            # Intentar obtener el valor crudo del campo sin activar la relación ForeignKey
-            # Esto previene errores si el campo todavía contiene texto en lugar de IDs
-            proveedor_value = None
-            
-            # Primero intentar obtener proveedor_id (si la migración se ejecutó)
-            try:
-                proveedor_value = obj.__dict__.get('proveedor_id', None)
-            except (AttributeError, KeyError):
-                pass
-            
-            # Si no hay proveedor_id, puede que todavía esté como 'proveedor' (texto)
-            if proveedor_value is None:
-                try:
-                    # Intentar obtener el valor directamente del dict sin activar la relación
-                    proveedor_value = obj.__dict__.get('proveedor', None)
-                except (AttributeError, KeyError):
-                    pass
-            
-            # Si tenemos un valor, intentar usarlo
-            if proveedor_value is not None:
-                try:
-                    # Si es un número válido (int o string que representa un número)
-                    if isinstance(proveedor_value, int):
-                        proveedor_id_int = proveedor_value
-                    elif isinstance(proveedor_value, str) and proveedor_value.isdigit():
-                        proveedor_id_int = int(proveedor_value)
-                    else:
-                        # Es texto (nombre del proveedor), no podemos hacer la relación
-                        return proveedor_value  # Devolver el nombre directamente
-                    
-                    # Si llegamos aquí, tenemos un ID válido
-                    from proveedores.models import Proveedor
-                    proveedor = Proveedor.objects.get(id=proveedor_id_int)
-                    return proveedor.nombre
-                except (ValueError, TypeError, Proveedor.DoesNotExist, AttributeError):
-                    # Si falla, puede que sea texto, devolverlo como está
-                    if isinstance(proveedor_value, str):
-                        return proveedor_value
-                    pass
-        except Exception:
-            pass
-        
-        # Fallback: devolver contacto_proveedor si existe
-        return obj.contacto_proveedor if hasattr(obj, 'contacto_proveedor') else None
+        return _proveedor_nombre(obj)
     
     def get_proveedor_telefono(self, obj):
         """Obtener teléfono del proveedor"""
-        try:
-            proveedor_value = None
-            try:
-                proveedor_value = obj.__dict__.get('proveedor_id', None)
-            except (AttributeError, KeyError):
-                pass
-            
-            if proveedor_value is None:
-                try:
-                    proveedor_value = obj.__dict__.get('proveedor', None)
-                except (AttributeError, KeyError):
-                    pass
-            
-            if proveedor_value is not None:
-                try:
-                    if isinstance(proveedor_value, int):
-                        proveedor_id_int = proveedor_value
-                    elif isinstance(proveedor_value, str) and proveedor_value.isdigit():
-                        proveedor_id_int = int(proveedor_value)
-                    else:
-                        # Es texto, no podemos obtener el teléfono
-                        return None
-                    
-                    from proveedores.models import Proveedor
-                    proveedor = Proveedor.objects.get(id=proveedor_id_int)
-                    return proveedor.telefono or proveedor.celular
-                except (ValueError, TypeError, Proveedor.DoesNotExist, AttributeError):
-                    pass
-        except Exception:
-            pass
+        proveedor = _proveedor_relacionado(obj)
+        if proveedor:
+            return proveedor.telefono or proveedor.celular
         return None
     
     def get_proveedor_email(self, obj):
         """Obtener email del proveedor"""
-        try:
-            proveedor_value = None
-            try:
-                proveedor_value = obj.__dict__.get('proveedor_id', None)
-            except (AttributeError, KeyError):
-                pass
-            
-            if proveedor_value is None:
-                try:
-                    proveedor_value = obj.__dict__.get('proveedor', None)
-                except (AttributeError, KeyError):
-                    pass
-            
-            if proveedor_value is not None:
-                try:
-                    if isinstance(proveedor_value, int):
-                        proveedor_id_int = proveedor_value
-                    elif isinstance(proveedor_value, str) and proveedor_value.isdigit():
-                        proveedor_id_int = int(proveedor_value)
-                    else:
-                        # Es texto, no podemos obtener el email
-                        return None
-                    
-                    from proveedores.models import Proveedor
-                    proveedor = Proveedor.objects.get(id=proveedor_id_int)
-                    return proveedor.email or proveedor.email_contacto
-                except (ValueError, TypeError, Proveedor.DoesNotExist, AttributeError):
-                    pass
-        except Exception:
-            pass
+        proveedor = _proveedor_relacionado(obj)
+        if proveedor:
+            return proveedor.email or proveedor.email_contacto
         return None
     
     class Meta:
@@ -366,70 +298,9 @@ class InventarioListSerializer(serializers.ModelSerializer):
             return int(obj.precio_venta - obj.precio_unitario)
         return None
     
-    def get_proveedor(self, obj):
-        """Obtener ID del proveedor sin activar la relación ForeignKey"""
-        try:
-            # Obtener el valor crudo del campo sin activar la relación
-            proveedor_value = obj.__dict__.get('proveedor_id', None)
-            if proveedor_value is None:
-                proveedor_value = obj.__dict__.get('proveedor', None)
-            
-            # Si es un número válido, devolverlo
-            if proveedor_value is not None:
-                if isinstance(proveedor_value, int):
-                    return proveedor_value
-                elif isinstance(proveedor_value, str) and proveedor_value.isdigit():
-                    return int(proveedor_value)
-        except (AttributeError, KeyError, ValueError, TypeError):
-            pass
-        return None
-    
     def get_proveedor_nombre(self, obj):
         """Obtener nombre del proveedor"""
-        try:
-            # Intentar obtener el valor crudo del campo sin activar la relación ForeignKey
-            proveedor_value = None
-            
-            # Primero intentar obtener proveedor_id (si la migración se ejecutó)
-            try:
-                proveedor_value = obj.__dict__.get('proveedor_id', None)
-            except (AttributeError, KeyError):
-                pass
-            
-            # Si no hay proveedor_id, puede que todavía esté como 'proveedor' (texto)
-            if proveedor_value is None:
-                try:
-                    # Intentar obtener el valor directamente del dict sin activar la relación
-                    proveedor_value = obj.__dict__.get('proveedor', None)
-                except (AttributeError, KeyError):
-                    pass
-            
-            # Si tenemos un valor, intentar usarlo
-            if proveedor_value is not None:
-                try:
-                    # Si es un número válido (int o string que representa un número)
-                    if isinstance(proveedor_value, int):
-                        proveedor_id_int = proveedor_value
-                    elif isinstance(proveedor_value, str) and proveedor_value.isdigit():
-                        proveedor_id_int = int(proveedor_value)
-                    else:
-                        # Es texto (nombre del proveedor), devolverlo directamente
-                        return proveedor_value
-                    
-                    # Si llegamos aquí, tenemos un ID válido
-                    from proveedores.models import Proveedor
-                    proveedor = Proveedor.objects.get(id=proveedor_id_int)
-                    return proveedor.nombre
-                except (ValueError, TypeError, Proveedor.DoesNotExist, AttributeError):
-                    # Si falla, puede que sea texto, devolverlo como está
-                    if isinstance(proveedor_value, str):
-                        return proveedor_value
-                    pass
-        except Exception:
-            pass
-        
-        # Fallback: devolver contacto_proveedor si existe
-        return obj.contacto_proveedor if hasattr(obj, 'contacto_proveedor') else None
+        return _proveedor_nombre(obj)
     
     def get_proveedor(self, obj):
         """Obtener nombre del proveedor para compatibilidad con el frontend"""
@@ -447,5 +318,23 @@ class InventarioStatsSerializer(serializers.Serializer):
     stock_bajo = serializers.IntegerField()
     valor_total_inventario = serializers.IntegerField()
     categorias_distribucion = serializers.DictField()
+    grupos = serializers.ListField(child=serializers.DictField(), required=False)
+
 
+class MovimientoLoteSerializer(serializers.Serializer):
+    """Valida una línea de POST /api/inventario/movimientos/bulk/ sin consultar la base de datos"""
+    inventario_id = serializers.IntegerField(min_value=1)
+    tipo_movimiento = serializers.ChoiceField(choices=list(SIGNO_MOVIMIENTO))
+    cantidad = serializers.IntegerField(min_value=1)
+    precio_unitario = serializers.IntegerField(min_value=0, required=False, allow_null=True)
+    motivo = serializers.CharField(max_length=255, required=False, allow_blank=True, allow_null=True)
+    documento_referencia = serializers.CharField(max_length=100, required=False, allow_blank=True, allow_null=True)
+    proveedor = serializers.CharField(max_length=100, required=False, allow_blank=True, allow_null=True)
+    ubicacion_origen = serializers.CharField(max_length=100, required=False, allow_blank=True, allow_null=True)
+    ubicacion_destino = serializers.CharField(max_length=100, required=False, allow_blank=True, allow_null=True)
+    notas = serializers.CharField(required=False, allow_blank=True, allow_null=True)
 
+    def validate(self, data):
+        if data['tipo_movimiento'] == 'transferencia' and not data.get('ubicacion_destino'):
+            raise serializers.ValidationError({'ubicacion_destino': 'Una transferencia requiere ubicacion_destino.'})
+        return data
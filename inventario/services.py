@@ -0,0 +1,204 @@
+from django.db.models import Case, CharField, F, IntegerField, Q, TextField, Value, When
+from django.db.models.functions import Concat
+from django.db.models.lookups import LessThanOrEqual
+from django.utils import timezone
+from .alertas import programar_evaluacion_alertas
+from .models import Inventario, MovimientosInventario
+
+
+TIPOS_ACTUALIZACION_STOCK = ('ingreso', 'egreso', 'ajuste')
+
+# Efecto de cada tipo de movimiento sobre cantidad_actual. Los ajustes (valor absoluto)
+# se hacen con update_stock; una transferencia descuenta el stock que sale hacia ubicacion_destino.
+SIGNO_MOVIMIENTO = {
+    'ingreso': 1,
+    'devolucion': 1,
+    'salida': -1,
+    'merma': -1,
+    'venta': -1,
+    'transferencia': -1,
+}
+
+# Productos por sentencia UPDATE y filas por INSERT al aplicar movimientos en lote
+TAMANO_LOTE_MOVIMIENTOS = 500
+
+
+def estado_segun_stock(nueva_cantidad):
+    """
+    Expresión SQL con el estado del producto según la cantidad resultante:
+    agotado si queda en 0 o menos, por_vencer si queda bajo el mínimo y disponible en otro caso.
+    """
+    return Case(
+        When(LessThanOrEqual(nueva_cantidad, 0), then=Value(Inventario.Estado.AGOTADO)),
+        When(LessThanOrEqual(nueva_cantidad, F('cantidad_minima')), then=Value(Inventario.Estado.POR_VENCER)),
+        default=Value(Inventario.Estado.DISPONIBLE),
+        output_field=CharField(),
+    )
+
+
+def nota_agregada(notas):
+    """Expresión SQL que agrega una línea con fecha al final de la columna notas"""
+    linea = f"[{timezone.now().strftime('%Y-%m-%d %H:%M')}] {notas}"
+    return Case(
+        When(Q(notas__isnull=True) | Q(notas=''), then=Value(linea)),
+        default=Concat(F('notas'), Value(f"\n{linea}")),
+        output_field=TextField(),
+    )
+
+
+def actualizar_stock(inventario_id, tipo, cantidad, notas='', empleado_id=None, queryset=None):
+    """
+    Aplicar un ingreso, egreso o ajuste de stock con un único UPDATE.
+
+    La cantidad se calcula en la base de datos con F(), por lo que actualizaciones concurrentes
+    del mismo producto no se pisan. En un egreso la condición cantidad_actual >= cantidad forma
+    parte del WHERE, así el stock nunca queda negativo.
+    Retorna True si se actualizó el producto; False si no existe en el queryset o el stock no alcanza.
+    """
+    if queryset is None:
+        queryset = Inventario.objects.all()
+    queryset = queryset.filter(pk=inventario_id)
+
+    if tipo == 'ingreso':
+        nueva_cantidad = F('cantidad_actual') + cantidad
+    elif tipo == 'egreso':
+        nueva_cantidad = F('cantidad_actual') - cantidad
+        queryset = queryset.filter(cantidad_actual__gte=cantidad)
+    else:  # ajuste
+        nueva_cantidad = Value(cantidad)
+
+    ahora = timezone.now()
+    # MySQL evalúa las asignaciones de un UPDATE de izquierda a derecha usando los valores ya
+    # asignados, por eso las columnas que dependen de cantidad_actual se asignan antes que ella
+    cambios = {'estado': estado_segun_stock(nueva_cantidad)}
+    if notas:
+        cambios['notas'] = nota_agregada(notas)
+    if tipo == 'ingreso':
+        cambios['fecha_ultimo_ingreso'] = ahora
+    if empleado_id is not None:
+        cambios['actualizado_por_id'] = empleado_id
+    cambios['fecha_actualizacion'] = ahora
+    cambios['cantidad_actual'] = nueva_cantidad
+
+    actualizado = queryset.update(**cambios) == 1
+    if actualizado:
+        programar_evaluacion_alertas([inventario_id])
+    return actualizado
+
+
+def aplicar_deltas_stock(deltas, ids_con_ingreso=(), ahora=None):
+    """
+    Sumar a cada producto su variación neta de stock ({inventario_id: delta}) con un UPDATE
+    por cada lote de productos, usando CASE + F() en lugar de un UPDATE por producto.
+    """
+    ahora = ahora or timezone.now()
+    ids_con_ingreso = set(ids_con_ingreso)
+    items = [(pk, delta) for pk, delta in deltas.items() if delta or pk in ids_con_ingreso]
+
+    for inicio in range(0, len(items), TAMANO_LOTE_MOVIMIENTOS):
+        lote = items[inicio:inicio + TAMANO_LOTE_MOVIMIENTOS]
+        ids = [pk for pk, _ in lote]
+        variacion = Case(
+            *[When(pk=pk, then=Value(delta)) for pk, delta in lote],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+        nueva_cantidad = F('cantidad_actual') + variacion
+
+        # Igual que en actualizar_stock, las columnas derivadas se asignan antes que cantidad_actual
+        cambios = {'estado': estado_segun_stock(nueva_cantidad)}
+        ingresos_lote = [pk for pk in ids if pk in ids_con_ingreso]
+        if ingresos_lote:
+            cambios['fecha_ultimo_ingreso'] = Case(
+                When(pk__in=ingresos_lote, then=Value(ahora)),
+                default=F('fecha_ultimo_ingreso'),
+            )
+        cambios['fecha_actualizacion'] = ahora
+        cambios['cantidad_actual'] = nueva_cantidad
+
+        Inventario.objects.filter(pk__in=ids).update(**cambios)
+
+
+def registrar_movimientos(lineas, empleado_id=None, todo_o_nada=False):
+    """
+    Aplicar una lista de movimientos de stock y registrarlos en movimientos_inventario.
+    Debe ejecutarse dentro de transaction.atomic().
+
+    Cada línea es un dict con inventario_id, tipo_movimiento (ver SIGNO_MOVIMIENTO), cantidad > 0
+    y opcionalmente precio_unitario, motivo, documento_referencia, proveedor, ubicacion_origen,
+    ubicacion_destino y notas. Los productos se bloquean con una sola consulta SELECT ... FOR UPDATE,
+    las líneas se validan en orden contra el stock resultante, y luego se escribe con un UPDATE
+    agrupado por lote de productos y bulk_create de los movimientos.
+
+    Retorna (resultados, aplicado): un resultado por línea en el mismo orden, y si se escribió algo.
+    Con todo_o_nada=True no se escribe nada si alguna línea es rechazada.
+    """
+    ids = {linea['inventario_id'] for linea in lineas}
+    # Orden por id para que transacciones concurrentes bloqueen las filas en el mismo orden
+    productos = {
+        producto['id']: producto
+        for producto in Inventario.objects.select_for_update()
+        .filter(pk__in=ids, activo=True)
+        .order_by('pk')
+        .values('id', 'cantidad_actual', 'precio_unitario')
+    }
+
+    stock = {pk: producto['cantidad_actual'] for pk, producto in productos.items()}
+    ids_con_ingreso = set()
+    movimientos = []
+    resultados = []
+    ahora = timezone.now()
+
+    for linea in lineas:
+        inventario_id = linea['inventario_id']
+        tipo = linea['tipo_movimiento']
+        cantidad = linea['cantidad']
+        resultado = {'inventario_id': inventario_id, 'tipo_movimiento': tipo, 'cantidad': cantidad}
+        resultados.append(resultado)
+
+        if inventario_id not in productos:
+            resultado.update(ok=False, error='Producto no encontrado')
+            continue
+
+        cantidad_anterior = stock[inventario_id]
+        cantidad_nueva = cantidad_anterior + SIGNO_MOVIMIENTO[tipo] * cantidad
+        if cantidad_nueva < 0:
+            resultado.update(
+                ok=False,
+                error=f'No se puede tener stock negativo (disponible: {cantidad_anterior})'
+            )
+            continue
+
+        stock[inventario_id] = cantidad_nueva
+        if tipo == 'ingreso':
+            ids_con_ingreso.add(inventario_id)
+
+        precio_unitario = linea.get('precio_unitario')
+        if precio_unitario is None:
+            precio_unitario = productos[inventario_id]['precio_unitario']
+        movimientos.append(MovimientosInventario(
+            inventario_id_id=inventario_id,
+            tipo_movimiento=tipo,
+            cantidad=cantidad,
+            cantidad_anterior=cantidad_anterior,
+            cantidad_nueva=cantidad_nueva,
+            precio_unitario=precio_unitario,
+            costo_total=precio_unitario * cantidad if precio_unitario is not None else None,
+            motivo=linea.get('motivo'),
+            documento_referencia=linea.get('documento_referencia'),
+            proveedor=linea.get('proveedor'),
+            empleado_id_id=empleado_id,
+            ubicacion_origen=linea.get('ubicacion_origen'),
+            ubicacion_destino=linea.get('ubicacion_destino'),
+            notas=linea.get('notas'),
+        ))
+        resultado.update(ok=True, cantidad_anterior=cantidad_anterior, cantidad_nueva=cantidad_nueva)
+
+    if not movimientos or (todo_o_nada and len(movimientos) != len(lineas)):
+        return resultados, False
+
+    deltas = {pk: stock[pk] - productos[pk]['cantidad_actual'] for pk in productos}
+    aplicar_deltas_stock(deltas, ids_con_ingreso, ahora)
+    MovimientosInventario.objects.bulk_create(movimientos, batch_size=TAMANO_LOTE_MOVIMIENTOS)
+    programar_evaluacion_alertas(pk for pk, delta in deltas.items() if delta)
+    return resultados, True
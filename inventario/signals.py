@@ -0,0 +1,18 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .alertas import programar_evaluacion_alertas
+from .models import Inventario
+
+
+@receiver(post_save, sender=Inventario)
+def evaluar_alertas_producto(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Reevaluar las alertas cuando se guarda un producto (creación, edición o admin), ya que
+    puede cambiar el stock, los umbrales o la fecha de vencimiento. Los cambios de stock
+    hechos con UPDATE en services.py programan su propia evaluación.
+    """
+    if raw:
+        return
+    if update_fields is not None and set(update_fields) <= {'requiere_alerta', 'fecha_actualizacion'}:
+        return
+    programar_evaluacion_alertas([instance.pk])
@@ -1,11 +1,16 @@
-from django.test import TestCase
+import threading
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.utils import timezone
 from datetime import timedelta
 from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import Inventario
+from .alertas import ALERTA_VIGENTE, barrer_alertas
+from .models import Inventario, MovimientosInventario, AlertasInventario
+from .services import actualizar_stock
 
 
 class InventarioModelTest(TestCase):
@@ -291,4 +296,363 @@ class InventarioAPITest(APITestCase):
         url = reverse('inventario-list')
         response = self.client.get(url)
         
-        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+class InventarioQueryCountTest(APITestCase):
+    """Pruebas de regresión: listar productos no debe ejecutar consultas por fila"""
+    
+    def setUp(self):
+        """Configurar datos de prueba"""
+        from datetime import date
+        from empleado.models import Empleado
+        from proveedores.models import Proveedor
+        
+        self.empleado = Empleado.objects.create(
+            rut='11111111-1',
+            nombre='Test',
+            apellido_paterno='Inventario',
+            cargo='Barista',
+            fecha_contratacion=date.today()
+        )
+        self.proveedor = Proveedor.objects.create(
+            nombre='Proveedor Test',
+            telefono='+56911111111',
+            email='proveedor@example.com'
+        )
+        self.siguiente = 0
+    
+    def crear_productos(self, cantidad):
+        for _ in range(cantidad):
+            self.siguiente += 1
+            Inventario.objects.create(
+                codigo_producto=f'QC-{self.siguiente:04d}',
+                nombre_producto=f'Producto {self.siguiente}',
+                categoria=Inventario.Categoria.CAFE,
+                unidad_medida=Inventario.UnidadMedida.KILOGRAMO,
+                cantidad_actual=10,
+                cantidad_minima=5,
+                proveedor=self.proveedor,
+                creado_por=self.empleado,
+                actualizado_por=self.empleado
+            )
+    
+    def contar_consultas(self, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(consultas), response
+    
+    def test_list_query_count_is_constant(self):
+        """El número de consultas del listado no depende de la cantidad de productos"""
+        url = reverse('inventario-list')
+        
+        self.crear_productos(2)
+        consultas_pocos, _ = self.contar_consultas(url)
+        
+        self.crear_productos(30)
+        consultas_muchos, response = self.contar_consultas(url)
+        
+        self.assertEqual(consultas_pocos, consultas_muchos)
+        self.assertLessEqual(consultas_muchos, 2)
+        self.assertEqual(len(response.data), 32)
+        self.assertEqual(response.data[0]['proveedor_nombre'], 'Proveedor Test')
+    
+    def test_detail_reads_joined_supplier(self):
+        """El detalle obtiene nombre, teléfono y email del proveedor en una sola consulta"""
+        self.crear_productos(1)
+        producto = Inventario.objects.get()
+        url = reverse('inventario-detail', kwargs={'pk': producto.pk})
+        
+        consultas, response = self.contar_consultas(url)
+        
+        self.assertEqual(consultas, 1)
+        self.assertEqual(response.data['proveedor_nombre'], 'Proveedor Test')
+        self.assertEqual(response.data['proveedor_telefono'], '+56911111111')
+        self.assertEqual(response.data['proveedor_email'], 'proveedor@example.com')
+    
+    def test_contacto_proveedor_fallback(self):
+        """Sin proveedor asociado se usa contacto_proveedor como nombre"""
+        Inventario.objects.create(
+            codigo_producto='QC-SIN-PROV',
+            nombre_producto='Producto sin proveedor',
+            categoria=Inventario.Categoria.CAFE,
+            unidad_medida=Inventario.UnidadMedida.KILOGRAMO,
+            cantidad_actual=10,
+            cantidad_minima=5,
+            contacto_proveedor='Distribuidora Local'
+        )
+        
+        _, response = self.contar_consultas(reverse('inventario-list'))
+        
+        self.assertEqual(response.data[0]['proveedor_nombre'], 'Distribuidora Local')
+    
+    def test_cursor_pagination_is_opt_in(self):
+        """Sin ?page_size= se mantiene la lista completa; con él se recorre por cursor sin repetir filas"""
+        self.crear_productos(5)
+        url = reverse('inventario-list')
+        
+        response = self.client.get(url)
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), 5)
+        
+        ids = []
+        response = self.client.get(url, {'page_size': 2})
+        while True:
+            self.assertLessEqual(len(response.data['results']), 2)
+            ids.extend(item['id'] for item in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        
+        self.assertEqual(ids, sorted(Inventario.objects.values_list('id', flat=True), reverse=True))
+
+
+
+class InventarioMovimientosBulkTest(APITestCase):
+    """Pruebas para POST /api/inventario/movimientos/bulk/"""
+    
+    def setUp(self):
+        self.producto = Inventario.objects.create(
+            codigo_producto='BULK-001',
+            nombre_producto='Producto Bulk',
+            categoria=Inventario.Categoria.CAFE,
+            unidad_medida=Inventario.UnidadMedida.UNIDAD,
+            cantidad_actual=10,
+            cantidad_minima=5,
+            precio_unitario=1000
+        )
+        self.url = reverse('inventario-movimientos-bulk')
+    
+    def test_bulk_applies_valid_lines_and_reports_each_line(self):
+        movimientos = [
+            {'inventario_id': self.producto.pk, 'tipo_movimiento': 'ingreso', 'cantidad': 5},
+            {'inventario_id': self.producto.pk, 'tipo_movimiento': 'venta', 'cantidad': 12},
+            {'inventario_id': self.producto.pk, 'tipo_movimiento': 'merma', 'cantidad': 50},
+            {'inventario_id': 999999, 'tipo_movimiento': 'salida', 'cantidad': 1},
+        ]
+        
+        response = self.client.post(self.url, {'movimientos': movimientos}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['aplicados'], 2)
+        self.assertEqual([r['ok'] for r in response.data['resultados']], [True, True, False, False])
+        self.assertEqual(response.data['resultados'][1]['cantidad_nueva'], 3)
+        
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.cantidad_actual, 3)
+        self.assertEqual(self.producto.estado, Inventario.Estado.POR_VENCER)
+        movimientos_creados = MovimientosInventario.objects.order_by('id')
+        self.assertEqual(
+            list(movimientos_creados.values_list('tipo_movimiento', 'cantidad_anterior', 'cantidad_nueva', 'costo_total')),
+            [('ingreso', 10, 15, 5000), ('venta', 15, 3, 12000)]
+        )
+    
+    def test_bulk_all_or_nothing(self):
+        movimientos = [
+            {'inventario_id': self.producto.pk, 'tipo_movimiento': 'venta', 'cantidad': 1},
+            {'inventario_id': self.producto.pk, 'tipo_movimiento': 'venta', 'cantidad': 100},
+        ]
+        
+        response = self.client.post(self.url, {'movimientos': movimientos, 'todo_o_nada': True}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['aplicados'], 0)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.cantidad_actual, 10)
+        self.assertFalse(MovimientosInventario.objects.exists())
+        
+        # "false" como texto no activa el modo todo o nada
+        response = self.client.post(self.url, {'movimientos': movimientos, 'todo_o_nada': 'false'}, format='json')
+        self.assertEqual(response.data['aplicados'], 1)
+
+
+class InventarioExportacionTest(APITestCase):
+    """Pruebas para la exportación en streaming de productos y movimientos"""
+    
+    def setUp(self):
+        for i in range(5):
+            Inventario.objects.create(
+                codigo_producto=f'EXP-{i:03d}',
+                nombre_producto=f'Producto, "{i}"',
+                categoria=Inventario.Categoria.CAFE if i % 2 == 0 else Inventario.Categoria.INSUMOS,
+                unidad_medida=Inventario.UnidadMedida.UNIDAD,
+                cantidad_actual=10,
+                cantidad_minima=1
+            )
+    
+    def contenido(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode('utf-8')
+    
+    def test_export_csv_and_ndjson_respect_filters(self):
+        import csv
+        import json
+        
+        response = self.client.get(reverse('inventario-export'), {'format': 'csv', 'categoria': 'cafe'})
+        filas = list(csv.reader(self.contenido(response).splitlines()))
+        self.assertEqual(filas[0][:3], ['id', 'codigo_producto', 'nombre_producto'])
+        self.assertEqual([fila[1] for fila in filas[1:]], ['EXP-000', 'EXP-002', 'EXP-004'])
+        self.assertEqual(filas[1][2], 'Producto, "0"')
+        
+        response = self.client.get(reverse('inventario-export'), {'format': 'ndjson'})
+        lineas = [json.loads(linea) for linea in self.contenido(response).splitlines()]
+        self.assertEqual(len(lineas), 5)
+        self.assertEqual(lineas[0]['cantidad_actual'], 10)
+        
+        response = self.client.get(reverse('inventario-export'), {'format': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_export_reads_in_keyset_chunks(self):
+        from api.exportacion import _filas_por_lotes
+        
+        with CaptureQueriesContext(connection) as consultas:
+            filas = list(_filas_por_lotes(Inventario.objects.all(), ['codigo_producto'], tamano_chunk=2))
+        
+        self.assertEqual([fila[0] for fila in filas], [f'EXP-{i:03d}' for i in range(5)])
+        self.assertEqual(len(consultas), 3)
+    
+    def test_export_movements_by_type(self):
+        producto = Inventario.objects.get(codigo_producto='EXP-000')
+        registrar = [
+            {'inventario_id': producto.pk, 'tipo_movimiento': 'ingreso', 'cantidad': 5},
+            {'inventario_id': producto.pk, 'tipo_movimiento': 'merma', 'cantidad': 2},
+        ]
+        self.client.post(reverse('inventario-movimientos-bulk'), {'movimientos': registrar}, format='json')
+        
+        response = self.client.get(
+            reverse('inventario-movimientos-export'), {'format': 'csv', 'tipo_movimiento': 'merma'}
+        )
+        lineas = self.contenido(response).splitlines()
+        self.assertEqual(len(lineas), 2)
+        self.assertIn(',merma,2,15,13,', lineas[1])
+
+
+class AlertasInventarioTest(APITestCase):
+    """Pruebas del motor de alertas de inventario"""
+    
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.producto = Inventario.objects.create(
+                codigo_producto='ALR-001',
+                nombre_producto='Leche',
+                categoria=Inventario.Categoria.ALIMENTOS,
+                unidad_medida=Inventario.UnidadMedida.LITRO,
+                cantidad_actual=20,
+                cantidad_minima=10,
+                cantidad_maxima=30
+            )
+    
+    def vigentes(self):
+        return sorted(self.producto.alertas.filter(ALERTA_VIGENTE).values_list('tipo_alerta', 'estado'))
+    
+    def egreso(self, cantidad):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(actualizar_stock(self.producto.pk, 'egreso', cantidad))
+    
+    def test_stock_changes_open_dedupe_and_resolve_alerts(self):
+        self.assertEqual(self.vigentes(), [])
+        
+        self.egreso(12)
+        self.egreso(1)
+        self.assertEqual(self.vigentes(), [('stock_bajo', 'pendiente')])
+        
+        self.egreso(4)
+        self.assertEqual(self.vigentes(), [('stock_critico', 'pendiente')])
+        self.assertEqual(
+            self.producto.alertas.get(tipo_alerta='stock_bajo').estado, 'resuelta'
+        )
+        self.producto.refresh_from_db()
+        self.assertTrue(self.producto.requiere_alerta)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            actualizar_stock(self.producto.pk, 'ingreso', 40)
+        self.assertEqual(self.vigentes(), [('sobre_stock', 'pendiente')])
+    
+    def test_ignored_alert_is_not_recreated(self):
+        self.egreso(12)
+        self.producto.alertas.update(estado='ignorada')
+        
+        self.egreso(1)
+        self.assertEqual(self.vigentes(), [('stock_bajo', 'ignorada')])
+        self.producto.refresh_from_db()
+        self.assertFalse(self.producto.requiere_alerta)
+    
+    def test_sweep_detects_expiry_with_constant_queries(self):
+        hoy = timezone.localdate()
+        Inventario.objects.filter(pk=self.producto.pk).update(fecha_vencimiento=hoy - timedelta(days=1))
+        for i in range(30):
+            Inventario.objects.create(
+                codigo_producto=f'ALR-{i + 2:03d}',
+                nombre_producto=f'Producto {i}',
+                categoria=Inventario.Categoria.ALIMENTOS,
+                unidad_medida=Inventario.UnidadMedida.UNIDAD,
+                cantidad_actual=1,
+                cantidad_minima=5,
+                fecha_vencimiento=hoy + timedelta(days=5)
+            )
+        
+        with CaptureQueriesContext(connection) as consultas:
+            productos, creadas, _ = barrer_alertas()
+        
+        self.assertEqual(productos, 31)
+        self.assertEqual(creadas, 1 + 30 * 2)
+        self.assertLessEqual(len(consultas), 8)
+        self.assertEqual(self.vigentes(), [('producto_vencido', 'pendiente')])
+        self.assertEqual(barrer_alertas()[1:], (0, 0))
+
+
+class InventarioStockConcurrenciaTest(TransactionTestCase):
+    """Egresos concurrentes sobre el mismo producto no pierden actualizaciones ni dejan stock negativo"""
+    
+    def setUp(self):
+        # Se revisa aquí y no con @skipIf: la base de pruebas recién existe al ejecutar el test
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('SQLite en memoria no admite escrituras concurrentes desde varios hilos')
+    
+    def test_concurrent_egresos_do_not_lose_updates(self):
+        stock_inicial = 60
+        hilos = 12
+        egresos_por_hilo = 10  # 120 intentos sobre 60 unidades
+        producto = Inventario.objects.create(
+            codigo_producto='CONC-001',
+            nombre_producto='Producto concurrente',
+            categoria=Inventario.Categoria.CAFE,
+            unidad_medida=Inventario.UnidadMedida.UNIDAD,
+            cantidad_actual=stock_inicial,
+            cantidad_minima=5
+        )
+        exitos = []
+        errores = []
+        barrera = threading.Barrier(hilos)
+        
+        def descontar():
+            try:
+                barrera.wait()
+                for _ in range(egresos_por_hilo):
+                    if actualizar_stock(producto.pk, 'egreso', 1):
+                        exitos.append(1)
+            except Exception as e:
+                errores.append(e)
+            finally:
+                connection.close()
+        
+        trabajadores = [threading.Thread(target=descontar) for _ in range(hilos)]
+        for trabajador in trabajadores:
+            trabajador.start()
+        for trabajador in trabajadores:
+            trabajador.join()
+        
+        self.assertEqual(errores, [])
+        producto.refresh_from_db()
+        self.assertEqual(len(exitos), stock_inicial)
+        self.assertEqual(producto.cantidad_actual, 0)
+        self.assertEqual(producto.estado, Inventario.Estado.AGOTADO)
+        # Cada egreso reevalúa las alertas; al final queda una sola alerta vigente, sin duplicados
+        self.assertEqual(
+            list(producto.alertas.filter(ALERTA_VIGENTE).values_list('tipo_alerta', flat=True)),
+            ['sin_stock']
+        )
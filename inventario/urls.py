@@ -18,8 +18,9 @@ urlpatterns = [
 # PUT    /api/inventario/{id}/               - Actualizar inventario completo
 # PATCH  /api/inventario/{id}/               - Actualizar inventario parcial
 # DELETE /api/inventario/{id}/               - Eliminar inventario
-# GET    /api/inventario/stats/              - Estadísticas del inventario
+# GET    /api/inventario/stats/              - Estadísticas del inventario (?group_by=proveedor|ubicacion)
 # POST   /api/inventario/{id}/update_stock/  - Actualizar stock
+# POST   /api/inventario/movimientos/bulk/   - Registrar movimientos de stock en lote
 # GET    /api/inventario/low_stock/          - Productos con stock bajo
 # GET    /api/inventario/expiring_soon/      - Productos por vencer
 # GET    /api/inventario/expired/            - Productos vencidos
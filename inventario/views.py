@@ -2,18 +2,61 @@ from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db import transaction
 from django.db.models import Q, Sum, Count, F
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date, timedelta
+from decimal import Decimal, InvalidOperation
 import traceback
-from .models import Inventario
+from api.exportacion import RENDERERS_EXPORTACION, formato_exportacion, respuesta_exportacion
+from .models import Inventario, MovimientosInventario
+from .services import TIPOS_ACTUALIZACION_STOCK, actualizar_stock, registrar_movimientos
 from .serializer import (
     InventarioSerializer, 
     InventarioCreateSerializer, 
     InventarioUpdateSerializer,
     InventarioListSerializer,
-    InventarioStatsSerializer
+    InventarioStatsSerializer,
+    MovimientoLoteSerializer
 )
+from empleado.services import resolver_empleado_por_rut
+
+# Máximo de líneas aceptadas por POST /api/inventario/movimientos/bulk/
+MAX_MOVIMIENTOS_POR_SOLICITUD = 1000
+
+# Columnas de GET /api/inventario/export/ y /api/inventario/movimientos/export/: (columna, lookup)
+CAMPOS_EXPORTACION_INVENTARIO = [
+    ('id', 'id'),
+    ('codigo_producto', 'codigo_producto'),
+    ('nombre_producto', 'nombre_producto'),
+    ('categoria', 'categoria'),
+    ('unidad_medida', 'unidad_medida'),
+    ('cantidad_actual', 'cantidad_actual'),
+    ('cantidad_minima', 'cantidad_minima'),
+    ('cantidad_maxima', 'cantidad_maxima'),
+    ('precio_unitario', 'precio_unitario'),
+    ('precio_venta', 'precio_venta'),
+    ('estado', 'estado'),
+    ('proveedor', 'proveedor__nombre'),
+    ('ubicacion', 'ubicacion'),
+    ('fecha_vencimiento', 'fecha_vencimiento'),
+    ('fecha_actualizacion', 'fecha_actualizacion'),
+]
+CAMPOS_EXPORTACION_MOVIMIENTOS = [
+    ('id', 'id'),
+    ('fecha_movimiento', 'fecha_movimiento'),
+    ('inventario_id', 'inventario_id_id'),
+    ('codigo_producto', 'inventario_id__codigo_producto'),
+    ('tipo_movimiento', 'tipo_movimiento'),
+    ('cantidad', 'cantidad'),
+    ('cantidad_anterior', 'cantidad_anterior'),
+    ('cantidad_nueva', 'cantidad_nueva'),
+    ('precio_unitario', 'precio_unitario'),
+    ('costo_total', 'costo_total'),
+    ('motivo', 'motivo'),
+    ('documento_referencia', 'documento_referencia'),
+    ('empleado_id', 'empleado_id_id'),
+]
 
 class InventarioViewSet(viewsets.ModelViewSet):
     """
@@ -26,6 +69,7 @@ class InventarioViewSet(viewsets.ModelViewSet):
     search_fields = ['codigo_producto', 'nombre_producto', 'descripcion', 'proveedor__nombre']
     ordering_fields = ['nombre_producto', 'cantidad_actual', 'fecha_creacion', 'fecha_vencimiento']
     ordering = ['-fecha_creacion']
+    cursor_ordering = ('-fecha_creacion', '-id')
 
     def get_serializer_class(self):
         """Retornar el serializer apropiado según la acción"""
@@ -39,7 +83,8 @@ class InventarioViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """Filtrar queryset según parámetros adicionales"""
-        queryset = super().get_queryset()
+        # Cargar proveedor y empleados en el mismo JOIN para evitar consultas por fila en los serializers
+        queryset = super().get_queryset().select_related('proveedor', 'creado_por', 'actualizado_por')
         
         # Filtro para stock bajo
         if self.request.query_params.get('low_stock') == 'true':
@@ -70,50 +115,63 @@ class InventarioViewSet(viewsets.ModelViewSet):
         else:
             serializer.save()
 
+    # Campos permitidos para el parámetro ?group_by= de stats
+    STATS_GROUP_BY = {
+        'proveedor': ['proveedor_id', 'proveedor__nombre'],
+        'ubicacion': ['ubicacion'],
+    }
+
+    def _agregados_stats(self):
+        """Agregados condicionales de stats: se resuelven todos en una sola consulta"""
+        return {
+            'total_productos': Count('id'),
+            'productos_disponibles': Count('id', filter=Q(estado=Inventario.Estado.DISPONIBLE)),
+            'productos_agotados': Count('id', filter=Q(estado=Inventario.Estado.AGOTADO)),
+            'productos_por_vencer': Count('id', filter=Q(estado=Inventario.Estado.POR_VENCER)),
+            'productos_vencidos': Count('id', filter=Q(estado=Inventario.Estado.VENCIDO)),
+            'stock_bajo': Count('id', filter=Q(cantidad_actual__lte=F('cantidad_minima'))),
+            'valor_total_inventario': Sum(F('cantidad_actual') * F('precio_unitario')),
+        }
+
     @action(detail=False, methods=['get'])
     def stats(self, request):
-        """Obtener estadísticas del inventario"""
-        queryset = self.get_queryset()
-        
-        # Estadísticas básicas
-        total_productos = queryset.count()
-        productos_disponibles = queryset.filter(estado='disponible').count()
-        productos_agotados = queryset.filter(estado='agotado').count()
-        productos_por_vencer = queryset.filter(estado='por_vencer').count()
-        productos_vencidos = queryset.filter(estado='vencido').count()
+        """
+        Obtener estadísticas del inventario.
+        Con ?group_by=proveedor|ubicacion agrega la lista `grupos` con las mismas métricas por grupo.
+        """
+        group_by = request.query_params.get('group_by')
+        if group_by and group_by not in self.STATS_GROUP_BY:
+            return Response(
+                {'error': f"group_by debe ser uno de: {', '.join(self.STATS_GROUP_BY)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Stock bajo
-        stock_bajo = queryset.filter(cantidad_actual__lte=F('cantidad_minima')).count()
+        queryset = self.get_queryset().order_by()
         
-        # Valor total del inventario
-        valor_total = queryset.aggregate(
-            total=Sum(F('cantidad_actual') * F('precio_unitario'))
-        )['total'] or 0
+        # Estadísticas básicas, stock bajo y valor total en una sola consulta
+        stats_data = queryset.aggregate(**self._agregados_stats())
+        stats_data['valor_total_inventario'] = stats_data['valor_total_inventario'] or 0
         
-        # Distribución por categorías
-        categorias_distribucion = {}
-        for categoria, _ in Inventario.Categoria.choices:
-            count = queryset.filter(categoria=categoria).count()
-            categorias_distribucion[categoria] = count
+        # Distribución por categorías con una consulta agrupada
+        categorias_distribucion = {categoria: 0 for categoria, _ in Inventario.Categoria.choices}
+        for fila in queryset.values('categoria').annotate(total=Count('id')):
+            categorias_distribucion[fila['categoria']] = fila['total']
+        stats_data['categorias_distribucion'] = categorias_distribucion
         
-        stats_data = {
-            'total_productos': total_productos,
-            'productos_disponibles': productos_disponibles,
-            'productos_agotados': productos_agotados,
-            'productos_por_vencer': productos_por_vencer,
-            'productos_vencidos': productos_vencidos,
-            'stock_bajo': stock_bajo,
-            'valor_total_inventario': valor_total,
-            'categorias_distribucion': categorias_distribucion
-        }
+        if group_by:
+            campos = self.STATS_GROUP_BY[group_by]
+            grupos = []
+            for fila in queryset.values(*campos).annotate(**self._agregados_stats()).order_by(*campos):
+                fila['valor_total_inventario'] = fila['valor_total_inventario'] or 0
+                grupos.append(fila)
+            stats_data['grupos'] = grupos
         
         serializer = InventarioStatsSerializer(stats_data)
         return Response(serializer.data)
 
     @action(detail=True, methods=['post'])
     def update_stock(self, request, pk=None):
-        """Actualizar el stock de un producto"""
-        inventario = self.get_object()
+        """Actualizar el stock de un producto. actualizado_por se toma del header X-Empleado-Rut"""
         cantidad = request.data.get('cantidad')
         tipo = request.data.get('tipo', 'ajuste')  # 'ingreso', 'egreso', 'ajuste'
         notas = request.data.get('notas', '')
@@ -125,50 +183,168 @@ class InventarioViewSet(viewsets.ModelViewSet):
             )
         
         try:
-            cantidad = float(cantidad)
-        except (ValueError, TypeError):
+            cantidad = Decimal(str(cantidad))
+        except (InvalidOperation, ValueError, TypeError):
             return Response(
                 {'error': 'La cantidad debe ser un número válido'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Actualizar stock según el tipo
-        if tipo == 'ingreso':
-            inventario.cantidad_actual += cantidad
-        elif tipo == 'egreso':
-            inventario.cantidad_actual -= cantidad
-            if inventario.cantidad_actual < 0:
-                return Response(
-                    {'error': 'No se puede tener stock negativo'}, 
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-        else:  # ajuste
-            inventario.cantidad_actual = cantidad
+        # cantidad_actual es entera: no truncar silenciosamente valores como 2.5
+        if not cantidad.is_finite() or cantidad != cantidad.to_integral_value():
+            return Response(
+                {'error': 'La cantidad debe ser un número entero'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        cantidad = int(cantidad)
         
-        # Actualizar fecha de último ingreso si es un ingreso
-        if tipo == 'ingreso':
-            inventario.fecha_ultimo_ingreso = timezone.now()
+        if cantidad < 0:
+            return Response(
+                {'error': 'La cantidad no puede ser negativa'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Actualizar estado según el stock
-        if inventario.cantidad_actual <= 0:
-            inventario.estado = Inventario.Estado.AGOTADO
-        elif inventario.cantidad_actual <= inventario.cantidad_minima:
-            inventario.estado = Inventario.Estado.POR_VENCER
-        else:
-            inventario.estado = Inventario.Estado.DISPONIBLE
+        if tipo not in TIPOS_ACTUALIZACION_STOCK:
+            tipo = 'ajuste'
         
-        if request.user.is_authenticated:
-            inventario.actualizado_por = request.user
-        inventario.save()
+        # actualizado_por apunta a empleados: request.user es un usuario de Django, no un Empleado
+        referencia = resolver_empleado_por_rut(request.headers.get('X-Empleado-Rut'))
+        empleado_id = referencia.id if referencia else None
         
-        # Agregar notas si se proporcionan
-        if notas:
-            inventario.notas = f"{inventario.notas}\n[{timezone.now().strftime('%Y-%m-%d %H:%M')}] {notas}" if inventario.notas else f"[{timezone.now().strftime('%Y-%m-%d %H:%M')}] {notas}"
-            inventario.save()
+        # Un único UPDATE con F(): el cálculo y la validación de stock ocurren en la base de datos
+        with transaction.atomic():
+            actualizado = actualizar_stock(
+                pk, tipo, cantidad, notas=notas, empleado_id=empleado_id, queryset=self.get_queryset()
+            )
+            # get_object() responde 404 si el producto no existe
+            inventario = self.get_object()
+        
+        if not actualizado:
+            return Response(
+                {'error': 'No se puede tener stock negativo'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         serializer = self.get_serializer(inventario)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post'], url_path='movimientos/bulk')
+    def movimientos_bulk(self, request):
+        """
+        Registrar muchos movimientos de stock (ingreso, salida, merma, venta, transferencia,
+        devolucion) en una sola transacción.
+        Body: {"movimientos": [{"inventario_id": 1, "tipo_movimiento": "ingreso", "cantidad": 10, ...}],
+               "todo_o_nada": false}
+        Retorna un resultado por línea; con todo_o_nada=true no se aplica nada si alguna línea falla.
+        """
+        datos = request.data
+        lineas = datos.get('movimientos') if isinstance(datos, dict) else datos
+        # Acepta true/1 tanto en JSON como en form-data; "false" o "0" no activan el modo
+        todo_o_nada = isinstance(datos, dict) and str(datos.get('todo_o_nada', '')).lower() in ('true', '1')
+        
+        if not isinstance(lineas, list) or not lineas:
+            return Response(
+                {'error': 'Se requiere una lista de movimientos'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(lineas) > MAX_MOVIMIENTOS_POR_SOLICITUD:
+            return Response(
+                {'error': f'Se permiten como máximo {MAX_MOVIMIENTOS_POR_SOLICITUD} movimientos por solicitud'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Validar cada línea por separado para poder informar el error de cada una
+        resultados = [None] * len(lineas)
+        validas = []
+        indices_validos = []
+        for indice, linea in enumerate(lineas):
+            serializer = MovimientoLoteSerializer(data=linea) if isinstance(linea, dict) else None
+            if serializer is None or not serializer.is_valid():
+                resultados[indice] = {
+                    'indice': indice,
+                    'ok': False,
+                    'error': serializer.errors if serializer is not None else 'Formato de movimiento inválido',
+                }
+                continue
+            validas.append(serializer.validated_data)
+            indices_validos.append(indice)
+        
+        referencia = resolver_empleado_por_rut(request.headers.get('X-Empleado-Rut'))
+        empleado_id = referencia.id if referencia else None
+        
+        aplicado = False
+        resultados_validos = [{'ok': True} for _ in validas]
+        if validas and not (todo_o_nada and len(validas) != len(lineas)):
+            with transaction.atomic():
+                resultados_validos, aplicado = registrar_movimientos(
+                    validas, empleado_id=empleado_id, todo_o_nada=todo_o_nada
+                )
+        
+        for indice, resultado in zip(indices_validos, resultados_validos):
+            if resultado['ok'] and not aplicado:
+                resultado = {'ok': False, 'error': 'No aplicado: otra línea fue rechazada'}
+            resultados[indice] = {'indice': indice, **resultado}
+        
+        aplicados = sum(1 for resultado in resultados if resultado['ok'])
+        return Response(
+            {
+                'aplicados': aplicados,
+                'rechazados': len(lineas) - aplicados,
+                'resultados': resultados,
+            },
+            status=status.HTTP_200_OK if aplicado else status.HTTP_400_BAD_REQUEST
+        )
+
+    @action(detail=False, methods=['get'], renderer_classes=RENDERERS_EXPORTACION)
+    def export(self, request):
+        """
+        Exportar los productos como ?format=csv (por defecto) o ?format=ndjson en streaming.
+        Acepta los mismos filtros que el listado (categoria, estado, proveedor, search, low_stock...).
+        """
+        formato = formato_exportacion(request)
+        if formato is None:
+            return Response(
+                {'error': 'format inválido. Opciones: csv, ndjson'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        queryset = self.filter_queryset(self.get_queryset())
+        return respuesta_exportacion(queryset, CAMPOS_EXPORTACION_INVENTARIO, 'inventario', formato)
+
+    @action(detail=False, methods=['get'], url_path='movimientos/export', renderer_classes=RENDERERS_EXPORTACION)
+    def movimientos_export(self, request):
+        """
+        Exportar movimientos de stock como ?format=csv o ?format=ndjson en streaming.
+        Filtros opcionales: ?inventario_id, ?tipo_movimiento, ?fecha_inicio y ?fecha_fin (YYYY-MM-DD).
+        """
+        formato = formato_exportacion(request)
+        if formato is None:
+            return Response(
+                {'error': 'format inválido. Opciones: csv, ndjson'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        queryset = MovimientosInventario.objects.all()
+        inventario_id = request.query_params.get('inventario_id')
+        tipo_movimiento = request.query_params.get('tipo_movimiento')
+        fecha_inicio = request.query_params.get('fecha_inicio')
+        fecha_fin = request.query_params.get('fecha_fin')
+        try:
+            if inventario_id:
+                queryset = queryset.filter(inventario_id=int(inventario_id))
+            if fecha_inicio:
+                queryset = queryset.filter(fecha_movimiento__date__gte=date.fromisoformat(fecha_inicio))
+            if fecha_fin:
+                queryset = queryset.filter(fecha_movimiento__date__lte=date.fromisoformat(fecha_fin))
+        except ValueError:
+            return Response(
+                {'error': 'inventario_id debe ser numérico y las fechas tener formato YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if tipo_movimiento:
+            queryset = queryset.filter(tipo_movimiento=tipo_movimiento)
+        
+        return respuesta_exportacion(queryset, CAMPOS_EXPORTACION_MOVIMIENTOS, 'movimientos', formato)
+
     @action(detail=False, methods=['get'])
     def low_stock(self, request):
         """Obtener productos con stock bajo"""
@@ -21,6 +21,7 @@ START TRANSACTION;
 CREATE TABLE IF NOT EXISTS `empleados` (
   `id` INT NOT NULL AUTO_INCREMENT,
   `rut` VARCHAR(12) NOT NULL,
+  `rut_normalizado` VARCHAR(12) DEFAULT NULL,
   `nombres` VARCHAR(100) NOT NULL,
   `apellido_paterno` VARCHAR(100) NOT NULL,
   `apellido_materno` VARCHAR(100) DEFAULT NULL,
@@ -46,6 +47,7 @@ CREATE TABLE IF NOT EXISTS `empleados` (
   `activo` TINYINT(1) DEFAULT 1,
   PRIMARY KEY (`id`),
   UNIQUE KEY `rut` (`rut`),
+  UNIQUE KEY `rut_normalizado` (`rut_normalizado`),
   UNIQUE KEY `email` (`email`),
   KEY `idx_estado` (`estado`),
   KEY `idx_cargo` (`cargo`),
@@ -62,6 +64,12 @@ CREATE TABLE IF NOT EXISTS `empleados` (
 --   END
 -- WHERE apellido_paterno IS NULL OR apellido_paterno = '';
 
+-- MIGRACIÓN DE DATOS: RUT normalizado (sin puntos ni guion) para búsquedas indexadas
+-- Si la tabla ya existe sin la columna, ejecutar:
+-- ALTER TABLE empleados ADD COLUMN `rut_normalizado` VARCHAR(12) DEFAULT NULL AFTER `rut`,
+--   ADD UNIQUE KEY `rut_normalizado` (`rut_normalizado`);
+-- y luego: python manage.py sincronizar_rut_normalizado
+
 -- TABLA: turnos
 CREATE TABLE IF NOT EXISTS `turnos` (
   `id` INT NOT NULL AUTO_INCREMENT,
@@ -200,6 +208,30 @@ CREATE TABLE IF NOT EXISTS `asistencias` (
     ON DELETE SET NULL
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- TABLA: asistencia_resumen_mensual
+-- Resumen de asistencia por empleado y mes (mes = primer día del mes). Se actualiza al cambiar
+-- las asistencias; para llenarla desde las existentes: python manage.py reconstruir_resumen_asistencia
+CREATE TABLE IF NOT EXISTS `asistencia_resumen_mensual` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT,
+  `empleado_rut` VARCHAR(12) NOT NULL,
+  `mes` DATE NOT NULL,
+  `dias_presente` INT NOT NULL DEFAULT 0,
+  `dias_tarde` INT NOT NULL DEFAULT 0,
+  `dias_ausente` INT NOT NULL DEFAULT 0,
+  `dias_permiso` INT NOT NULL DEFAULT 0,
+  `minutos_tarde` INT NOT NULL DEFAULT 0,
+  `minutos_extras` INT NOT NULL DEFAULT 0,
+  `horas_trabajadas` DECIMAL(7,2) NOT NULL DEFAULT 0.00,
+  `fecha_actualizacion` DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uniq_asistencia_resumen_mensual` (`empleado_rut`,`mes`),
+  KEY `asistencia__mes_cff227_idx` (`mes`),
+  CONSTRAINT `asistencia_resumen_mensual_ibfk_1` 
+    FOREIGN KEY (`empleado_rut`) 
+    REFERENCES `empleados` (`rut`) 
+    ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- TABLA: empleados_turnos
 CREATE TABLE IF NOT EXISTS `empleados_turnos` (
   `id` INT NOT NULL AUTO_INCREMENT,
@@ -313,6 +345,27 @@ CREATE TABLE IF NOT EXISTS `detalle_ventas` (
     ON DELETE RESTRICT
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- TABLA: ventas_diarias
+-- Resumen de ventas completadas por día × producto × método de pago. Se acumula al confirmar
+-- cada venta; para llenarla desde las ventas existentes: python manage.py reconstruir_ventas_diarias
+CREATE TABLE IF NOT EXISTS `ventas_diarias` (
+  `id` INT NOT NULL AUTO_INCREMENT,
+  `fecha` DATE NOT NULL,
+  `inventario_id` INT NOT NULL,
+  `metodo_pago` ENUM('efectivo','tarjeta_debito','tarjeta_credito','transferencia','multiple') NOT NULL,
+  `cantidad_ventas` INT NOT NULL DEFAULT 0,
+  `unidades_vendidas` INT NOT NULL DEFAULT 0,
+  `monto_total` BIGINT NOT NULL DEFAULT 0,
+  `fecha_actualizacion` DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uniq_venta_diaria` (`fecha`,`inventario_id`,`metodo_pago`),
+  KEY `ventas_diar_inventa_377b8b_idx` (`inventario_id`,`fecha`),
+  CONSTRAINT `ventas_diarias_ibfk_1` 
+    FOREIGN KEY (`inventario_id`) 
+    REFERENCES `inventario` (`id`) 
+    ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- TABLA: alertas_inventario
 CREATE TABLE IF NOT EXISTS `alertas_inventario` (
   `id` INT NOT NULL AUTO_INCREMENT,
@@ -551,16 +604,27 @@ CREATE TABLE IF NOT EXISTS `reportes` (
   `generado_por` INT DEFAULT NULL,
   `fecha_generacion` DATETIME DEFAULT CURRENT_TIMESTAMP,
   `tiempo_generacion` INT DEFAULT NULL,
+  `estado` ENUM('pendiente','procesando','completado','error') NOT NULL DEFAULT 'pendiente',
+  `total_filas` INT DEFAULT NULL,
+  `mensaje_error` TEXT,
   PRIMARY KEY (`id`),
   KEY `idx_tipo_reporte` (`tipo_reporte`),
   KEY `idx_fecha_generacion` (`fecha_generacion`),
   KEY `idx_generado_por` (`generado_por`),
+  KEY `reportes_estado_7afa2e_idx` (`estado`),
   CONSTRAINT `reportes_ibfk_1` 
     FOREIGN KEY (`generado_por`) 
     REFERENCES `empleados` (`id`) 
     ON DELETE SET NULL
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- MIGRACIÓN: estado de la generación en segundo plano de los reportes
+-- Si la tabla ya existe sin las columnas, ejecutar:
+-- ALTER TABLE reportes ADD COLUMN `estado` ENUM('pendiente','procesando','completado','error') NOT NULL DEFAULT 'pendiente',
+--   ADD COLUMN `total_filas` INT DEFAULT NULL,
+--   ADD COLUMN `mensaje_error` TEXT,
+--   ADD KEY `reportes_estado_7afa2e_idx` (`estado`);
+
 -- TABLA: logs_actividad
 CREATE TABLE IF NOT EXISTS `logs_actividad` (
   `id` INT NOT NULL AUTO_INCREMENT,
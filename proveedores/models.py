@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Sum
 from empleado.models import Empleado
 from inventario.models import Inventario
 
@@ -133,12 +134,11 @@ class OrdenCompra(models.Model):
         return f"Orden {self.numero_orden} - {self.proveedor.nombre}"
     
     def calcular_total(self):
-        """Calcular el total de la orden basado en los items"""
-        items = self.items.all()
-        subtotal = sum(item.precio_total for item in items)
+        """Calcular el total de la orden basado en los items (un SUM en la base de datos)"""
+        subtotal = self.items.aggregate(subtotal=Sum('precio_total'))['subtotal'] or 0
         self.subtotal = subtotal
         self.total = subtotal - self.descuento + self.impuestos
-        self.save()
+        self.save(update_fields=['subtotal', 'total', 'fecha_actualizacion'])
 
 
 class ItemOrdenCompra(models.Model):
@@ -175,10 +175,17 @@ class ItemOrdenCompra(models.Model):
     def __str__(self):
         return f"{self.nombre_producto} - Cantidad: {self.cantidad}"
     
-    def save(self, *args, **kwargs):
-        """Calcular precio_total antes de guardar"""
+    def calcular_precio_total(self):
         self.precio_total = (self.precio_unitario * self.cantidad) - self.descuento
+    
+    def save(self, *args, recalcular_orden=True, **kwargs):
+        """
+        Calcular precio_total antes de guardar.
+        En operaciones por lote usar recalcular_orden=False y llamar a
+        orden_compra.calcular_total() una sola vez al final.
+        """
+        self.calcular_precio_total()
         super().save(*args, **kwargs)
         # Recalcular total de la orden
-        if self.orden_compra:
+        if recalcular_orden and self.orden_compra:
             self.orden_compra.calcular_total()
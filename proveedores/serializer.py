@@ -1,8 +1,40 @@
+from django.db import transaction
+from django.db.models import Max, Sum
 from rest_framework import serializers
 from .models import Proveedor, OrdenCompra, ItemOrdenCompra
+from .services import ESTADOS_COMPRA_REALIZADA, crear_items_orden
+from inventario.models import Inventario
 from inventario.serializer import InventarioListSerializer
 
 
+def _total_ordenes(obj):
+    """
+    Leer total_ordenes anotado por ProveedorViewSet.get_queryset (ver anotar_totales_compras).
+    Para instancias sin anotar (por ejemplo recién creadas) se consulta la base de datos.
+    """
+    if hasattr(obj, 'total_ordenes'):
+        return obj.total_ordenes
+    return obj.ordenes_compra.count()
+
+
+def _total_compras(obj):
+    if hasattr(obj, 'total_compras'):
+        return obj.total_compras
+    return obj.ordenes_compra.filter(estado__in=ESTADOS_COMPRA_REALIZADA).aggregate(
+        total=Sum('total', default=0)
+    )['total']
+
+
+def _ultima_compra(obj):
+    if hasattr(obj, 'ultima_compra'):
+        ultima_compra = obj.ultima_compra
+    else:
+        ultima_compra = obj.ordenes_compra.filter(estado__in=ESTADOS_COMPRA_REALIZADA).aggregate(
+            ultima=Max('fecha_creacion')
+        )['ultima']
+    return serializers.DateTimeField().to_representation(ultima_compra) if ultima_compra else None
+
+
 class ProveedorSerializer(serializers.ModelSerializer):
     """Serializer para Proveedor"""
     estado_display = serializers.CharField(source='get_estado_display', read_only=True)
@@ -10,6 +42,7 @@ class ProveedorSerializer(serializers.ModelSerializer):
     actualizado_por_nombre = serializers.SerializerMethodField()
     total_ordenes = serializers.SerializerMethodField()
     total_compras = serializers.SerializerMethodField()
+    ultima_compra = serializers.SerializerMethodField()
     
     def get_creado_por_nombre(self, obj):
         try:
@@ -33,21 +66,15 @@ class ProveedorSerializer(serializers.ModelSerializer):
     
     def get_total_ordenes(self, obj):
         """Obtener el total de órdenes del proveedor"""
-        try:
-            return obj.ordenes_compra.count()
-        except Exception:
-            return 0
+        return _total_ordenes(obj)
     
     def get_total_compras(self, obj):
         """Obtener el total de compras realizadas"""
-        try:
-            from django.db.models import Sum
-            total = obj.ordenes_compra.filter(estado__in=['recibida', 'parcialmente_recibida', 'facturada']).aggregate(
-                total=Sum('total')
-            )['total'] or 0
-            return total
-        except Exception:
-            return 0
+        return _total_compras(obj)
+    
+    def get_ultima_compra(self, obj):
+        """Obtener la fecha de la última compra realizada"""
+        return _ultima_compra(obj)
     
     class Meta:
         model = Proveedor
@@ -86,6 +113,7 @@ class ProveedorSerializer(serializers.ModelSerializer):
             'actualizado_por_nombre',
             'total_ordenes',
             'total_compras',
+            'ultima_compra',
         ]
         read_only_fields = ['id', 'fecha_creacion', 'fecha_actualizacion']
 
@@ -94,12 +122,17 @@ class ProveedorListSerializer(serializers.ModelSerializer):
     """Serializer simplificado para listar proveedores"""
     estado_display = serializers.CharField(source='get_estado_display', read_only=True)
     total_ordenes = serializers.SerializerMethodField()
+    total_compras = serializers.SerializerMethodField()
+    ultima_compra = serializers.SerializerMethodField()
     
     def get_total_ordenes(self, obj):
-        try:
-            return obj.ordenes_compra.count()
-        except Exception:
-            return 0
+        return _total_ordenes(obj)
+    
+    def get_total_compras(self, obj):
+        return _total_compras(obj)
+    
+    def get_ultima_compra(self, obj):
+        return _ultima_compra(obj)
     
     class Meta:
         model = Proveedor
@@ -119,6 +152,8 @@ class ProveedorListSerializer(serializers.ModelSerializer):
             'activo',
             'fecha_creacion',
             'total_ordenes',
+            'total_compras',
+            'ultima_compra',
         ]
 
 
@@ -151,6 +186,31 @@ class ItemOrdenCompraSerializer(serializers.ModelSerializer):
             'precio_total',
             'notas',
         ]
+        read_only_fields = ['id', 'orden_compra', 'precio_total']
+
+
+class ItemOrdenCompraCreateSerializer(serializers.ModelSerializer):
+    """
+    Serializer para los items al crear una orden. El producto se recibe como ID y se valida
+    para todos los items con una sola consulta en OrdenCompraCreateSerializer.validate_items.
+    """
+    producto = serializers.IntegerField(source='producto_id', required=False, allow_null=True)
+    
+    class Meta:
+        model = ItemOrdenCompra
+        fields = [
+            'id',
+            'producto',
+            'codigo_producto',
+            'nombre_producto',
+            'descripcion',
+            'cantidad',
+            'unidad_medida',
+            'precio_unitario',
+            'descuento',
+            'precio_total',
+            'notas',
+        ]
         read_only_fields = ['id', 'precio_total']
 
 
@@ -260,7 +320,7 @@ class OrdenCompraListSerializer(serializers.ModelSerializer):
 
 class OrdenCompraCreateSerializer(serializers.ModelSerializer):
     """Serializer para crear órdenes de compra con items"""
-    items = ItemOrdenCompraSerializer(many=True)
+    items = ItemOrdenCompraCreateSerializer(many=True)
     
     class Meta:
         model = OrdenCompra
@@ -280,17 +340,31 @@ class OrdenCompraCreateSerializer(serializers.ModelSerializer):
             'items',
         ]
     
+    def validate_items(self, value):
+        """Verificar que los productos referenciados existan (una consulta para todos los items)"""
+        ids = {item['producto_id'] for item in value if item.get('producto_id') is not None}
+        existentes = set(Inventario.objects.filter(pk__in=ids).values_list('pk', flat=True)) if ids else set()
+        faltantes = sorted(ids - existentes)
+        if faltantes:
+            raise serializers.ValidationError(f"Productos no encontrados: {faltantes}")
+        return value
+    
     def create(self, validated_data):
         items_data = validated_data.pop('items')
-        orden = OrdenCompra.objects.create(**validated_data)
-        
-        for item_data in items_data:
-            ItemOrdenCompra.objects.create(orden_compra=orden, **item_data)
-        
-        orden.calcular_total()
+        with transaction.atomic():
+            orden = OrdenCompra.objects.create(**validated_data)
+            # Un INSERT por lote de items y un único cálculo del total de la orden
+            crear_items_orden(orden, items_data)
         return orden
 
 
+class GastoMensualSerializer(serializers.Serializer):
+    """Gasto de un mes en el historial de compras"""
+    mes = serializers.DateField()
+    ordenes = serializers.IntegerField()
+    total_compras = serializers.IntegerField()
+
+
 class HistorialCompraSerializer(serializers.Serializer):
     """Serializer para el historial de compras por proveedor"""
     proveedor_id = serializers.IntegerField()
@@ -299,4 +373,9 @@ class HistorialCompraSerializer(serializers.Serializer):
     total_compras = serializers.IntegerField()
     ultima_compra = serializers.DateTimeField(allow_null=True)
     ordenes = OrdenCompraListSerializer(many=True)
+    # Solo presentes cuando se pagina (?page_size= / ?cursor=)
+    siguiente = serializers.CharField(required=False)
+    anterior = serializers.CharField(required=False)
+    # Solo presente con ?por_mes=true
+    gasto_mensual = GastoMensualSerializer(many=True, required=False)
 
@@ -0,0 +1,122 @@
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import Coalesce
+from inventario.services import registrar_movimientos
+from .models import ItemOrdenCompra
+
+
+# Filas por INSERT al crear items en lote
+TAMANO_LOTE_ITEMS = 500
+
+# Estados de una orden que cuentan como compra realizada
+ESTADOS_COMPRA_REALIZADA = ('recibida', 'parcialmente_recibida', 'facturada')
+
+
+def anotar_totales_compras(queryset):
+    """
+    Anotar en un queryset de proveedores total_ordenes, total_compras (suma del total de las
+    órdenes realizadas) y ultima_compra (fecha de creación de la última orden realizada),
+    calculados en la misma consulta con un GROUP BY.
+    """
+    compra_realizada = Q(ordenes_compra__estado__in=ESTADOS_COMPRA_REALIZADA)
+    return queryset.annotate(
+        total_ordenes=Count('ordenes_compra'),
+        total_compras=Sum('ordenes_compra__total', filter=compra_realizada, default=0),
+        ultima_compra=Max('ordenes_compra__fecha_creacion', filter=compra_realizada),
+    )
+
+
+def crear_items_orden(orden, items_data):
+    """
+    Crear los items de una orden con bulk_create y recalcular el total de la orden una sola vez.
+    bulk_create no llama a ItemOrdenCompra.save(), por eso precio_total se calcula aquí.
+    """
+    items = [ItemOrdenCompra(orden_compra=orden, **item_data) for item_data in items_data]
+    for item in items:
+        item.calcular_precio_total()
+    ItemOrdenCompra.objects.bulk_create(items, batch_size=TAMANO_LOTE_ITEMS)
+    orden.calcular_total()
+    return items
+
+
+class RecepcionInvalida(Exception):
+    """Datos de recepción que no se pueden aplicar a la orden; `errores` contiene el detalle por línea"""
+
+    def __init__(self, mensaje, errores=None):
+        super().__init__(mensaje)
+        self.errores = errores or []
+
+
+def recibir_items_orden(orden, items_recibidos, empleado_id=None):
+    """
+    Registrar la cantidad recibida de los items de una orden. Debe ejecutarse dentro de transaction.atomic().
+
+    items_recibidos es una lista de {"id": <item>, "cantidad_recibida": <cantidad acumulada>}; los IDs
+    que no pertenecen a la orden se ignoran. Los items se leen y bloquean con una consulta, se guardan
+    con bulk_update, y lo recibido desde la última recepción entra al inventario como movimientos
+    'ingreso' (un UPDATE agrupado de stock y un bulk_create de movimientos). Si algún producto
+    rechaza el ingreso (por ejemplo, está inactivo) se lanza RecepcionInvalida y la transacción
+    debe revertirse: de lo contrario la cantidad quedaría recibida sin haber entrado al stock.
+    Retorna (total_recibido, total_esperado) de la orden, calculados con un solo aggregate.
+    """
+    cantidades = {}
+    for item_data in items_recibidos:
+        if not isinstance(item_data, dict):
+            raise RecepcionInvalida('Cada item debe ser un objeto con id y cantidad_recibida')
+        try:
+            item_id = int(item_data.get('id'))
+            cantidad_recibida = int(item_data.get('cantidad_recibida', 0))
+        except (TypeError, ValueError):
+            raise RecepcionInvalida('id y cantidad_recibida deben ser números enteros')
+        if cantidad_recibida < 0:
+            raise RecepcionInvalida('La cantidad recibida no puede ser negativa')
+        cantidades[item_id] = cantidad_recibida
+
+    items = list(
+        orden.items.select_for_update().filter(id__in=cantidades).order_by('id')
+    ) if cantidades else []
+
+    actualizados = []
+    lineas_ingreso = []
+    for item in items:
+        cantidad_recibida = cantidades[item.id]
+        diferencia = cantidad_recibida - item.cantidad_recibida
+        if diferencia < 0:
+            # El stock ya ingresado no se revierte desde aquí
+            raise RecepcionInvalida(
+                f'La cantidad recibida del item {item.id} no puede ser menor a la ya registrada ({item.cantidad_recibida})'
+            )
+        if diferencia == 0:
+            continue
+        item.cantidad_recibida = cantidad_recibida
+        actualizados.append(item)
+        if item.producto_id:
+            lineas_ingreso.append({
+                'inventario_id': item.producto_id,
+                'tipo_movimiento': 'ingreso',
+                'cantidad': diferencia,
+                'precio_unitario': item.precio_unitario,
+                'motivo': f'Recepción de orden de compra {orden.numero_orden}',
+                'documento_referencia': orden.numero_orden,
+                'proveedor': orden.proveedor.nombre,
+            })
+
+    if actualizados:
+        # cantidad_recibida no afecta precio_total, por eso no se recalcula el total de la orden
+        ItemOrdenCompra.objects.bulk_update(actualizados, ['cantidad_recibida'], batch_size=TAMANO_LOTE_ITEMS)
+
+    if lineas_ingreso:
+        resultados, aplicado = registrar_movimientos(lineas_ingreso, empleado_id=empleado_id, todo_o_nada=True)
+        if not aplicado:
+            raise RecepcionInvalida(
+                'Hay productos que no pueden recibir stock',
+                [
+                    {'inventario': resultado['inventario_id'], 'error': resultado['error']}
+                    for resultado in resultados if not resultado['ok']
+                ],
+            )
+
+    totales = orden.items.aggregate(
+        total_recibido=Coalesce(Sum('cantidad_recibida'), 0),
+        total_esperado=Coalesce(Sum('cantidad'), 0),
+    )
+    return totales['total_recibido'], totales['total_esperado']
@@ -1,3 +1,193 @@
-from django.test import TestCase
+from datetime import date
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from inventario.models import Inventario
+from .models import Proveedor, OrdenCompra, ItemOrdenCompra
 
-# Create your tests here.
+
+class ProveedorListTest(APITestCase):
+    """El listado de proveedores lee los totales de compras anotados en la consulta"""
+
+    def crear_proveedores(self, cantidad, inicio=0):
+        for i in range(inicio, inicio + cantidad):
+            proveedor = Proveedor.objects.create(nombre=f'Proveedor {i}')
+            OrdenCompra.objects.create(
+                numero_orden=f'OC-P{i}-1', proveedor=proveedor, fecha_orden=date.today(),
+                estado=OrdenCompra.Estado.RECIBIDA, total=1000
+            )
+            OrdenCompra.objects.create(
+                numero_orden=f'OC-P{i}-2', proveedor=proveedor, fecha_orden=date.today(),
+                estado=OrdenCompra.Estado.BORRADOR, total=500
+            )
+
+    def listar(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('proveedor-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(consultas), response
+
+    def test_list_query_count_is_constant(self):
+        self.crear_proveedores(2)
+        consultas_pocos, _ = self.listar()
+
+        self.crear_proveedores(20, inicio=2)
+        consultas_muchos, response = self.listar()
+
+        self.assertEqual(consultas_pocos, consultas_muchos)
+        self.assertEqual(consultas_muchos, 1)
+        self.assertEqual(len(response.data), 22)
+        self.assertEqual(response.data[0]['total_ordenes'], 2)
+        self.assertEqual(response.data[0]['total_compras'], 1000)
+        self.assertIsNotNone(response.data[0]['ultima_compra'])
+
+
+class OrdenCompraCreateTest(APITestCase):
+    """Pruebas para la creación de órdenes de compra con items"""
+
+    def setUp(self):
+        self.proveedor = Proveedor.objects.create(nombre='Proveedor Test')
+        self.producto = Inventario.objects.create(
+            codigo_producto='OC-001',
+            nombre_producto='Café en grano',
+            categoria=Inventario.Categoria.CAFE,
+            unidad_medida=Inventario.UnidadMedida.KILOGRAMO,
+            cantidad_actual=10,
+            cantidad_minima=5
+        )
+        self.url = reverse('orden-compra-list')
+        self.siguiente = 0
+
+    def crear_orden(self, cantidad_items):
+        self.siguiente += 1
+        datos = {
+            'numero_orden': f'OC-{self.siguiente:04d}',
+            'proveedor': self.proveedor.pk,
+            'fecha_orden': date.today().isoformat(),
+            'descuento': 100,
+            'impuestos': 50,
+            'items': [
+                {
+                    'producto': self.producto.pk if i % 2 == 0 else None,
+                    'nombre_producto': f'Item {i}',
+                    'cantidad': 2,
+                    'precio_unitario': 1000,
+                    'descuento': 10,
+                }
+                for i in range(cantidad_items)
+            ],
+        }
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.post(self.url, datos, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        return len(consultas), OrdenCompra.objects.get(numero_orden=datos['numero_orden'])
+
+    def test_create_query_count_is_constant(self):
+        """Crear una orden no ejecuta consultas por item"""
+        consultas_pocos, _ = self.crear_orden(2)
+        consultas_muchos, orden = self.crear_orden(40)
+
+        self.assertEqual(consultas_pocos, consultas_muchos)
+        self.assertEqual(orden.items.count(), 40)
+        self.assertEqual(orden.subtotal, 40 * 1990)
+        self.assertEqual(orden.total, 40 * 1990 - 100 + 50)
+
+    def test_create_rejects_unknown_product(self):
+        datos = {
+            'numero_orden': 'OC-ERR',
+            'proveedor': self.proveedor.pk,
+            'fecha_orden': date.today().isoformat(),
+            'items': [{'producto': 999999, 'nombre_producto': 'X', 'cantidad': 1, 'precio_unitario': 1}],
+        }
+
+        response = self.client.post(self.url, datos, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(OrdenCompra.objects.filter(numero_orden='OC-ERR').exists())
+
+    def test_item_save_can_skip_order_recalculation(self):
+        _, orden = self.crear_orden(1)
+        item = ItemOrdenCompra(orden_compra=orden, nombre_producto='Extra', cantidad=1, precio_unitario=500)
+
+        item.save(recalcular_orden=False)
+        orden.refresh_from_db()
+        self.assertEqual(orden.subtotal, 1990)
+
+        orden.calcular_total()
+        orden.refresh_from_db()
+        self.assertEqual(orden.subtotal, 1990 + 500)
+
+
+class OrdenCompraRecibirTest(APITestCase):
+    """Pruebas para la recepción de órdenes de compra"""
+
+    def setUp(self):
+        self.proveedor = Proveedor.objects.create(nombre='Proveedor Recepción')
+        self.producto = Inventario.objects.create(
+            codigo_producto='REC-001',
+            nombre_producto='Leche',
+            categoria=Inventario.Categoria.ALIMENTOS,
+            unidad_medida=Inventario.UnidadMedida.UNIDAD,
+            cantidad_actual=2,
+            cantidad_minima=5
+        )
+        self.orden = OrdenCompra.objects.create(
+            numero_orden='OC-REC-1',
+            proveedor=self.proveedor,
+            fecha_orden=date.today()
+        )
+        self.item_producto = ItemOrdenCompra(
+            orden_compra=self.orden, producto=self.producto, nombre_producto='Leche', cantidad=10, precio_unitario=900
+        )
+        self.item_externo = ItemOrdenCompra(
+            orden_compra=self.orden, nombre_producto='Servilletas', cantidad=5, precio_unitario=100
+        )
+        self.item_producto.save(recalcular_orden=False)
+        self.item_externo.save(recalcular_orden=False)
+        self.url = reverse('orden-compra-recibir', kwargs={'pk': self.orden.pk})
+
+    def test_partial_then_full_reception_posts_stock_once(self):
+        response = self.client.post(self.url, {'items': [
+            {'id': self.item_producto.pk, 'cantidad_recibida': 4},
+            {'id': self.item_externo.pk, 'cantidad_recibida': 5},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['estado'], OrdenCompra.Estado.PARCIALMENTE_RECIBIDA)
+
+        response = self.client.post(self.url, {'items': [
+            {'id': self.item_producto.pk, 'cantidad_recibida': 10},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['estado'], OrdenCompra.Estado.RECIBIDA)
+
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.cantidad_actual, 12)
+        self.assertEqual(
+            list(self.producto.movimientos.order_by('id').values_list(
+                'tipo_movimiento', 'cantidad', 'documento_referencia'
+            )),
+            [('ingreso', 4, 'OC-REC-1'), ('ingreso', 6, 'OC-REC-1')]
+        )
+
+    def test_reception_cannot_decrease_received_quantity(self):
+        self.client.post(self.url, {'items': [{'id': self.item_producto.pk, 'cantidad_recibida': 4}]}, format='json')
+
+        response = self.client.post(self.url, {'items': [{'id': self.item_producto.pk, 'cantidad_recibida': 1}]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.cantidad_actual, 6)
+
+    def test_reception_rolls_back_when_product_rejects_stock(self):
+        Inventario.objects.filter(pk=self.producto.pk).update(activo=False)
+
+        response = self.client.post(self.url, {'items': [{'id': self.item_producto.pk, 'cantidad_recibida': 4}]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['errores'][0]['inventario'], self.producto.pk)
+        self.item_producto.refresh_from_db()
+        self.assertEqual(self.item_producto.cantidad_recibida, 0)
+        self.orden.refresh_from_db()
+        self.assertNotEqual(self.orden.estado, OrdenCompra.Estado.PARCIALMENTE_RECIBIDA)
@@ -3,7 +3,9 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Sum, Count, Max
+from django.db import transaction
+from django.db.models import F, Q, Sum, Count, Max
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
 from django.utils import timezone
 import traceback
 from .models import Proveedor, OrdenCompra, ItemOrdenCompra
@@ -16,6 +18,22 @@ from .serializer import (
     ItemOrdenCompraSerializer,
     HistorialCompraSerializer
 )
+from .services import (
+    ESTADOS_COMPRA_REALIZADA,
+    RecepcionInvalida,
+    anotar_totales_compras,
+    recibir_items_orden
+)
+from api.pagination import CursorPaginationOpcional
+from empleado.services import resolver_empleado_por_rut
+
+# Agrupaciones de tiempo de OrdenCompraViewSet.estadisticas (?bucket=)
+BUCKETS_ESTADISTICAS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+MAX_TOP_PROVEEDORES = 100
 
 
 class ProveedorViewSet(viewsets.ModelViewSet):
@@ -28,11 +46,15 @@ class ProveedorViewSet(viewsets.ModelViewSet):
     search_fields = ['nombre', 'razon_social', 'rut', 'email', 'telefono', 'contacto_principal']
     ordering_fields = ['nombre', 'fecha_creacion', 'fecha_actualizacion']
     ordering = ['-fecha_creacion']
+    cursor_ordering = ('-fecha_creacion', '-id')
 
     def get_queryset(self):
         """Obtener queryset de proveedores activos"""
         try:
-            return Proveedor.objects.filter(activo=True).select_related('creado_por', 'actualizado_por')
+            # total_ordenes, total_compras y ultima_compra se calculan en la misma consulta
+            return anotar_totales_compras(
+                Proveedor.objects.filter(activo=True).select_related('creado_por', 'actualizado_por')
+            )
         except Exception as e:
             # Si hay error al acceder a la tabla, retornar queryset vacío
             print(f"Error al obtener proveedores: {e}")
@@ -80,26 +102,44 @@ class ProveedorViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'])
     def historial_compras(self, request, pk=None):
-        """Obtener historial de compras de un proveedor"""
+        """
+        Obtener historial de compras de un proveedor.
+        Los totales vienen anotados en get_queryset (una sola consulta). Las órdenes se paginan por
+        cursor con ?page_size= (ver api/pagination.py) y ?por_mes=true agrega el gasto por mes.
+        """
         proveedor = self.get_object()
-        ordenes = proveedor.ordenes_compra.all().order_by('-fecha_orden')
-        
-        total_compras = sum(orden.total for orden in ordenes.filter(
-            estado__in=['recibida', 'parcialmente_recibida', 'facturada']
-        ))
+        ordenes = (
+            OrdenCompra.objects.filter(proveedor=proveedor)
+            .select_related('proveedor')
+            .prefetch_related('items')
+        )
         
-        ultima_compra = ordenes.filter(
-            estado__in=['recibida', 'parcialmente_recibida', 'facturada']
-        ).first()
+        paginador = CursorPaginationOpcional()
+        paginador.ordering = ('-fecha_orden', '-id')
+        pagina = paginador.paginate_queryset(ordenes, request)
         
         historial_data = {
             'proveedor_id': proveedor.id,
             'proveedor_nombre': proveedor.nombre,
-            'total_ordenes': ordenes.count(),
-            'total_compras': total_compras,
-            'ultima_compra': ultima_compra.fecha_creacion if ultima_compra else None,
-            'ordenes': ordenes
+            'total_ordenes': proveedor.total_ordenes,
+            'total_compras': proveedor.total_compras,
+            'ultima_compra': proveedor.ultima_compra,
+            'ordenes': pagina if pagina is not None else ordenes.order_by('-fecha_orden', '-id'),
         }
+        if pagina is not None:
+            historial_data['siguiente'] = paginador.get_next_link()
+            historial_data['anterior'] = paginador.get_previous_link()
+        
+        if request.query_params.get('por_mes', '').lower() in ('1', 'true'):
+            historial_data['gasto_mensual'] = list(
+                ordenes.filter(estado__in=ESTADOS_COMPRA_REALIZADA)
+                .prefetch_related(None)
+                .select_related(None)
+                .annotate(mes=TruncMonth('fecha_orden'))
+                .values('mes')
+                .annotate(ordenes=Count('id'), total_compras=Sum('total'))
+                .order_by('mes')
+            )
         
         serializer = HistorialCompraSerializer(historial_data)
         return Response(serializer.data)
@@ -138,6 +178,7 @@ class OrdenCompraViewSet(viewsets.ModelViewSet):
     search_fields = ['numero_orden', 'proveedor__nombre', 'numero_factura']
     ordering_fields = ['fecha_orden', 'fecha_creacion', 'total']
     ordering = ['-fecha_creacion']
+    cursor_ordering = ('-fecha_creacion', '-id')
 
     def get_serializer_class(self):
         """Retornar el serializer apropiado según la acción"""
@@ -219,42 +260,52 @@ class OrdenCompraViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'])
     def recibir(self, request, pk=None):
-        """Marcar una orden como recibida"""
+        """
+        Marcar una orden como recibida.
+        Body: {"items": [{"id": <item>, "cantidad_recibida": <cantidad acumulada>}]}
+        Lo recibido de items con producto asociado ingresa al inventario en la misma transacción.
+        """
         orden = self.get_object()
         items_recibidos = request.data.get('items', [])
-        
-        # Actualizar cantidad recibida de cada item
-        for item_data in items_recibidos:
-            item_id = item_data.get('id')
-            cantidad_recibida = item_data.get('cantidad_recibida', 0)
-            
-            try:
-                item = orden.items.get(id=item_id)
-                item.cantidad_recibida = cantidad_recibida
-                item.save()
-            except ItemOrdenCompra.DoesNotExist:
-                continue
-        
-        # Actualizar estado de la orden
-        total_recibido = sum(item.cantidad_recibida for item in orden.items.all())
-        total_esperado = sum(item.cantidad for item in orden.items.all())
-        
-        if total_recibido == 0:
+        if not isinstance(items_recibidos, list):
             return Response(
-                {'error': 'No se puede marcar como recibida sin items recibidos'},
+                {'error': 'items debe ser una lista'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        elif total_recibido == total_esperado:
-            orden.estado = OrdenCompra.Estado.RECIBIDA
-            orden.fecha_entrega_real = timezone.now().date()
-        else:
-            orden.estado = OrdenCompra.Estado.PARCIALMENTE_RECIBIDA
-            if not orden.fecha_entrega_real:
-                orden.fecha_entrega_real = timezone.now().date()
         
-        orden.save()
+        referencia = resolver_empleado_por_rut(request.headers.get('X-Empleado-Rut'))
         
-        serializer = self.get_serializer(orden)
+        with transaction.atomic():
+            # Bloquear la orden para que dos recepciones simultáneas no ingresen el mismo stock
+            orden = OrdenCompra.objects.select_for_update().select_related('proveedor').get(pk=orden.pk)
+            try:
+                total_recibido, total_esperado = recibir_items_orden(
+                    orden, items_recibidos, empleado_id=referencia.id if referencia else None
+                )
+            except RecepcionInvalida as e:
+                transaction.set_rollback(True)
+                respuesta = {'error': str(e)}
+                if e.errores:
+                    respuesta['errores'] = e.errores
+                return Response(respuesta, status=status.HTTP_400_BAD_REQUEST)
+            
+            # Actualizar estado de la orden
+            if total_recibido == 0:
+                return Response(
+                    {'error': 'No se puede marcar como recibida sin items recibidos'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            elif total_recibido >= total_esperado:
+                orden.estado = OrdenCompra.Estado.RECIBIDA
+                orden.fecha_entrega_real = timezone.now().date()
+            else:
+                orden.estado = OrdenCompra.Estado.PARCIALMENTE_RECIBIDA
+                if not orden.fecha_entrega_real:
+                    orden.fecha_entrega_real = timezone.now().date()
+            
+            orden.save(update_fields=['estado', 'fecha_entrega_real', 'fecha_actualizacion'])
+        
+        serializer = self.get_serializer(self.get_object())
         return Response(serializer.data)
 
     @action(detail=True, methods=['post'])
@@ -263,7 +314,8 @@ class OrdenCompraViewSet(viewsets.ModelViewSet):
         orden = self.get_object()
         item_data = request.data
         
-        item = ItemOrdenCompra.objects.create(orden_compra=orden, **item_data)
+        item = ItemOrdenCompra(orden_compra=orden, **item_data)
+        item.save(recalcular_orden=False)
         orden.calcular_total()
         
         serializer = ItemOrdenCompraSerializer(item)
@@ -305,24 +357,81 @@ class OrdenCompraViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def estadisticas(self, request):
-        """Obtener estadísticas de órdenes de compra"""
-        queryset = self.get_queryset()
+        """
+        Obtener estadísticas de órdenes de compra con un único GROUP BY por estado.
+        Parámetros opcionales:
+          ?bucket=day|week|month  serie de tiempo sobre fecha_orden
+          ?top=N                  N proveedores con mayor gasto en compras realizadas
+        """
+        bucket = request.query_params.get('bucket')
+        if bucket and bucket not in BUCKETS_ESTADISTICAS:
+            return Response(
+                {'error': f"bucket inválido. Opciones: {', '.join(BUCKETS_ESTADISTICAS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        top = request.query_params.get('top')
+        if top is not None:
+            try:
+                top = int(top)
+                if top < 1:
+                    raise ValueError
+            except ValueError:
+                return Response(
+                    {'error': 'top debe ser un entero positivo'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            top = min(top, MAX_TOP_PROVEEDORES)
+        
+        # Solo los filtros de get_queryset (proveedor_id, fecha_desde, fecha_hasta), sin joins ni prefetch
+        queryset = self.get_queryset().select_related(None).prefetch_related(None).order_by()
+        compra_realizada = Q(estado__in=ESTADOS_COMPRA_REALIZADA)
+        
+        por_estado = {
+            fila['estado']: fila
+            for fila in queryset.values('estado').annotate(cantidad=Count('id'), monto=Sum('total'))
+        }
         
-        total_ordenes = queryset.count()
-        ordenes_pendientes = queryset.filter(estado='pendiente').count()
-        ordenes_enviadas = queryset.filter(estado='enviada').count()
-        ordenes_recibidas = queryset.filter(estado='recibida').count()
-        ordenes_canceladas = queryset.filter(estado='cancelada').count()
+        def cantidad(estado):
+            return por_estado.get(estado, {}).get('cantidad', 0)
         
-        total_compras = queryset.filter(
-            estado__in=['recibida', 'parcialmente_recibida', 'facturada']
-        ).aggregate(total=Sum('total'))['total'] or 0
+        data = {
+            'total_ordenes': sum(fila['cantidad'] for fila in por_estado.values()),
+            'ordenes_pendientes': cantidad('pendiente'),
+            'ordenes_enviadas': cantidad('enviada'),
+            'ordenes_recibidas': cantidad('recibida'),
+            'ordenes_canceladas': cantidad('cancelada'),
+            'total_compras': sum(
+                fila['monto'] or 0 for estado, fila in por_estado.items() if estado in ESTADOS_COMPRA_REALIZADA
+            ),
+            'por_estado': {estado: cantidad(estado) for estado in OrdenCompra.Estado.values},
+        }
+        
+        if bucket:
+            data['serie'] = [
+                {
+                    'periodo': fila['periodo'],
+                    'ordenes': fila['ordenes'],
+                    'total': fila['monto'] or 0,
+                    'total_compras': fila['monto_compras'],
+                }
+                for fila in queryset
+                .annotate(periodo=BUCKETS_ESTADISTICAS[bucket]('fecha_orden'))
+                .values('periodo')
+                .annotate(
+                    ordenes=Count('id'),
+                    monto=Sum('total'),
+                    monto_compras=Sum('total', filter=compra_realizada, default=0),
+                )
+                .order_by('periodo')
+            ]
+        
+        if top:
+            data['top_proveedores'] = list(
+                queryset.filter(compra_realizada)
+                .values('proveedor_id', proveedor_nombre=F('proveedor__nombre'))
+                .annotate(ordenes=Count('id'), total_compras=Sum('total'))
+                .order_by('-total_compras', 'proveedor_id')[:top]
+            )
         
-        return Response({
-            'total_ordenes': total_ordenes,
-            'ordenes_pendientes': ordenes_pendientes,
-            'ordenes_enviadas': ordenes_enviadas,
-            'ordenes_recibidas': ordenes_recibidas,
-            'ordenes_canceladas': ordenes_canceladas,
-            'total_compras': total_compras,
-        })
+        return Response(data)
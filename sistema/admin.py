@@ -1,3 +1,10 @@
 from django.contrib import admin
+from .models import Reportes
 
-# Register your models here.
+
+@admin.register(Reportes)
+class ReportesAdmin(admin.ModelAdmin):
+    list_display = ['nombre_reporte', 'tipo_reporte', 'formato', 'estado', 'total_filas', 'tiempo_generacion', 'fecha_generacion']
+    list_filter = ['tipo_reporte', 'formato', 'estado']
+    search_fields = ['nombre_reporte']
+    readonly_fields = ['archivo_generado', 'total_filas', 'tiempo_generacion', 'mensaje_error', 'fecha_generacion']
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class SistemaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'sistema'
+
+    def ready(self):
+        # Conectar las señales de auditoría a los modelos configurados en AUDITORIA['MODELOS']
+        from .auditoria import conectar_senales
+        conectar_senales()
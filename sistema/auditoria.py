@@ -0,0 +1,285 @@
+import functools
+import json
+import os
+import queue
+import threading
+import time
+from contextvars import ContextVar
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, connection, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from .models import LogsActividad
+
+
+# Datos de la petición en curso (los completa AuditoriaMiddleware)
+contexto_auditoria = ContextVar('contexto_auditoria', default=None)
+
+CAMPOS_OCULTOS = {'password'}
+VALOR_BINARIO = '<binario>'
+
+
+def configuracion_auditoria():
+    config = getattr(settings, 'AUDITORIA', {})
+    return {
+        'ACTIVA': config.get('ACTIVA', True),
+        'SINCRONO': config.get('SINCRONO', False),
+        'MODELOS': config.get('MODELOS', []),
+        'MAX_COLA': config.get('MAX_COLA', 10000),
+        'TAMANO_LOTE': config.get('TAMANO_LOTE', 500),
+        'INTERVALO_SEGUNDOS': config.get('INTERVALO_SEGUNDOS', 1.0),
+    }
+
+
+class EscritorAuditoria:
+    """
+    Cola en memoria de registros de LogsActividad que un hilo en segundo plano escribe con
+    bulk_create, en lotes de hasta TAMANO_LOTE filas o cada INTERVALO_SEGUNDOS.
+
+    Contrapresión: la cola tiene un máximo de MAX_COLA registros. Si se llena (la base de datos
+    no da abasto), los registros nuevos se descartan y se cuentan en `descartados`: la auditoría
+    nunca bloquea ni hace fallar una petición. El hilo se inicia con el primer registro, y se
+    vuelve a crear si el proceso fue bifurcado (por ejemplo, workers de gunicorn).
+    """
+
+    def __init__(self, max_cola, tamano_lote, intervalo_segundos):
+        self.tamano_lote = tamano_lote
+        self.intervalo_segundos = intervalo_segundos
+        self._cola = queue.Queue(maxsize=max_cola)
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._pid = None
+        self.encolados = 0
+        self.escritos = 0
+        self.descartados = 0
+        self.errores = 0
+
+    def registrar(self, registro):
+        self._asegurar_hilo()
+        try:
+            self._cola.put_nowait(registro)
+        except queue.Full:
+            with self._lock:
+                self.descartados += 1
+            return False
+        with self._lock:
+            self.encolados += 1
+        return True
+
+    def _asegurar_hilo(self):
+        if self._hilo is not None and self._hilo.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._hilo is not None and self._hilo.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._hilo = threading.Thread(target=self._ejecutar, name='auditoria', daemon=True)
+            self._hilo.start()
+
+    def _tomar_lote(self):
+        """Esperar el primer registro y juntar más hasta completar el lote o el intervalo"""
+        lote = [self._cola.get()]
+        limite = time.monotonic() + self.intervalo_segundos
+        while len(lote) < self.tamano_lote:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                lote.append(self._cola.get(timeout=restante))
+            except queue.Empty:
+                break
+        return lote
+
+    def _ejecutar(self):
+        while True:
+            lote = self._tomar_lote()
+            try:
+                close_old_connections()
+                self._escribir(lote)
+            except Exception as e:
+                print(f"Error escribiendo {len(lote)} registros de auditoría: {e}")
+                with self._lock:
+                    self.errores += len(lote)
+            finally:
+                for _ in lote:
+                    self._cola.task_done()
+                # Sin peticiones que cierren la conexión, se cierra si la cola quedó vacía
+                if self._cola.empty():
+                    connection.close()
+
+    def _escribir(self, lote):
+        LogsActividad.objects.bulk_create([LogsActividad(**registro) for registro in lote])
+        with self._lock:
+            self.escritos += len(lote)
+
+    def vaciar(self, timeout=None):
+        """Esperar a que se escriban los registros encolados (apagado ordenado y pruebas)"""
+        if timeout is None:
+            self._cola.join()
+            return True
+        limite = time.monotonic() + timeout
+        while self._cola.unfinished_tasks:
+            if time.monotonic() > limite:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'encolados': self.encolados,
+                'escritos': self.escritos,
+                'descartados': self.descartados,
+                'errores': self.errores,
+                'pendientes': self._cola.qsize(),
+                'max_cola': self._cola.maxsize,
+                'tamano_lote': self.tamano_lote,
+            }
+
+
+_config = configuracion_auditoria()
+escritor_auditoria = EscritorAuditoria(
+    max_cola=_config['MAX_COLA'],
+    tamano_lote=_config['TAMANO_LOTE'],
+    intervalo_segundos=_config['INTERVALO_SEGUNDOS'],
+)
+
+
+def _valor_visible(campo, valor):
+    if campo in CAMPOS_OCULTOS and valor:
+        return '***'
+    # BinaryField (por ejemplo huella_digital): solo se registra que hay un valor
+    if isinstance(valor, (bytes, bytearray, memoryview)):
+        return VALOR_BINARIO
+    return valor
+
+
+def _valores_json(valores):
+    """Convertir fechas, Decimal, etc. a tipos JSON y ocultar campos sensibles y binarios"""
+    visibles = {campo: _valor_visible(campo, valor) for campo, valor in valores.items()}
+    return json.loads(json.dumps(visibles, cls=DjangoJSONEncoder))
+
+
+def _campos_auditados(modelo):
+    """attname de los campos concretos, sin los auto_now que cambian en cada guardado"""
+    return [
+        campo.attname for campo in modelo._meta.concrete_fields
+        if not getattr(campo, 'auto_now', False)
+    ]
+
+
+def encolar_registro(instancia, accion, datos_anteriores=None, datos_nuevos=None):
+    """
+    Armar el registro de LogsActividad con el contexto de la petición y encolarlo al confirmar
+    la transacción (los cambios revertidos no se registran).
+    """
+    contexto = contexto_auditoria.get() or {}
+    empleado_id = None
+    if contexto.get('empleado_rut'):
+        from empleado.services import resolver_empleado_por_rut
+        referencia = resolver_empleado_por_rut(contexto['empleado_rut'])
+        empleado_id = referencia.id if referencia else None
+
+    meta = instancia._meta
+    registro = {
+        'empleado_id_id': empleado_id,
+        'modulo': meta.app_label,
+        'accion': accion,
+        'tabla_afectada': meta.db_table,
+        'registro_id': instancia.pk if isinstance(instancia.pk, int) else None,
+        'descripcion': f"{meta.verbose_name} #{instancia.pk}: {accion}",
+        'datos_anteriores': _valores_json(datos_anteriores) if datos_anteriores else None,
+        'datos_nuevos': _valores_json(datos_nuevos) if datos_nuevos else None,
+        'ip_address': contexto.get('ip_address'),
+        'user_agent': contexto.get('user_agent'),
+    }
+
+    # robust=True: un fallo al escribir la auditoría no interrumpe los demás on_commit ni la respuesta
+    if configuracion_auditoria()['SINCRONO']:
+        transaction.on_commit(lambda: LogsActividad.objects.create(**registro), robust=True)
+    else:
+        transaction.on_commit(lambda: escritor_auditoria.registrar(registro), robust=True)
+
+
+# ---------------------------------------------------------------------------
+# Señales
+# ---------------------------------------------------------------------------
+
+def _sin_interrumpir(manejador):
+    """
+    Las señales se ejecutan dentro del guardado auditado: un error al armar el registro (por
+    ejemplo un valor que no se puede serializar) se imprime y se cuenta en errores del
+    escritor, pero nunca hace fallar la escritura.
+    """
+    @functools.wraps(manejador)
+    def envoltura(*args, **kwargs):
+        try:
+            manejador(*args, **kwargs)
+        except Exception as e:
+            escritor_auditoria.errores += 1
+            print(f"Error de auditoría en {manejador.__name__}: {e}")
+    return envoltura
+
+
+@_sin_interrumpir
+def _antes_de_guardar(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Leer los valores anteriores de la fila (una consulta, solo en actualizaciones)"""
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    campos = _campos_auditados(sender)
+    if update_fields is not None:
+        campos = [campo for campo in campos if campo in update_fields or campo.removesuffix('_id') in update_fields]
+    instance._auditoria_anteriores = sender._base_manager.filter(pk=instance.pk).values(*campos).first()
+
+
+@_sin_interrumpir
+def _despues_de_guardar(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        nuevos = {campo: getattr(instance, campo) for campo in _campos_auditados(sender)}
+        encolar_registro(instance, 'crear', datos_nuevos=nuevos)
+        return
+
+    anteriores = instance.__dict__.pop('_auditoria_anteriores', None)
+    if anteriores is None:
+        return
+    # Solo se registran los campos que cambiaron. Los valores nuevos pasan por to_python porque
+    # la instancia puede traer strings de la petición (por ejemplo '8' para un DecimalField)
+    campos = {campo.attname: campo for campo in sender._meta.concrete_fields}
+    nuevos = {}
+    for attname in anteriores:
+        valor = getattr(instance, attname)
+        try:
+            valor = campos[attname].to_python(valor)
+        except Exception:
+            pass
+        if valor != anteriores[attname]:
+            nuevos[attname] = valor
+    if nuevos:
+        encolar_registro(
+            instance, 'actualizar',
+            datos_anteriores={attname: anteriores[attname] for attname in nuevos},
+            datos_nuevos=nuevos,
+        )
+
+
+@_sin_interrumpir
+def _despues_de_eliminar(sender, instance, **kwargs):
+    anteriores = {campo: getattr(instance, campo) for campo in _campos_auditados(sender)}
+    encolar_registro(instance, 'eliminar', datos_anteriores=anteriores)
+
+
+def conectar_senales():
+    """Conectar las señales de auditoría a los modelos de AUDITORIA['MODELOS'] ('app.Modelo')"""
+    config = configuracion_auditoria()
+    if not config['ACTIVA']:
+        return
+    for etiqueta in config['MODELOS']:
+        modelo = apps.get_model(etiqueta)
+        uid = f'auditoria_{etiqueta}'
+        pre_save.connect(_antes_de_guardar, sender=modelo, dispatch_uid=uid)
+        post_save.connect(_despues_de_guardar, sender=modelo, dispatch_uid=uid)
+        post_delete.connect(_despues_de_eliminar, sender=modelo, dispatch_uid=uid)
@@ -0,0 +1,94 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide la latencia por petición de la API con y sin conexiones persistentes a la base de datos. '
+        'Usar las variables DB_* para apuntar a un MySQL/MariaDB local y DB_POOL=1 para medir el pool.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--peticiones', type=int, default=200, help='Peticiones medidas por modo')
+        parser.add_argument('--calentamiento', type=int, default=10, help='Peticiones previas no medidas')
+        parser.add_argument('--url', default='/api/inventario/?page_size=20', help='Endpoint a consultar')
+        parser.add_argument('--max-age', type=int, default=None,
+                            help='CONN_MAX_AGE del modo persistente (por defecto el de settings, o 60)')
+
+    def handle(self, *args, **options):
+        conexion = connections['default']
+        max_age_original = conexion.settings_dict['CONN_MAX_AGE']
+        pool = getattr(conexion, 'pool', None)
+
+        if pool is not None:
+            modos = [('pool', 0)]
+        else:
+            max_age = options['max_age'] or max_age_original or 60
+            modos = [('sin_persistencia', 0), ('persistente', max_age)]
+
+        self.stdout.write(
+            f"Backend: {conexion.settings_dict['ENGINE']} | host: {conexion.settings_dict['HOST'] or 'local'} | "
+            f"url: {options['url']} | peticiones: {options['peticiones']}"
+        )
+
+        nuevas = []
+
+        def contar_conexion(sender, connection, **kwargs):
+            if connection.alias == conexion.alias:
+                nuevas.append(1)
+
+        connection_created.connect(contar_conexion)
+        try:
+            for nombre, max_age in modos:
+                conexion.close()
+                conexion.settings_dict['CONN_MAX_AGE'] = max_age
+                cliente = Client()
+
+                for _ in range(options['calentamiento']):
+                    self.peticion(cliente, options['url'])
+
+                nuevas.clear()
+                creadas_pool = pool.creadas if pool is not None else 0
+                tiempos = []
+                for _ in range(options['peticiones']):
+                    inicio = time.perf_counter()
+                    response = self.peticion(cliente, options['url'])
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+                    if response.status_code >= 400:
+                        self.stdout.write(self.style.ERROR(
+                            f"{options['url']} respondió {response.status_code}; se detiene el benchmark"
+                        ))
+                        return
+
+                # Con el pool, connection_created se emite en cada préstamo; interesan las conexiones físicas
+                conexiones_abiertas = pool.creadas - creadas_pool if pool is not None else len(nuevas)
+                self.reportar(nombre, max_age, tiempos, conexiones_abiertas)
+        finally:
+            connection_created.disconnect(contar_conexion)
+            conexion.close()
+            conexion.settings_dict['CONN_MAX_AGE'] = max_age_original
+
+        if pool is not None:
+            self.stdout.write(f"Estado del pool: {pool.estadisticas()}")
+
+    def peticion(self, cliente, url):
+        # El Client de pruebas desconecta close_old_connections de las señales de petición;
+        # se invoca aquí igual que lo hace el handler WSGI/ASGI al inicio y fin de cada petición
+        close_old_connections()
+        response = cliente.get(url)
+        close_old_connections()
+        return response
+
+    def reportar(self, nombre, max_age, tiempos, conexiones_abiertas):
+        percentiles = statistics.quantiles(tiempos, n=100)
+        self.stdout.write(self.style.SUCCESS(
+            f"{nombre:<17} CONN_MAX_AGE={max_age:<4} "
+            f"media={statistics.mean(tiempos):.2f}ms p50={percentiles[49]:.2f}ms "
+            f"p95={percentiles[94]:.2f}ms máx={max(tiempos):.2f}ms "
+            f"conexiones abiertas={conexiones_abiertas}"
+        ))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from sistema.models import Reportes
+from sistema.reportes import generar_reporte
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera los reportes pendientes en este proceso. Sirve para recuperar los reportes que '
+        'quedaron encolados si el servidor se reinició, o como worker externo vía cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reiniciar-procesando', action='store_true',
+            help='Volver a pendiente los reportes que quedaron en procesando (usar solo con el servidor detenido)'
+        )
+
+    def handle(self, *args, **options):
+        if options['reiniciar_procesando']:
+            reiniciados = Reportes.objects.filter(estado='procesando').update(estado='pendiente')
+            self.stdout.write(f"{reiniciados} reportes vueltos a pendiente")
+
+        completados = fallidos = 0
+        pendientes = Reportes.objects.filter(estado='pendiente').order_by('id').values_list('id', flat=True)
+        for reporte_id in list(pendientes):
+            if generar_reporte(reporte_id):
+                completados += 1
+            else:
+                fallidos += 1
+        self.stdout.write(self.style.SUCCESS(f"{completados} reportes generados, {fallidos} con error u omitidos"))
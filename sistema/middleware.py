@@ -0,0 +1,24 @@
+from .auditoria import contexto_auditoria
+
+
+class AuditoriaMiddleware:
+    """
+    Guardar el RUT del empleado (header X-Empleado-Rut), la IP y el user agent de la petición
+    para que los registros de auditoría generados por las señales los incluyan.
+    El empleado se resuelve recién al registrar un cambio, así las lecturas no consultan nada.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        reenviada = request.META.get('HTTP_X_FORWARDED_FOR')
+        token = contexto_auditoria.set({
+            'empleado_rut': request.headers.get('X-Empleado-Rut'),
+            'ip_address': reenviada.split(',')[0].strip()[:45] if reenviada else request.META.get('REMOTE_ADDR'),
+            'user_agent': request.META.get('HTTP_USER_AGENT'),
+        })
+        try:
+            return self.get_response(request)
+        finally:
+            contexto_auditoria.reset(token)
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empleado', '0002_empleado_rut_normalizado'),
+        ('sistema', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportes',
+            name='estado',
+            field=models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('completado', 'Completado'), ('error', 'Error')], db_column='estado', default='pendiente', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='reportes',
+            name='mensaje_error',
+            field=models.TextField(blank=True, db_column='mensaje_error', null=True),
+        ),
+        migrations.AddField(
+            model_name='reportes',
+            name='total_filas',
+            field=models.IntegerField(blank=True, db_column='total_filas', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='reportes',
+            index=models.Index(fields=['estado'], name='reportes_estado_7afa2e_idx'),
+        ),
+    ]
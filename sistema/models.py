@@ -43,6 +43,13 @@ class Reportes(models.Model):
         ('json', 'JSON'),
     ]
     
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('completado', 'Completado'),
+        ('error', 'Error'),
+    ]
+    
     nombre_reporte = models.CharField(max_length=200, db_column='nombre_reporte')
     tipo_reporte = models.CharField(max_length=20, choices=TIPO_REPORTE_CHOICES, db_column='tipo_reporte')
     periodo_inicio = models.DateField(blank=True, null=True, db_column='periodo_inicio')
@@ -52,11 +59,16 @@ class Reportes(models.Model):
     formato = models.CharField(max_length=10, choices=FORMATO_CHOICES, default='pdf', db_column='formato')
     generado_por = models.ForeignKey(Empleado, on_delete=models.SET_NULL, blank=True, null=True, db_column='generado_por', related_name='reportes_generados')
     fecha_generacion = models.DateTimeField(auto_now_add=True, db_column='fecha_generacion')
+    # Milisegundos que tomó generar el archivo
     tiempo_generacion = models.IntegerField(blank=True, null=True, db_column='tiempo_generacion')
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente', db_column='estado')
+    total_filas = models.IntegerField(blank=True, null=True, db_column='total_filas')
+    mensaje_error = models.TextField(blank=True, null=True, db_column='mensaje_error')
     
     class Meta:
         db_table = 'reportes'
         indexes = [
+            models.Index(fields=['estado']),
             models.Index(fields=['tipo_reporte']),
             models.Index(fields=['fecha_generacion']),
             models.Index(fields=['generado_por']),
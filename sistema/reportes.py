@@ -0,0 +1,379 @@
+import csv
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, connection
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+from empleado.models import Asistencia, Empleado
+from inventario.models import Inventario
+from ventas.models import VentaDiaria
+from .models import Reportes
+
+
+# Filas leídas por viaje a la base de datos al recorrer los datos del reporte
+TAMANO_CHUNK_REPORTE = 2000
+
+FORMATOS_SOPORTADOS = ('csv', 'json', 'excel')
+EXTENSION_FORMATO = {'csv': 'csv', 'json': 'json', 'excel': 'xls'}
+CONTENT_TYPE_FORMATO = {
+    'csv': 'text/csv; charset=utf-8',
+    'json': 'application/json',
+    'excel': 'application/vnd.ms-excel',
+}
+
+
+def configuracion_reportes():
+    config = getattr(settings, 'REPORTES', {})
+    return {
+        'DIRECTORIO': Path(config.get('DIRECTORIO', settings.BASE_DIR / 'reportes_generados')),
+        'MAX_WORKERS': config.get('MAX_WORKERS', 2),
+        'SINCRONO': config.get('SINCRONO', False),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Definición de cada tipo de reporte: columnas, filas (iterador) y resumen.
+# Las filas se leen con values_list().iterator() para no cargar la tabla completa
+# en memoria; el resumen se resuelve con agregados en la base de datos.
+# ---------------------------------------------------------------------------
+
+def _filtrar_periodo(queryset, campo, reporte):
+    if reporte.periodo_inicio:
+        queryset = queryset.filter(**{f'{campo}__gte': reporte.periodo_inicio})
+    if reporte.periodo_fin:
+        queryset = queryset.filter(**{f'{campo}__lte': reporte.periodo_fin})
+    return queryset
+
+
+def _conteo_por(queryset, campo):
+    return dict(queryset.values_list(campo).annotate(total=Count('id')).order_by(campo))
+
+
+class ReportePersonal:
+    columnas = [
+        'rut', 'nombres', 'apellido_paterno', 'apellido_materno', 'cargo', 'departamento',
+        'tipo_contrato', 'estado', 'fecha_contratacion', 'activo',
+    ]
+
+    def __init__(self, reporte):
+        self.queryset = _filtrar_periodo(Empleado.objects.all(), 'fecha_contratacion', reporte)
+
+    def filas(self):
+        return self.queryset.order_by('apellido_paterno', 'id').values_list(
+            'rut', 'nombre', 'apellido_paterno', 'apellido_materno', 'cargo', 'departamento',
+            'tipo_contrato', 'estado', 'fecha_contratacion', 'activo',
+        ).iterator(chunk_size=TAMANO_CHUNK_REPORTE)
+
+    def resumen(self):
+        return {
+            **self.queryset.aggregate(total=Count('id'), activos=Count('id', filter=Q(activo=True))),
+            'por_cargo': _conteo_por(self.queryset, 'cargo'),
+            'por_estado': _conteo_por(self.queryset, 'estado'),
+            'por_tipo_contrato': _conteo_por(self.queryset, 'tipo_contrato'),
+        }
+
+
+class ReporteInventario:
+    columnas = [
+        'codigo_producto', 'nombre_producto', 'categoria', 'unidad_medida', 'cantidad_actual',
+        'cantidad_minima', 'precio_unitario', 'valor_stock', 'estado', 'proveedor', 'fecha_vencimiento',
+    ]
+
+    def __init__(self, reporte):
+        self.queryset = Inventario.objects.filter(activo=True)
+
+    def filas(self):
+        return (
+            self.queryset
+            .annotate(valor_stock=F('cantidad_actual') * F('precio_unitario'))
+            .order_by('categoria', 'nombre_producto')
+            .values_list(
+                'codigo_producto', 'nombre_producto', 'categoria', 'unidad_medida', 'cantidad_actual',
+                'cantidad_minima', 'precio_unitario', 'valor_stock', 'estado', 'proveedor__nombre',
+                'fecha_vencimiento',
+            )
+            .iterator(chunk_size=TAMANO_CHUNK_REPORTE)
+        )
+
+    def resumen(self):
+        return {
+            **self.queryset.aggregate(
+                total_productos=Count('id'),
+                stock_bajo=Count('id', filter=Q(cantidad_actual__lte=F('cantidad_minima'))),
+                valor_total=Sum(F('cantidad_actual') * F('precio_unitario'), default=0),
+            ),
+            'por_categoria': _conteo_por(self.queryset, 'categoria'),
+            'por_estado': _conteo_por(self.queryset, 'estado'),
+        }
+
+
+class ReporteAsistencia:
+    """Una fila por empleado con los totales del período (GROUP BY empleado_rut)"""
+    columnas = [
+        'rut', 'nombres', 'apellido_paterno', 'dias_registrados', 'presentes', 'tardes',
+        'ausentes', 'minutos_tarde', 'minutos_extras', 'horas_trabajadas',
+    ]
+
+    def __init__(self, reporte):
+        self.queryset = _filtrar_periodo(Asistencia.objects.all(), 'fecha', reporte)
+
+    def filas(self):
+        return (
+            self.queryset
+            .values_list('empleado_rut', 'empleado_rut__nombre', 'empleado_rut__apellido_paterno')
+            .annotate(
+                dias_registrados=Count('id'),
+                presentes=Count('id', filter=Q(estado='presente')),
+                tardes=Count('id', filter=Q(estado='tarde')),
+                ausentes=Count('id', filter=Q(estado='ausente')),
+                total_minutos_tarde=Sum('minutos_tarde', default=0),
+                total_minutos_extras=Sum('minutos_extras', default=0),
+                total_horas=Sum('horas_trabajadas', default=0),
+            )
+            .order_by('empleado_rut__apellido_paterno', 'empleado_rut')
+            .iterator(chunk_size=TAMANO_CHUNK_REPORTE)
+        )
+
+    def resumen(self):
+        return {
+            **self.queryset.aggregate(
+                registros=Count('id'),
+                empleados=Count('empleado_rut', distinct=True),
+                minutos_tarde=Sum('minutos_tarde', default=0),
+                minutos_extras=Sum('minutos_extras', default=0),
+            ),
+            'por_estado': _conteo_por(self.queryset, 'estado'),
+        }
+
+
+class ReporteFinanciero:
+    """Ventas por día leídas desde el resumen ventas_diarias"""
+    columnas = ['fecha', 'metodo_pago', 'unidades_vendidas', 'monto_total']
+
+    def __init__(self, reporte):
+        self.queryset = _filtrar_periodo(VentaDiaria.objects.all(), 'fecha', reporte)
+
+    def filas(self):
+        return (
+            self.queryset
+            .values_list('fecha', 'metodo_pago')
+            .annotate(unidades=Sum('unidades_vendidas'), monto=Sum('monto_total'))
+            .order_by('fecha', 'metodo_pago')
+            .iterator(chunk_size=TAMANO_CHUNK_REPORTE)
+        )
+
+    def resumen(self):
+        return {
+            **self.queryset.aggregate(
+                unidades_vendidas=Sum('unidades_vendidas', default=0),
+                monto_total=Sum('monto_total', default=0),
+            ),
+            'por_metodo_pago': dict(
+                self.queryset.values_list('metodo_pago').annotate(monto=Sum('monto_total')).order_by('metodo_pago')
+            ),
+        }
+
+
+TIPOS_REPORTE = {
+    'personal': ReportePersonal,
+    'inventario': ReporteInventario,
+    'asistencia': ReporteAsistencia,
+    'financiero': ReporteFinanciero,
+}
+
+
+# ---------------------------------------------------------------------------
+# Escritores: reciben las filas de a una y escriben directo al archivo
+# ---------------------------------------------------------------------------
+
+def _valor_texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return str(valor)
+
+
+def escribir_csv(archivo, definicion, filas):
+    escritor = csv.writer(archivo)
+    escritor.writerow(definicion.columnas)
+    total = 0
+    for fila in filas:
+        escritor.writerow([_valor_texto(valor) for valor in fila])
+        total += 1
+    return total
+
+
+def escribir_json(archivo, definicion, filas, encabezado):
+    """JSON escrito por partes: el arreglo datos nunca se arma completo en memoria"""
+    archivo.write('{"reporte": ')
+    json.dump(encabezado, archivo, cls=DjangoJSONEncoder, ensure_ascii=False)
+    archivo.write(', "resumen": ')
+    json.dump(definicion.resumen(), archivo, cls=DjangoJSONEncoder, ensure_ascii=False)
+    archivo.write(', "datos": [')
+    total = 0
+    for fila in filas:
+        if total:
+            archivo.write(', ')
+        json.dump(dict(zip(definicion.columnas, fila)), archivo, cls=DjangoJSONEncoder, ensure_ascii=False)
+        total += 1
+    archivo.write(']}')
+    return total
+
+
+def _celda_excel(valor):
+    if isinstance(valor, bool) or valor is None or isinstance(valor, (date, datetime)):
+        return f'<Cell><Data ss:Type="String">{escape(_valor_texto(valor))}</Data></Cell>'
+    if isinstance(valor, (int, float, Decimal)):
+        return f'<Cell><Data ss:Type="Number">{valor}</Data></Cell>'
+    return f'<Cell><Data ss:Type="String">{escape(str(valor))}</Data></Cell>'
+
+
+def _fila_excel(valores):
+    return '<Row>' + ''.join(_celda_excel(valor) for valor in valores) + '</Row>\n'
+
+
+def escribir_excel(archivo, definicion, filas):
+    """
+    Planilla en formato XML de Excel (SpreadsheetML), que se puede escribir fila a fila
+    sin dependencias adicionales. Incluye una hoja con los datos y otra con el resumen.
+    """
+    archivo.write(
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<Workbook xmlns="urn:schemas-microsoft-com:office:spreadsheet" '
+        'xmlns:ss="urn:schemas-microsoft-com:office:spreadsheet">\n'
+        '<Worksheet ss:Name="Datos"><Table>\n'
+    )
+    archivo.write(_fila_excel(definicion.columnas))
+    total = 0
+    for fila in filas:
+        archivo.write(_fila_excel(fila))
+        total += 1
+    archivo.write('</Table></Worksheet>\n<Worksheet ss:Name="Resumen"><Table>\n')
+    for clave, valor in definicion.resumen().items():
+        if isinstance(valor, dict):
+            for subclave, subvalor in valor.items():
+                archivo.write(_fila_excel([f'{clave}: {subclave}', subvalor]))
+        else:
+            archivo.write(_fila_excel([clave, valor]))
+    archivo.write('</Table></Worksheet>\n</Workbook>\n')
+    return total
+
+
+# ---------------------------------------------------------------------------
+# Ejecución
+# ---------------------------------------------------------------------------
+
+def ruta_archivo_reporte(reporte):
+    return configuracion_reportes()['DIRECTORIO'] / reporte.archivo_generado
+
+
+def generar_reporte(reporte_id):
+    """
+    Generar el archivo de un reporte pendiente y registrar el resultado en la tabla reportes.
+    El reporte se toma con un UPDATE condicionado a estado='pendiente', así que dos workers
+    (o el comando procesar_reportes) nunca generan el mismo reporte.
+    El archivo se escribe primero con extensión .parcial y se renombra al terminar.
+    Retorna True si el reporte quedó completado.
+    """
+    if not Reportes.objects.filter(pk=reporte_id, estado='pendiente').update(estado='procesando'):
+        return False
+
+    reporte = Reportes.objects.get(pk=reporte_id)
+    inicio = time.perf_counter()
+    directorio = configuracion_reportes()['DIRECTORIO']
+    nombre_archivo = f"reporte_{reporte.pk}_{reporte.tipo_reporte}.{EXTENSION_FORMATO.get(reporte.formato, 'dat')}"
+    ruta = directorio / nombre_archivo
+    ruta_parcial = ruta.with_name(ruta.name + '.parcial')
+
+    try:
+        if reporte.formato not in FORMATOS_SOPORTADOS:
+            raise ValueError(f'Formato no soportado: {reporte.formato}')
+        definicion = TIPOS_REPORTE[reporte.tipo_reporte](reporte)
+
+        directorio.mkdir(parents=True, exist_ok=True)
+        with open(ruta_parcial, 'w', encoding='utf-8', newline='') as archivo:
+            if reporte.formato == 'csv':
+                total_filas = escribir_csv(archivo, definicion, definicion.filas())
+            elif reporte.formato == 'json':
+                encabezado = {
+                    'id': reporte.pk,
+                    'nombre_reporte': reporte.nombre_reporte,
+                    'tipo_reporte': reporte.tipo_reporte,
+                    'periodo_inicio': reporte.periodo_inicio,
+                    'periodo_fin': reporte.periodo_fin,
+                    'fecha_generacion': timezone.now(),
+                }
+                total_filas = escribir_json(archivo, definicion, definicion.filas(), encabezado)
+            else:
+                total_filas = escribir_excel(archivo, definicion, definicion.filas())
+        os.replace(ruta_parcial, ruta)
+    except Exception as e:
+        print(f"Error generando reporte {reporte_id}: {e}")
+        if ruta_parcial.exists():
+            ruta_parcial.unlink()
+        Reportes.objects.filter(pk=reporte_id).update(
+            estado='error',
+            mensaje_error=str(e),
+            tiempo_generacion=int((time.perf_counter() - inicio) * 1000),
+        )
+        return False
+
+    Reportes.objects.filter(pk=reporte_id).update(
+        estado='completado',
+        archivo_generado=nombre_archivo,
+        total_filas=total_filas,
+        tiempo_generacion=int((time.perf_counter() - inicio) * 1000),
+        mensaje_error=None,
+    )
+    return True
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool_reportes():
+    """Pool de hilos del proceso, creado la primera vez que se encola un reporte"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=configuracion_reportes()['MAX_WORKERS'],
+                thread_name_prefix='reportes',
+            )
+        return _executor
+
+
+def _tarea_reporte(reporte_id):
+    # Cada hilo del pool usa su propia conexión; se cierra al terminar para no dejarla
+    # abierta indefinidamente entre reportes
+    close_old_connections()
+    try:
+        generar_reporte(reporte_id)
+    except Exception as e:
+        print(f"Error en el worker de reportes ({reporte_id}): {e}")
+    finally:
+        connection.close()
+
+
+def encolar_reporte(reporte_id):
+    """
+    Enviar un reporte al pool de workers en segundo plano. Si el proceso se reinicia antes
+    de generarlo, queda en estado pendiente y lo toma el comando procesar_reportes.
+    Con REPORTES['SINCRONO'] se genera en el mismo hilo (útil en pruebas).
+    """
+    if configuracion_reportes()['SINCRONO']:
+        generar_reporte(reporte_id)
+    else:
+        _pool_reportes().submit(_tarea_reporte, reporte_id)
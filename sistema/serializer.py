@@ -0,0 +1,79 @@
+from rest_framework import serializers
+from .models import Reportes, LogsActividad
+from .reportes import FORMATOS_SOPORTADOS, TIPOS_REPORTE
+
+
+class ReporteSerializer(serializers.ModelSerializer):
+    """Serializer para Reportes (estado y resultado de la generación)"""
+    tipo_reporte_display = serializers.CharField(source='get_tipo_reporte_display', read_only=True)
+    estado_display = serializers.CharField(source='get_estado_display', read_only=True)
+    
+    class Meta:
+        model = Reportes
+        fields = [
+            'id',
+            'nombre_reporte',
+            'tipo_reporte',
+            'tipo_reporte_display',
+            'periodo_inicio',
+            'periodo_fin',
+            'parametros',
+            'formato',
+            'estado',
+            'estado_display',
+            'archivo_generado',
+            'total_filas',
+            'tiempo_generacion',
+            'mensaje_error',
+            'generado_por',
+            'fecha_generacion',
+        ]
+        read_only_fields = fields
+
+
+class ReporteCreateSerializer(serializers.ModelSerializer):
+    """Serializer para solicitar la generación de un reporte"""
+    nombre_reporte = serializers.CharField(max_length=200, required=False, allow_blank=True)
+    tipo_reporte = serializers.ChoiceField(choices=[
+        (valor, etiqueta) for valor, etiqueta in Reportes.TIPO_REPORTE_CHOICES if valor in TIPOS_REPORTE
+    ])
+    formato = serializers.ChoiceField(choices=[
+        (valor, etiqueta) for valor, etiqueta in Reportes.FORMATO_CHOICES if valor in FORMATOS_SOPORTADOS
+    ])
+    
+    class Meta:
+        model = Reportes
+        fields = ['nombre_reporte', 'tipo_reporte', 'formato', 'periodo_inicio', 'periodo_fin', 'parametros']
+    
+    def validate(self, data):
+        inicio = data.get('periodo_inicio')
+        fin = data.get('periodo_fin')
+        if inicio and fin and inicio > fin:
+            raise serializers.ValidationError({'periodo_fin': 'periodo_fin no puede ser anterior a periodo_inicio.'})
+        if not data.get('nombre_reporte'):
+            periodo = f" {inicio or ''} - {fin or ''}" if inicio or fin else ''
+            data['nombre_reporte'] = f"Reporte de {data['tipo_reporte']}{periodo}"
+        return data
+
+
+class LogsActividadSerializer(serializers.ModelSerializer):
+    """Serializer de solo lectura para LogsActividad"""
+    empleado_id = serializers.IntegerField(source='empleado_id_id', read_only=True)
+    
+    class Meta:
+        model = LogsActividad
+        fields = [
+            'id',
+            'empleado_id',
+            'modulo',
+            'accion',
+            'tabla_afectada',
+            'registro_id',
+            'descripcion',
+            'datos_anteriores',
+            'datos_nuevos',
+            'ip_address',
+            'user_agent',
+            'fecha_registro',
+        ]
+        read_only_fields = fields
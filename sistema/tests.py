@@ -1,3 +1,160 @@
-from django.test import TestCase
+import csv
+import json
+import shutil
+import tempfile
+from datetime import date
+from django.conf import settings
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from empleado.models import Empleado
+from inventario.models import Inventario
+from proveedores.models import Proveedor
+from .auditoria import EscritorAuditoria
+from .models import Reportes, LogsActividad
 
-# Create your tests here.
+
+class ReporteGeneracionTest(APITestCase):
+    """Pruebas para la generación de reportes en el servidor"""
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        ajustes = override_settings(REPORTES={'DIRECTORIO': self.directorio, 'SINCRONO': True})
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        for i in range(3):
+            Empleado.objects.create(
+                rut=f'1000000{i}-{i}',
+                nombre=f'Empleado {i}',
+                apellido_paterno='Reporte',
+                cargo='Barista' if i else 'Cajero',
+                fecha_contratacion=date(2024, 1, 10 + i)
+            )
+        Inventario.objects.create(
+            codigo_producto='REP-001',
+            nombre_producto='Café "Especial", 1kg',
+            categoria=Inventario.Categoria.CAFE,
+            unidad_medida=Inventario.UnidadMedida.KILOGRAMO,
+            cantidad_actual=4,
+            cantidad_minima=5,
+            precio_unitario=1500
+        )
+
+    def solicitar(self, **datos):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('reporte-list'), datos, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED, response.data)
+        return Reportes.objects.get(pk=response.data['id'])
+
+    def descargar(self, reporte):
+        response = self.client.get(reverse('reporte-download', kwargs={'pk': reporte.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_csv_report_is_generated_and_downloadable(self):
+        reporte = self.solicitar(tipo_reporte='inventario', formato='csv')
+
+        self.assertEqual(reporte.estado, 'completado')
+        self.assertEqual(reporte.total_filas, 1)
+        self.assertIsNotNone(reporte.tiempo_generacion)
+        filas = list(csv.reader(self.descargar(reporte).splitlines()))
+        self.assertEqual(filas[0][:2], ['codigo_producto', 'nombre_producto'])
+        self.assertEqual(filas[1][1], 'Café "Especial", 1kg')
+        self.assertEqual(filas[1][7], '6000')
+
+    def test_json_report_includes_summary_and_period_filter(self):
+        reporte = self.solicitar(
+            tipo_reporte='personal', formato='json', periodo_inicio='2024-01-11', periodo_fin='2024-01-31'
+        )
+
+        contenido = json.loads(self.descargar(reporte))
+        self.assertEqual(contenido['resumen']['total'], 2)
+        self.assertEqual(contenido['resumen']['por_cargo'], {'Barista': 2})
+        self.assertEqual(len(contenido['datos']), 2)
+
+    def test_download_before_completion_and_invalid_requests(self):
+        reporte = Reportes.objects.create(nombre_reporte='En cola', tipo_reporte='personal', formato='excel')
+        response = self.client.get(reverse('reporte-download', kwargs={'pk': reporte.pk}))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        response = self.client.post(reverse('reporte-list'), {'tipo_reporte': 'personal', 'formato': 'pdf'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(AUDITORIA={**settings.AUDITORIA, 'SINCRONO': True})
+class AuditoriaTest(APITestCase):
+    """Pruebas del registro de auditoría en logs_actividad"""
+
+    def setUp(self):
+        self.empleado = Empleado.objects.create(
+            rut='12345678-5',
+            nombre='Auditor',
+            apellido_paterno='Test',
+            cargo='Administrador',
+            fecha_contratacion=date.today()
+        )
+        self.headers = {'HTTP_X_EMPLEADO_RUT': self.empleado.rut, 'REMOTE_ADDR': '10.0.0.5'}
+
+    def test_create_update_delete_are_logged_with_diff(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('proveedor-list'), {'nombre': 'Tostaduría Sur'}, format='json', **self.headers
+            )
+        proveedor_id = response.data['id']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                reverse('proveedor-detail', kwargs={'pk': proveedor_id}), {'telefono': '+56922222222'},
+                format='json', **self.headers
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            Proveedor.objects.get(pk=proveedor_id).delete()
+
+        logs = LogsActividad.objects.filter(tabla_afectada=Proveedor._meta.db_table).order_by('id')
+        self.assertEqual([log.accion for log in logs], ['crear', 'actualizar', 'eliminar'])
+        self.assertEqual(logs[0].empleado_id_id, self.empleado.pk)
+        self.assertEqual(logs[0].ip_address, '10.0.0.5')
+        self.assertEqual(logs[1].datos_anteriores, {'telefono': None})
+        self.assertEqual(logs[1].datos_nuevos, {'telefono': '+56922222222'})
+        self.assertEqual(logs[2].datos_anteriores['nombre'], 'Tostaduría Sur')
+
+        response = self.client.get(reverse('logs-actividad-list'), {'tabla_afectada': 'proveedores', 'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([log['accion'] for log in response.data['results']], ['eliminar', 'actualizar'])
+        self.assertIsNotNone(response.data['next'])
+
+    def test_password_is_masked(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Empleado.objects.create(
+                rut='87654321-4', nombre='Otro', apellido_paterno='Test', cargo='Barista',
+                fecha_contratacion=date.today(), password='secreto'
+            )
+        log = LogsActividad.objects.get(tabla_afectada='empleados', accion='crear', datos_nuevos__rut='87654321-4')
+        self.assertEqual(log.datos_nuevos['password'], '***')
+
+    def test_binary_fields_are_masked(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            empleado = Empleado.objects.create(
+                rut='11223344-5', nombre='Huella', apellido_paterno='Test', cargo='Barista',
+                fecha_contratacion=date.today(), huella_digital=b'\x01\x02'
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            empleado.huella_digital = b'\x03'
+            empleado.save()
+
+        logs = LogsActividad.objects.filter(tabla_afectada='empleados', registro_id=empleado.pk).order_by('id')
+        self.assertEqual([log.accion for log in logs], ['crear', 'actualizar'])
+        self.assertEqual(logs[0].datos_nuevos['huella_digital'], '<binario>')
+        self.assertEqual(logs[1].datos_nuevos, {'huella_digital': '<binario>'})
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        escritor = EscritorAuditoria(max_cola=2, tamano_lote=10, intervalo_segundos=0.01)
+        escritor._asegurar_hilo = lambda: None
+
+        resultados = [escritor.registrar({'modulo': 'x', 'accion': 'y'}) for _ in range(3)]
+
+        self.assertEqual(resultados, [True, True, False])
+        self.assertEqual(escritor.estadisticas()['descartados'], 1)
+        self.assertEqual(escritor.estadisticas()['pendientes'], 2)
@@ -0,0 +1,22 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import ReporteViewSet, LogsActividadViewSet
+
+router = DefaultRouter()
+router.register(r'reportes', ReporteViewSet, basename='reporte')
+router.register(r'logs-actividad', LogsActividadViewSet, basename='logs-actividad')
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
+
+# REPORTES:
+# GET    /api/reportes/                 - Listar reportes solicitados
+# POST   /api/reportes/                 - Solicitar un reporte (se genera en segundo plano)
+# GET    /api/reportes/{id}/            - Estado del reporte
+# GET    /api/reportes/{id}/download/   - Descargar el archivo generado
+#
+# AUDITORÍA:
+# GET    /api/logs-actividad/               - Registro de cambios (paginado por cursor)
+# GET    /api/logs-actividad/{id}/          - Detalle de un registro
+# GET    /api/logs-actividad/estadisticas/  - Estado de la cola de escritura
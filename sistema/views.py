@@ -1,3 +1,104 @@
-from django.shortcuts import render
+from django.db import transaction
+from django.http import FileResponse
+from rest_framework import mixins, viewsets, status, filters
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from django_filters.rest_framework import DjangoFilterBackend
+from datetime import date
+from api.pagination import CursorPaginationObligatoria
+from empleado.services import resolver_empleado_por_rut
+from .auditoria import escritor_auditoria
+from .models import Reportes, LogsActividad
+from .reportes import CONTENT_TYPE_FORMATO, encolar_reporte, ruta_archivo_reporte
+from .serializer import ReporteSerializer, ReporteCreateSerializer, LogsActividadSerializer
 
-# Create your views here.
+
+class ReporteViewSet(mixins.CreateModelMixin,
+                     mixins.ListModelMixin,
+                     mixins.RetrieveModelMixin,
+                     viewsets.GenericViewSet):
+    """
+    ViewSet para solicitar reportes generados en el servidor y descargarlos.
+    La generación corre en un pool de workers en segundo plano: POST responde 202 con el
+    reporte en estado pendiente, y el cliente consulta GET /api/reportes/{id}/ hasta que
+    quede completado para descargarlo.
+    """
+    queryset = Reportes.objects.all()
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['tipo_reporte', 'formato', 'estado', 'generado_por']
+    ordering_fields = ['fecha_generacion', 'tiempo_generacion']
+    ordering = ['-fecha_generacion']
+    cursor_ordering = ('-fecha_generacion', '-id')
+
+    def get_serializer_class(self):
+        if self.action == 'create':
+            return ReporteCreateSerializer
+        return ReporteSerializer
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        referencia = resolver_empleado_por_rut(request.headers.get('X-Empleado-Rut'))
+        reporte = serializer.save(
+            estado='pendiente',
+            generado_por_id=referencia.id if referencia else None,
+        )
+        # Encolar recién al confirmar, para que el worker encuentre la fila
+        transaction.on_commit(lambda: encolar_reporte(reporte.pk))
+        return Response(ReporteSerializer(reporte).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Descargar el archivo de un reporte completado"""
+        reporte = self.get_object()
+        if reporte.estado != 'completado':
+            return Response(
+                {'error': f'El reporte no está disponible (estado: {reporte.estado})', 'estado': reporte.estado},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        ruta = ruta_archivo_reporte(reporte)
+        if not ruta.exists():
+            return Response(
+                {'error': 'El archivo del reporte ya no existe'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return FileResponse(
+            open(ruta, 'rb'),
+            as_attachment=True,
+            filename=reporte.archivo_generado,
+            content_type=CONTENT_TYPE_FORMATO.get(reporte.formato),
+        )
+
+
+class LogsActividadViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Consulta del registro de auditoría (logs_actividad), siempre paginada por cursor
+    sobre (fecha_registro, id) para no recorrer la tabla completa.
+    Filtros: ?modulo, ?accion, ?tabla_afectada, ?registro_id, ?empleado_id,
+    ?fecha_inicio y ?fecha_fin (YYYY-MM-DD).
+    """
+    serializer_class = LogsActividadSerializer
+    pagination_class = CursorPaginationObligatoria
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['modulo', 'accion', 'tabla_afectada', 'registro_id', 'empleado_id']
+    cursor_ordering = ('-fecha_registro', '-id')
+
+    def get_queryset(self):
+        queryset = LogsActividad.objects.all()
+        fecha_inicio = self.request.query_params.get('fecha_inicio')
+        fecha_fin = self.request.query_params.get('fecha_fin')
+        try:
+            if fecha_inicio:
+                queryset = queryset.filter(fecha_registro__date__gte=date.fromisoformat(fecha_inicio))
+            if fecha_fin:
+                queryset = queryset.filter(fecha_registro__date__lte=date.fromisoformat(fecha_fin))
+        except ValueError:
+            return queryset.none()
+        return queryset
+
+    @action(detail=False, methods=['get'])
+    def estadisticas(self, request):
+        """Estado de la cola de escritura de auditoría de este proceso"""
+        return Response(escritor_auditoria.estadisticas())
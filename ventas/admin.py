@@ -0,0 +1,25 @@
+from django.contrib import admin
+from .models import Venta, DetalleVenta, VentaDiaria
+
+
+class DetalleVentaInline(admin.TabularInline):
+    model = DetalleVenta
+    extra = 0
+    raw_id_fields = ['inventario']
+
+
+@admin.register(Venta)
+class VentaAdmin(admin.ModelAdmin):
+    list_display = ['numero_venta', 'fecha_venta', 'empleado', 'metodo_pago', 'estado', 'total']
+    list_filter = ['estado', 'metodo_pago', 'tipo_venta']
+    search_fields = ['numero_venta']
+    date_hierarchy = 'fecha_venta'
+    inlines = [DetalleVentaInline]
+
+
+@admin.register(VentaDiaria)
+class VentaDiariaAdmin(admin.ModelAdmin):
+    list_display = ['fecha', 'inventario', 'metodo_pago', 'cantidad_ventas', 'unidades_vendidas', 'monto_total']
+    list_filter = ['metodo_pago']
+    date_hierarchy = 'fecha'
+    raw_id_fields = ['inventario']
@@ -0,0 +1,140 @@
+import random
+import statistics
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from empleado.models import Empleado
+from inventario.models import Inventario, MovimientosInventario
+from ventas.models import Venta, DetalleVenta
+from ventas.services import registrar_venta
+
+
+class Command(BaseCommand):
+    help = (
+        'Registra cientos de ventas concurrentes sobre unos pocos productos para medir el throughput '
+        'de registrar_venta y verificar que el stock descontado coincida con lo vendido'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ventas', type=int, default=300, help='Cantidad total de ventas')
+        parser.add_argument('--hilos', type=int, default=16, help='Cajas (hilos) vendiendo en paralelo')
+        parser.add_argument('--productos', type=int, default=5, help='Productos de prueba (menos productos = más contención)')
+        parser.add_argument('--lineas', type=int, default=3, help='Líneas por venta')
+        parser.add_argument('--conservar', action='store_true', help='No eliminar los datos de prueba al terminar')
+
+    def handle(self, *args, **options):
+        empleado_id = Empleado.objects.filter(activo=True).values_list('id', flat=True).first()
+        if empleado_id is None:
+            raise CommandError('Se necesita al menos un empleado activo para registrar ventas.')
+
+        total_ventas = options['ventas']
+        lineas_por_venta = min(options['lineas'], options['productos'])
+        stock_inicial = total_ventas * lineas_por_venta * 10
+        prefijo = f"BENCH-{uuid.uuid4().hex[:6].upper()}"
+        productos = [
+            Inventario.objects.create(
+                codigo_producto=f'{prefijo}-{i}',
+                nombre_producto=f'Producto benchmark {i}',
+                categoria=Inventario.Categoria.OTROS,
+                unidad_medida=Inventario.UnidadMedida.UNIDAD,
+                cantidad_actual=stock_inicial,
+                cantidad_minima=0,
+                precio_venta=1000,
+            )
+            for i in range(options['productos'])
+        ]
+        ids = [producto.pk for producto in productos]
+
+        pendientes = iter(range(total_ventas))
+        lock = threading.Lock()
+        tiempos = []
+        fallidas = []
+
+        def caja():
+            rng = random.Random()
+            try:
+                while True:
+                    with lock:
+                        numero = next(pendientes, None)
+                    if numero is None:
+                        return
+                    datos = {
+                        'numero_venta': f'{prefijo}-{numero}',
+                        'metodo_pago': 'efectivo',
+                        'detalles': [
+                            {'inventario': inventario_id, 'cantidad': rng.randint(1, 3)}
+                            for inventario_id in rng.sample(ids, lineas_por_venta)
+                        ],
+                    }
+                    inicio = time.perf_counter()
+                    try:
+                        registrar_venta(datos, empleado_id)
+                    except Exception as e:
+                        fallidas.append(f'{type(e).__name__}: {e}')
+                        continue
+                    with lock:
+                        tiempos.append((time.perf_counter() - inicio) * 1000)
+            finally:
+                connection.close()
+
+        inicio_total = time.perf_counter()
+        cajas = [threading.Thread(target=caja) for _ in range(options['hilos'])]
+        for hilo in cajas:
+            hilo.start()
+        for hilo in cajas:
+            hilo.join()
+        duracion = time.perf_counter() - inicio_total
+
+        self.reportar(tiempos, fallidas, duracion, options)
+        consistente = self.verificar_stock(ids, stock_inicial, prefijo)
+
+        if not options['conservar']:
+            MovimientosInventario.objects.filter(inventario_id__in=ids).delete()
+            Venta.objects.filter(numero_venta__startswith=prefijo).delete()
+            Inventario.objects.filter(pk__in=ids).delete()
+
+        if not consistente:
+            raise CommandError('El stock final no coincide con las ventas registradas.')
+
+    def reportar(self, tiempos, fallidas, duracion, options):
+        self.stdout.write(
+            f"Backend: {connection.settings_dict['ENGINE']} | ventas: {options['ventas']} | "
+            f"hilos: {options['hilos']} | productos: {options['productos']} | líneas por venta: {options['lineas']}"
+        )
+        if len(tiempos) >= 2:
+            percentiles = statistics.quantiles(tiempos, n=100)
+            self.stdout.write(self.style.SUCCESS(
+                f"{len(tiempos)} ventas en {duracion:.2f}s ({len(tiempos) / duracion:.1f} ventas/s) | "
+                f"media={statistics.mean(tiempos):.2f}ms p50={percentiles[49]:.2f}ms "
+                f"p95={percentiles[94]:.2f}ms máx={max(tiempos):.2f}ms"
+            ))
+        if fallidas:
+            self.stdout.write(self.style.WARNING(f"{len(fallidas)} ventas fallidas. Primera: {fallidas[0]}"))
+
+    def verificar_stock(self, ids, stock_inicial, prefijo):
+        vendido = dict(
+            DetalleVenta.objects.filter(venta__numero_venta__startswith=prefijo)
+            .values_list('inventario_id')
+            .annotate(total=Sum('cantidad'))
+        )
+        movido = dict(
+            MovimientosInventario.objects.filter(inventario_id__in=ids, tipo_movimiento='venta')
+            .values_list('inventario_id')
+            .annotate(total=Sum('cantidad'))
+        )
+        consistente = True
+        for inventario_id, cantidad_actual in Inventario.objects.filter(pk__in=ids).values_list('id', 'cantidad_actual'):
+            descontado = stock_inicial - cantidad_actual
+            if descontado != vendido.get(inventario_id, 0) or descontado != movido.get(inventario_id, 0):
+                consistente = False
+                self.stdout.write(self.style.ERROR(
+                    f"Producto {inventario_id}: descontado={descontado} vendido={vendido.get(inventario_id, 0)} "
+                    f"movimientos={movido.get(inventario_id, 0)}"
+                ))
+        if consistente:
+            self.stdout.write(self.style.SUCCESS('Stock consistente: lo descontado coincide con detalles y movimientos.'))
+        return consistente
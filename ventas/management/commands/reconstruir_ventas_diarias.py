@@ -0,0 +1,34 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from ventas.services import reconstruir_ventas_diarias
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el resumen ventas_diarias desde detalle_ventas (backfill o corrección de un rango)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Fecha inicial inclusive (YYYY-MM-DD)')
+        parser.add_argument('--hasta', help='Fecha final inclusive (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        desde = self._fecha(options['desde'], '--desde')
+        hasta = self._fecha(options['hasta'], '--hasta')
+        if desde and hasta and desde > hasta:
+            raise CommandError('--desde no puede ser posterior a --hasta')
+
+        inicio = time.perf_counter()
+        insertadas = reconstruir_ventas_diarias(desde, hasta)
+        rango = f"{desde or 'inicio'} a {hasta or 'hoy'}"
+        self.stdout.write(self.style.SUCCESS(
+            f"ventas_diarias reconstruida ({rango}): {insertadas} filas en {time.perf_counter() - inicio:.2f}s"
+        ))
+
+    def _fecha(self, valor, opcion):
+        if not valor:
+            return None
+        try:
+            return date.fromisoformat(valor)
+        except ValueError:
+            raise CommandError(f'{opcion} debe tener formato YYYY-MM-DD')
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:30
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('empleado', '0002_empleado_rut_normalizado'),
+        ('inventario', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Venta',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('numero_venta', models.CharField(db_column='numero_venta', max_length=50, unique=True)),
+                ('fecha_venta', models.DateTimeField(db_column='fecha_venta', default=django.utils.timezone.now)),
+                ('subtotal', models.IntegerField(db_column='subtotal', default=0)),
+                ('descuento', models.IntegerField(db_column='descuento', default=0)),
+                ('impuesto', models.IntegerField(db_column='impuesto', default=0)),
+                ('total', models.IntegerField(db_column='total')),
+                ('metodo_pago', models.CharField(choices=[('efectivo', 'Efectivo'), ('tarjeta_debito', 'Tarjeta de Débito'), ('tarjeta_credito', 'Tarjeta de Crédito'), ('transferencia', 'Transferencia'), ('multiple', 'Múltiple')], db_column='metodo_pago', max_length=20)),
+                ('estado', models.CharField(choices=[('completada', 'Completada'), ('cancelada', 'Cancelada'), ('pendiente', 'Pendiente'), ('reembolsada', 'Reembolsada')], db_column='estado', default='completada', max_length=20)),
+                ('tipo_venta', models.CharField(choices=[('local', 'Local'), ('delivery', 'Delivery'), ('para_llevar', 'Para llevar')], db_column='tipo_venta', default='local', max_length=20)),
+                ('mesa_numero', models.CharField(blank=True, db_column='mesa_numero', max_length=20, null=True)),
+                ('notas', models.TextField(blank=True, db_column='notas', null=True)),
+                ('fecha_cancelacion', models.DateTimeField(blank=True, db_column='fecha_cancelacion', null=True)),
+                ('motivo_cancelacion', models.TextField(blank=True, db_column='motivo_cancelacion', null=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, db_column='fecha_creacion')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, db_column='fecha_actualizacion')),
+                ('cancelada_por', models.ForeignKey(blank=True, db_column='cancelada_por', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ventas_canceladas', to='empleado.empleado')),
+                ('empleado', models.ForeignKey(db_column='empleado_id', on_delete=django.db.models.deletion.PROTECT, related_name='ventas', to='empleado.empleado')),
+            ],
+            options={
+                'verbose_name': 'Venta',
+                'verbose_name_plural': 'Ventas',
+                'db_table': 'ventas',
+            },
+        ),
+        migrations.CreateModel(
+            name='DetalleVenta',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.IntegerField(db_column='cantidad')),
+                ('precio_unitario', models.IntegerField(db_column='precio_unitario')),
+                ('subtotal', models.IntegerField(db_column='subtotal')),
+                ('descuento_item', models.IntegerField(db_column='descuento_item', default=0)),
+                ('total_item', models.IntegerField(db_column='total_item')),
+                ('notas_item', models.TextField(blank=True, db_column='notas_item', null=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, db_column='fecha_creacion')),
+                ('inventario', models.ForeignKey(db_column='inventario_id', on_delete=django.db.models.deletion.PROTECT, related_name='detalles_venta', to='inventario.inventario')),
+                ('venta', models.ForeignKey(db_column='venta_id', on_delete=django.db.models.deletion.CASCADE, related_name='detalles', to='ventas.venta')),
+            ],
+            options={
+                'verbose_name': 'Detalle de Venta',
+                'verbose_name_plural': 'Detalles de Venta',
+                'db_table': 'detalle_ventas',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['fecha_venta'], name='ventas_fecha_v_df623b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['estado'], name='ventas_estado_505824_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['metodo_pago'], name='ventas_metodo__6717c5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['fecha_venta', 'estado'], name='ventas_fecha_v_8aff2e_idx'),
+        ),
+    ]
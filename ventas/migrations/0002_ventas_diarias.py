@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0002_initial'),
+        ('ventas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaDiaria',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(db_column='fecha')),
+                ('metodo_pago', models.CharField(choices=[('efectivo', 'Efectivo'), ('tarjeta_debito', 'Tarjeta de Débito'), ('tarjeta_credito', 'Tarjeta de Crédito'), ('transferencia', 'Transferencia'), ('multiple', 'Múltiple')], db_column='metodo_pago', max_length=20)),
+                ('cantidad_ventas', models.IntegerField(db_column='cantidad_ventas', default=0)),
+                ('unidades_vendidas', models.IntegerField(db_column='unidades_vendidas', default=0)),
+                ('monto_total', models.BigIntegerField(db_column='monto_total', default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, db_column='fecha_actualizacion')),
+                ('inventario', models.ForeignKey(db_column='inventario_id', on_delete=django.db.models.deletion.CASCADE, related_name='ventas_diarias', to='inventario.inventario')),
+            ],
+            options={
+                'verbose_name': 'Venta Diaria',
+                'verbose_name_plural': 'Ventas Diarias',
+                'db_table': 'ventas_diarias',
+                'indexes': [models.Index(fields=['inventario', 'fecha'], name='ventas_diar_inventa_377b8b_idx')],
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'inventario', 'metodo_pago'), name='uniq_venta_diaria')],
+            },
+        ),
+    ]
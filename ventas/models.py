@@ -0,0 +1,116 @@
+from django.db import models
+from django.utils import timezone
+from empleado.models import Empleado
+from inventario.models import Inventario
+
+
+class Venta(models.Model):
+    """Venta del punto de venta (tabla ventas)"""
+    
+    class MetodoPago(models.TextChoices):
+        EFECTIVO = 'efectivo', 'Efectivo'
+        TARJETA_DEBITO = 'tarjeta_debito', 'Tarjeta de Débito'
+        TARJETA_CREDITO = 'tarjeta_credito', 'Tarjeta de Crédito'
+        TRANSFERENCIA = 'transferencia', 'Transferencia'
+        MULTIPLE = 'multiple', 'Múltiple'
+    
+    class Estado(models.TextChoices):
+        COMPLETADA = 'completada', 'Completada'
+        CANCELADA = 'cancelada', 'Cancelada'
+        PENDIENTE = 'pendiente', 'Pendiente'
+        REEMBOLSADA = 'reembolsada', 'Reembolsada'
+    
+    class TipoVenta(models.TextChoices):
+        LOCAL = 'local', 'Local'
+        DELIVERY = 'delivery', 'Delivery'
+        PARA_LLEVAR = 'para_llevar', 'Para llevar'
+    
+    numero_venta = models.CharField(max_length=50, unique=True, db_column='numero_venta')
+    empleado = models.ForeignKey(Empleado, on_delete=models.PROTECT, related_name='ventas', db_column='empleado_id')
+    fecha_venta = models.DateTimeField(default=timezone.now, db_column='fecha_venta')
+    
+    # Montos en pesos (CLP)
+    subtotal = models.IntegerField(default=0, db_column='subtotal')
+    descuento = models.IntegerField(default=0, db_column='descuento')
+    impuesto = models.IntegerField(default=0, db_column='impuesto')
+    total = models.IntegerField(db_column='total')
+    
+    metodo_pago = models.CharField(max_length=20, choices=MetodoPago.choices, db_column='metodo_pago')
+    estado = models.CharField(max_length=20, choices=Estado.choices, default=Estado.COMPLETADA, db_column='estado')
+    tipo_venta = models.CharField(max_length=20, choices=TipoVenta.choices, default=TipoVenta.LOCAL, db_column='tipo_venta')
+    mesa_numero = models.CharField(max_length=20, blank=True, null=True, db_column='mesa_numero')
+    notas = models.TextField(blank=True, null=True, db_column='notas')
+    
+    # Cancelación
+    cancelada_por = models.ForeignKey(Empleado, on_delete=models.SET_NULL, blank=True, null=True, related_name='ventas_canceladas', db_column='cancelada_por')
+    fecha_cancelacion = models.DateTimeField(blank=True, null=True, db_column='fecha_cancelacion')
+    motivo_cancelacion = models.TextField(blank=True, null=True, db_column='motivo_cancelacion')
+    
+    fecha_creacion = models.DateTimeField(auto_now_add=True, db_column='fecha_creacion')
+    fecha_actualizacion = models.DateTimeField(auto_now=True, db_column='fecha_actualizacion')
+    
+    class Meta:
+        db_table = 'ventas'
+        verbose_name = 'Venta'
+        verbose_name_plural = 'Ventas'
+        indexes = [
+            models.Index(fields=['fecha_venta']),
+            models.Index(fields=['estado']),
+            models.Index(fields=['metodo_pago']),
+            models.Index(fields=['fecha_venta', 'estado']),
+        ]
+    
+    def __str__(self):
+        return f"Venta {self.numero_venta} - ${self.total}"
+
+
+class DetalleVenta(models.Model):
+    """Línea de una venta (tabla detalle_ventas)"""
+    
+    venta = models.ForeignKey(Venta, on_delete=models.CASCADE, related_name='detalles', db_column='venta_id')
+    inventario = models.ForeignKey(Inventario, on_delete=models.PROTECT, related_name='detalles_venta', db_column='inventario_id')
+    cantidad = models.IntegerField(db_column='cantidad')
+    precio_unitario = models.IntegerField(db_column='precio_unitario')
+    subtotal = models.IntegerField(db_column='subtotal')
+    descuento_item = models.IntegerField(default=0, db_column='descuento_item')
+    total_item = models.IntegerField(db_column='total_item')
+    notas_item = models.TextField(blank=True, null=True, db_column='notas_item')
+    fecha_creacion = models.DateTimeField(auto_now_add=True, db_column='fecha_creacion')
+    
+    class Meta:
+        db_table = 'detalle_ventas'
+        verbose_name = 'Detalle de Venta'
+        verbose_name_plural = 'Detalles de Venta'
+    
+    def __str__(self):
+        return f"{self.inventario_id} x {self.cantidad} (venta {self.venta_id})"
+
+
+class VentaDiaria(models.Model):
+    """
+    Resumen de ventas completadas por día × producto × método de pago (tabla ventas_diarias).
+    Se actualiza de forma incremental al confirmarse cada venta y se puede reconstruir
+    con el comando reconstruir_ventas_diarias. Los montos son la suma de total_item.
+    """
+    
+    fecha = models.DateField(db_column='fecha')
+    inventario = models.ForeignKey(Inventario, on_delete=models.CASCADE, related_name='ventas_diarias', db_column='inventario_id')
+    metodo_pago = models.CharField(max_length=20, choices=Venta.MetodoPago.choices, db_column='metodo_pago')
+    cantidad_ventas = models.IntegerField(default=0, db_column='cantidad_ventas')
+    unidades_vendidas = models.IntegerField(default=0, db_column='unidades_vendidas')
+    monto_total = models.BigIntegerField(default=0, db_column='monto_total')
+    fecha_actualizacion = models.DateTimeField(auto_now=True, db_column='fecha_actualizacion')
+    
+    class Meta:
+        db_table = 'ventas_diarias'
+        verbose_name = 'Venta Diaria'
+        verbose_name_plural = 'Ventas Diarias'
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'inventario', 'metodo_pago'], name='uniq_venta_diaria'),
+        ]
+        indexes = [
+            models.Index(fields=['inventario', 'fecha']),
+        ]
+    
+    def __str__(self):
+        return f"{self.fecha} - {self.inventario_id} ({self.metodo_pago}): {self.unidades_vendidas}"
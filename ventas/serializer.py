@@ -0,0 +1,94 @@
+from rest_framework import serializers
+from .models import Venta, DetalleVenta
+
+
+# Máximo de líneas por venta aceptadas por POST /api/ventas/
+MAX_LINEAS_POR_VENTA = 200
+
+
+class DetalleVentaSerializer(serializers.ModelSerializer):
+    """Serializer para DetalleVenta"""
+    nombre_producto = serializers.CharField(source='inventario.nombre_producto', read_only=True)
+    
+    class Meta:
+        model = DetalleVenta
+        fields = [
+            'id',
+            'inventario',
+            'nombre_producto',
+            'cantidad',
+            'precio_unitario',
+            'subtotal',
+            'descuento_item',
+            'total_item',
+            'notas_item',
+        ]
+
+
+class VentaSerializer(serializers.ModelSerializer):
+    """Serializer para Venta con sus líneas"""
+    metodo_pago_display = serializers.CharField(source='get_metodo_pago_display', read_only=True)
+    estado_display = serializers.CharField(source='get_estado_display', read_only=True)
+    tipo_venta_display = serializers.CharField(source='get_tipo_venta_display', read_only=True)
+    detalles = DetalleVentaSerializer(many=True, read_only=True)
+    
+    class Meta:
+        model = Venta
+        fields = [
+            'id',
+            'numero_venta',
+            'empleado',
+            'fecha_venta',
+            'subtotal',
+            'descuento',
+            'impuesto',
+            'total',
+            'metodo_pago',
+            'metodo_pago_display',
+            'estado',
+            'estado_display',
+            'tipo_venta',
+            'tipo_venta_display',
+            'mesa_numero',
+            'notas',
+            'cancelada_por',
+            'fecha_cancelacion',
+            'motivo_cancelacion',
+            'fecha_creacion',
+            'detalles',
+        ]
+        read_only_fields = fields
+
+
+class DetalleVentaCreateSerializer(serializers.Serializer):
+    """Línea de una venta nueva. El producto se valida junto con el resto en registrar_venta"""
+    inventario = serializers.IntegerField(min_value=1)
+    cantidad = serializers.IntegerField(min_value=1)
+    precio_unitario = serializers.IntegerField(min_value=0, required=False, allow_null=True)
+    descuento_item = serializers.IntegerField(min_value=0, required=False, default=0)
+    notas_item = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    
+    def validate(self, data):
+        precio_unitario = data.get('precio_unitario')
+        if precio_unitario is not None and data['descuento_item'] > precio_unitario * data['cantidad']:
+            raise serializers.ValidationError({'descuento_item': 'El descuento no puede superar el subtotal de la línea.'})
+        return data
+
+
+class VentaCreateSerializer(serializers.Serializer):
+    """Serializer para registrar una venta con sus líneas"""
+    numero_venta = serializers.CharField(max_length=50, required=False, allow_blank=True)
+    empleado = serializers.IntegerField(min_value=1, required=False)
+    fecha_venta = serializers.DateTimeField(required=False)
+    metodo_pago = serializers.ChoiceField(choices=Venta.MetodoPago.choices)
+    tipo_venta = serializers.ChoiceField(choices=Venta.TipoVenta.choices, required=False)
+    mesa_numero = serializers.CharField(max_length=20, required=False, allow_blank=True, allow_null=True)
+    notas = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    descuento = serializers.IntegerField(min_value=0, required=False, default=0)
+    impuesto = serializers.IntegerField(min_value=0, required=False, default=0)
+    detalles = DetalleVentaCreateSerializer(many=True, allow_empty=False, max_length=MAX_LINEAS_POR_VENTA)
+    
+    def validate_numero_venta(self, value):
+        if value and Venta.objects.filter(numero_venta=value).exists():
+            raise serializers.ValidationError("Ya existe una venta con este número.")
+        return value
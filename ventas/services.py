@@ -0,0 +1,235 @@
+import uuid
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from inventario.models import Inventario
+from inventario.services import registrar_movimientos
+from .models import Venta, DetalleVenta, VentaDiaria
+
+
+# Filas de ventas_diarias insertadas por lote al reconstruir el resumen
+TAMANO_LOTE_RESUMEN = 1000
+
+
+class VentaRechazada(Exception):
+    """La venta no se pudo registrar; `errores` contiene el detalle por línea"""
+
+    def __init__(self, mensaje, errores=None):
+        super().__init__(mensaje)
+        self.errores = errores or []
+
+
+def generar_numero_venta():
+    return f"V-{timezone.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8].upper()}"
+
+
+def registrar_venta(datos, empleado_id):
+    """
+    Registrar una venta con sus líneas y descontar el stock en una sola transacción.
+
+    `datos` son los datos validados por VentaCreateSerializer. Los precios que no vienen en la
+    línea se toman de Inventario.precio_venta. Orden de escritura:
+      1. registrar_movimientos: SELECT ... FOR UPDATE de los productos (ordenado por id),
+         UPDATE agrupado con F() y bulk_create de los movimientos 'venta'
+      2. INSERT de la venta y bulk_create de sus detalles
+    Los productos se bloquean antes de insertar los detalles: en InnoDB la verificación de la
+    clave foránea de cada detalle toma un bloqueo compartido sobre la fila de inventario, y
+    dos ventas del mismo producto que la tomaran antes del FOR UPDATE se bloquearían
+    mutuamente (deadlock). Si falta stock se revierte todo y se lanza VentaRechazada.
+    También se rechaza un descuento mayor al subtotal de su línea o de la venta, así que
+    ningún total queda negativo.
+    """
+    lineas = datos['detalles']
+    ids = {linea['inventario'] for linea in lineas}
+    productos = {
+        producto['id']: producto
+        for producto in Inventario.objects.filter(pk__in=ids, activo=True).values('id', 'precio_venta')
+    }
+
+    errores = []
+    detalles = []
+    for indice, linea in enumerate(lineas):
+        producto = productos.get(linea['inventario'])
+        if producto is None:
+            errores.append({'indice': indice, 'inventario': linea['inventario'], 'error': 'Producto no encontrado'})
+            continue
+        precio_unitario = linea.get('precio_unitario')
+        if precio_unitario is None:
+            precio_unitario = producto['precio_venta']
+        if precio_unitario is None:
+            errores.append({'indice': indice, 'inventario': linea['inventario'], 'error': 'El producto no tiene precio de venta'})
+            continue
+        subtotal = precio_unitario * linea['cantidad']
+        descuento_item = linea.get('descuento_item') or 0
+        if descuento_item > subtotal:
+            # El serializer solo lo valida cuando el precio viene en la línea
+            errores.append({'indice': indice, 'inventario': linea['inventario'], 'error': 'El descuento no puede superar el subtotal de la línea'})
+            continue
+        detalles.append(DetalleVenta(
+            inventario_id=linea['inventario'],
+            cantidad=linea['cantidad'],
+            precio_unitario=precio_unitario,
+            subtotal=subtotal,
+            descuento_item=descuento_item,
+            total_item=subtotal - descuento_item,
+            notas_item=linea.get('notas_item'),
+        ))
+    if errores:
+        raise VentaRechazada('Hay líneas inválidas en la venta', errores)
+
+    subtotal = sum(detalle.total_item for detalle in detalles)
+    descuento = datos.get('descuento') or 0
+    if descuento > subtotal:
+        raise VentaRechazada('El descuento no puede superar el subtotal de la venta')
+    impuesto = datos.get('impuesto') or 0
+    numero_venta = datos.get('numero_venta') or generar_numero_venta()
+
+    with transaction.atomic():
+        resultados, aplicado = registrar_movimientos(
+            [
+                {
+                    'inventario_id': detalle.inventario_id,
+                    'tipo_movimiento': 'venta',
+                    'cantidad': detalle.cantidad,
+                    'motivo': 'Venta',
+                    'documento_referencia': numero_venta,
+                }
+                for detalle in detalles
+            ],
+            empleado_id=empleado_id,
+            todo_o_nada=True,
+        )
+        if not aplicado:
+            # La excepción revierte los movimientos ya aplicados al salir de atomic()
+            raise VentaRechazada(
+                'Stock insuficiente para completar la venta',
+                [
+                    {'indice': indice, 'inventario': resultado['inventario_id'], 'error': resultado['error']}
+                    for indice, resultado in enumerate(resultados) if not resultado['ok']
+                ],
+            )
+
+        venta = Venta.objects.create(
+            numero_venta=numero_venta,
+            empleado_id=empleado_id,
+            fecha_venta=datos.get('fecha_venta') or timezone.now(),
+            subtotal=subtotal,
+            descuento=descuento,
+            impuesto=impuesto,
+            total=subtotal - descuento + impuesto,
+            metodo_pago=datos['metodo_pago'],
+            tipo_venta=datos.get('tipo_venta') or Venta.TipoVenta.LOCAL,
+            mesa_numero=datos.get('mesa_numero'),
+            notas=datos.get('notas'),
+        )
+        for detalle in detalles:
+            detalle.venta = venta
+        DetalleVenta.objects.bulk_create(detalles)
+
+        # El resumen diario solo se toca si la venta se confirma; un fallo al acumular no
+        # revierte la venta (robust=True) y se corrige con reconstruir_ventas_diarias
+        transaction.on_commit(
+            lambda: acumular_venta_diaria(venta.fecha_venta, venta.metodo_pago, detalles),
+            robust=True,
+        )
+
+    return venta
+
+
+def acumular_venta_diaria(fecha_venta, metodo_pago, detalles):
+    """
+    Sumar una venta confirmada a ventas_diarias. Todas las filas afectadas comparten fecha y
+    método de pago, así que bastan dos consultas sin importar la cantidad de líneas:
+      1. INSERT ... ON DUPLICATE KEY UPDATE (bulk_create con update_conflicts) de las filas, en
+         cero si faltan, en orden de producto: toma directamente el bloqueo exclusivo de cada fila
+      2. UPDATE con CASE + F() que suma unidades, monto y una venta a cada producto
+    Los incrementos son atómicos en la base de datos y dos cajas que venden los mismos productos
+    se serializan en 1. No se usa INSERT IGNORE: sobre una fila existente toma un bloqueo
+    compartido, y dos cajas que luego lo escalan en el UPDATE se bloquean mutuamente (deadlock);
+    como esta función corre en on_commit, esa venta quedaría fuera del resumen.
+    """
+    fecha = timezone.localdate(fecha_venta) if timezone.is_aware(fecha_venta) else fecha_venta.date()
+    unidades = defaultdict(int)
+    montos = defaultdict(int)
+    for detalle in detalles:
+        unidades[detalle.inventario_id] += detalle.cantidad
+        montos[detalle.inventario_id] += detalle.total_item
+    if not unidades:
+        return
+
+    with transaction.atomic():
+        VentaDiaria.objects.bulk_create(
+            [VentaDiaria(fecha=fecha, inventario_id=pk, metodo_pago=metodo_pago) for pk in sorted(unidades)],
+            update_conflicts=True,
+            unique_fields=['fecha', 'inventario', 'metodo_pago'],
+            update_fields=['fecha_actualizacion'],
+        )
+        VentaDiaria.objects.filter(
+            fecha=fecha, metodo_pago=metodo_pago, inventario_id__in=list(unidades)
+        ).update(
+            cantidad_ventas=F('cantidad_ventas') + 1,
+            unidades_vendidas=F('unidades_vendidas') + Case(
+                *[When(inventario_id=pk, then=Value(cantidad)) for pk, cantidad in unidades.items()],
+                default=Value(0), output_field=IntegerField(),
+            ),
+            monto_total=F('monto_total') + Case(
+                *[When(inventario_id=pk, then=Value(monto)) for pk, monto in montos.items()],
+                default=Value(0), output_field=IntegerField(),
+            ),
+            fecha_actualizacion=timezone.now(),
+        )
+
+
+def reconstruir_ventas_diarias(desde=None, hasta=None):
+    """
+    Recalcular ventas_diarias desde detalle_ventas para el rango de fechas indicado
+    (ambos extremos inclusive; sin rango se reconstruye todo). Borra el rango y lo vuelve
+    a insertar con un solo GROUP BY leído con iterator(), en lotes de TAMANO_LOTE_RESUMEN.
+    Las ventas confirmadas mientras corre pueden quedar contadas dos veces o ninguna, así
+    que para el día en curso conviene ejecutarlo fuera del horario de atención.
+    Retorna la cantidad de filas insertadas.
+    """
+    resumen = VentaDiaria.objects.all()
+    detalles = DetalleVenta.objects.filter(venta__estado=Venta.Estado.COMPLETADA)
+    if desde:
+        resumen = resumen.filter(fecha__gte=desde)
+        detalles = detalles.filter(venta__fecha_venta__date__gte=desde)
+    if hasta:
+        resumen = resumen.filter(fecha__lte=hasta)
+        detalles = detalles.filter(venta__fecha_venta__date__lte=hasta)
+
+    agregados = (
+        detalles
+        .annotate(dia=TruncDate('venta__fecha_venta'))
+        .values('dia', 'inventario_id', 'venta__metodo_pago')
+        .annotate(
+            ventas=Count('venta_id', distinct=True),
+            unidades=Sum('cantidad'),
+            monto=Sum('total_item'),
+        )
+        .order_by()
+    )
+
+    insertadas = 0
+    with transaction.atomic():
+        resumen.delete()
+        lote = []
+        for fila in agregados.iterator(chunk_size=TAMANO_LOTE_RESUMEN):
+            lote.append(VentaDiaria(
+                fecha=fila['dia'],
+                inventario_id=fila['inventario_id'],
+                metodo_pago=fila['venta__metodo_pago'],
+                cantidad_ventas=fila['ventas'],
+                unidades_vendidas=fila['unidades'],
+                monto_total=fila['monto'],
+            ))
+            if len(lote) >= TAMANO_LOTE_RESUMEN:
+                VentaDiaria.objects.bulk_create(lote)
+                insertadas += len(lote)
+                lote = []
+        if lote:
+            VentaDiaria.objects.bulk_create(lote)
+            insertadas += len(lote)
+    return insertadas
@@ -0,0 +1,176 @@
+from datetime import date
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from empleado.models import Empleado
+from inventario.models import Inventario, MovimientosInventario
+from .models import Venta, VentaDiaria
+from .services import reconstruir_ventas_diarias
+
+
+class VentaCreateTest(APITestCase):
+    """Pruebas para el registro de ventas con descuento de stock"""
+
+    def setUp(self):
+        self.empleado = Empleado.objects.create(
+            rut='22222222-2',
+            nombre='Test',
+            apellido_paterno='Ventas',
+            cargo='Cajero',
+            fecha_contratacion=date.today()
+        )
+        self.cafe = Inventario.objects.create(
+            codigo_producto='VTA-001',
+            nombre_producto='Café americano',
+            categoria=Inventario.Categoria.CAFE,
+            unidad_medida=Inventario.UnidadMedida.UNIDAD,
+            cantidad_actual=10,
+            cantidad_minima=2,
+            precio_venta=2500
+        )
+        self.leche = Inventario.objects.create(
+            codigo_producto='VTA-002',
+            nombre_producto='Leche',
+            categoria=Inventario.Categoria.ALIMENTOS,
+            unidad_medida=Inventario.UnidadMedida.UNIDAD,
+            cantidad_actual=3,
+            cantidad_minima=1,
+            precio_venta=1000
+        )
+        self.url = reverse('venta-list')
+
+    def test_sale_decrements_stock_and_writes_movements(self):
+        response = self.client.post(self.url, {
+            'numero_venta': 'V-TEST-1',
+            'empleado': self.empleado.pk,
+            'metodo_pago': 'efectivo',
+            'detalles': [
+                {'inventario': self.cafe.pk, 'cantidad': 2},
+                {'inventario': self.leche.pk, 'cantidad': 1, 'precio_unitario': 800},
+            ],
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(response.data['total'], 2 * 2500 + 800)
+        self.assertEqual(len(response.data['detalles']), 2)
+
+        self.cafe.refresh_from_db()
+        self.leche.refresh_from_db()
+        self.assertEqual(self.cafe.cantidad_actual, 8)
+        self.assertEqual(self.leche.cantidad_actual, 2)
+        self.assertEqual(
+            sorted(MovimientosInventario.objects.filter(documento_referencia='V-TEST-1').values_list(
+                'inventario_id', 'tipo_movimiento', 'cantidad'
+            )),
+            sorted([(self.cafe.pk, 'venta', 2), (self.leche.pk, 'venta', 1)])
+        )
+
+    def test_insufficient_stock_rolls_back_whole_sale(self):
+        response = self.client.post(self.url, {
+            'numero_venta': 'V-TEST-2',
+            'metodo_pago': 'tarjeta_debito',
+            'detalles': [
+                {'inventario': self.cafe.pk, 'cantidad': 1},
+                {'inventario': self.leche.pk, 'cantidad': 5},
+            ],
+        }, format='json', HTTP_X_EMPLEADO_RUT=self.empleado.rut)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['detalles'][0]['inventario'], self.leche.pk)
+        self.assertFalse(Venta.objects.filter(numero_venta='V-TEST-2').exists())
+        self.cafe.refresh_from_db()
+        self.assertEqual(self.cafe.cantidad_actual, 10)
+        self.assertFalse(MovimientosInventario.objects.exists())
+
+
+    def test_discounts_cannot_exceed_subtotal(self):
+        # Precio tomado del producto: 1 x 2500
+        response = self.client.post(self.url, {
+            'empleado': self.empleado.pk,
+            'metodo_pago': 'efectivo',
+            'detalles': [{'inventario': self.cafe.pk, 'cantidad': 1, 'descuento_item': 3000}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['detalles'][0]['inventario'], self.cafe.pk)
+
+        response = self.client.post(self.url, {
+            'empleado': self.empleado.pk,
+            'metodo_pago': 'efectivo',
+            'descuento': 2600,
+            'detalles': [{'inventario': self.cafe.pk, 'cantidad': 1}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Venta.objects.exists())
+        self.cafe.refresh_from_db()
+        self.assertEqual(self.cafe.cantidad_actual, 10)
+
+
+class VentaDiariaTest(APITestCase):
+    """El resumen ventas_diarias se acumula al confirmar cada venta y coincide con la reconstrucción"""
+
+    def setUp(self):
+        self.empleado = Empleado.objects.create(
+            rut='33333333-3',
+            nombre='Test',
+            apellido_paterno='Resumen',
+            cargo='Cajero',
+            fecha_contratacion=date.today()
+        )
+        self.productos = [
+            Inventario.objects.create(
+                codigo_producto=f'VD-{i}',
+                nombre_producto=f'Producto {i}',
+                categoria=Inventario.Categoria.CAFE,
+                unidad_medida=Inventario.UnidadMedida.UNIDAD,
+                cantidad_actual=100,
+                cantidad_minima=1,
+                precio_venta=1000 * (i + 1)
+            )
+            for i in range(2)
+        ]
+
+    def vender(self, metodo_pago, *lineas):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('venta-list'), {
+                'empleado': self.empleado.pk,
+                'metodo_pago': metodo_pago,
+                'detalles': [{'inventario': producto.pk, 'cantidad': cantidad} for producto, cantidad in lineas],
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+
+    def resumen(self):
+        return sorted(VentaDiaria.objects.values_list(
+            'fecha', 'inventario_id', 'metodo_pago', 'cantidad_ventas', 'unidades_vendidas', 'monto_total'
+        ))
+
+    def test_rollup_is_incremental_and_matches_rebuild(self):
+        cafe, torta = self.productos
+        self.vender('efectivo', (cafe, 2), (torta, 1))
+        self.vender('efectivo', (cafe, 1), (cafe, 1))
+        self.vender('tarjeta_debito', (torta, 3))
+
+        hoy = timezone.localdate()
+        incremental = self.resumen()
+        self.assertEqual(incremental, sorted([
+            (hoy, cafe.pk, 'efectivo', 2, 4, 4000),
+            (hoy, torta.pk, 'efectivo', 1, 1, 2000),
+            (hoy, torta.pk, 'tarjeta_debito', 1, 3, 6000),
+        ]))
+
+        reconstruir_ventas_diarias()
+        self.assertEqual(self.resumen(), incremental)
+
+        response = self.client.get(reverse('venta-reporte-resumen'), {'agrupar': 'mes'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['unidades_vendidas'], 8)
+        self.assertEqual(response.data['monto_total'], 12000)
+
+        response = self.client.get(reverse('venta-reporte-productos'), {'top': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['productos'][0]['inventario_id'], torta.pk)
+        self.assertEqual(response.data['productos'][0]['unidades'], 4)
+
+    def test_report_rejects_invalid_range(self):
+        response = self.client.get(reverse('venta-reporte-resumen'), {'desde': '2025-02-01', 'hasta': '2025-01-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
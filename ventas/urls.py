@@ -0,0 +1,17 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import VentaViewSet
+
+# Crear router para el ViewSet
+router = DefaultRouter()
+router.register(r'ventas', VentaViewSet, basename='venta')
+
+urlpatterns = [
+    # Incluir todas las rutas del router
+    path('', include(router.urls)),
+]
+
+# Las rutas disponibles serán:
+# GET    /api/ventas/       - Listar ventas
+# POST   /api/ventas/       - Registrar venta (descuenta stock y registra movimientos)
+# GET    /api/ventas/{id}/  - Obtener venta con sus líneas
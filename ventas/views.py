@@ -0,0 +1,201 @@
+from datetime import date
+from rest_framework import mixins, viewsets, status, filters
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from django_filters.rest_framework import DjangoFilterBackend
+from django.db import IntegrityError
+from django.db.models import F, Prefetch, Sum
+from django.db.models.functions import TruncMonth, TruncYear
+from django.utils import timezone
+from empleado.models import Empleado
+from empleado.services import resolver_empleado_por_rut
+from .models import Venta, DetalleVenta, VentaDiaria
+from .serializer import VentaSerializer, VentaCreateSerializer
+from .services import VentaRechazada, registrar_venta
+
+
+AGRUPACIONES_REPORTE = {
+    'dia': None,
+    'mes': TruncMonth,
+    'anio': TruncYear,
+}
+MAX_TOP_PRODUCTOS = 100
+
+
+def rango_fechas_reporte(request):
+    """
+    Leer ?desde y ?hasta (YYYY-MM-DD, inclusive). Por defecto, el mes en curso.
+    Retorna (desde, hasta, error); error es un mensaje si los parámetros son inválidos.
+    """
+    hoy = timezone.localdate()
+    try:
+        desde = date.fromisoformat(request.query_params.get('desde') or hoy.replace(day=1).isoformat())
+        hasta = date.fromisoformat(request.query_params.get('hasta') or hoy.isoformat())
+    except ValueError:
+        return None, None, 'desde y hasta deben tener formato YYYY-MM-DD'
+    if desde > hasta:
+        return None, None, 'desde no puede ser posterior a hasta'
+    return desde, hasta, None
+
+
+class VentaViewSet(mixins.CreateModelMixin,
+                   mixins.ListModelMixin,
+                   mixins.RetrieveModelMixin,
+                   viewsets.GenericViewSet):
+    """
+    ViewSet para registrar y consultar ventas.
+    Las ventas no se editan ni se eliminan desde la API.
+    """
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_fields = ['estado', 'metodo_pago', 'tipo_venta', 'empleado']
+    search_fields = ['numero_venta']
+    ordering_fields = ['fecha_venta', 'total']
+    ordering = ['-fecha_venta']
+    cursor_ordering = ('-fecha_venta', '-id')
+
+    def get_queryset(self):
+        return Venta.objects.prefetch_related(
+            Prefetch('detalles', queryset=DetalleVenta.objects.select_related('inventario'))
+        )
+
+    def get_serializer_class(self):
+        if self.action == 'create':
+            return VentaCreateSerializer
+        return VentaSerializer
+
+    def create(self, request, *args, **kwargs):
+        """
+        Registrar una venta: guarda la venta y sus líneas, descuenta el stock con F() y
+        escribe los movimientos 'venta' en una sola transacción.
+        El vendedor se toma del campo empleado o del header X-Empleado-Rut.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        datos = serializer.validated_data
+
+        empleado_id = datos.get('empleado')
+        if empleado_id is not None:
+            if not Empleado.objects.filter(pk=empleado_id, activo=True).exists():
+                return Response(
+                    {'error': {'empleado': ['Empleado no encontrado o inactivo']}},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        else:
+            referencia = resolver_empleado_por_rut(request.headers.get('X-Empleado-Rut'))
+            if referencia is None:
+                return Response(
+                    {'error': 'Se requiere el empleado que realiza la venta (campo empleado o header X-Empleado-Rut)'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            empleado_id = referencia.id
+
+        try:
+            venta = registrar_venta(datos, empleado_id)
+        except VentaRechazada as e:
+            return Response(
+                {'error': str(e), 'detalles': e.errores},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except IntegrityError as e:
+            # El serializer ya valida el número; aquí solo llega si otra caja lo usó al mismo tiempo
+            if datos.get('numero_venta') and Venta.objects.filter(numero_venta=datos['numero_venta']).exists():
+                return Response(
+                    {'error': {'numero_venta': ['Ya existe una venta con este número.']}},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            print("Error de integridad al registrar la venta:", str(e))
+            return Response(
+                {'error': 'No se pudo registrar la venta: los datos no son consistentes con la base de datos'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        venta = self.get_queryset().get(pk=venta.pk)
+        return Response(VentaSerializer(venta).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'], url_path='reportes/resumen')
+    def reporte_resumen(self, request):
+        """
+        Totales de ventas completadas en un rango, leídos desde ventas_diarias.
+        El costo depende de los días del rango y no de la cantidad de líneas vendidas.
+        Parámetros: ?desde, ?hasta (YYYY-MM-DD) y ?agrupar=dia|mes|anio (por defecto dia).
+        Los montos son la suma de total_item (sin descuentos ni impuestos a nivel de venta).
+        """
+        desde, hasta, error = rango_fechas_reporte(request)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+        agrupar = request.query_params.get('agrupar', 'dia')
+        if agrupar not in AGRUPACIONES_REPORTE:
+            return Response(
+                {'error': f"agrupar inválido. Opciones: {', '.join(AGRUPACIONES_REPORTE)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        resumen = VentaDiaria.objects.filter(fecha__range=(desde, hasta))
+        truncar = AGRUPACIONES_REPORTE[agrupar]
+        periodo = truncar('fecha') if truncar else F('fecha')
+        serie = (
+            resumen
+            .annotate(periodo=periodo)
+            .values('periodo')
+            .annotate(unidades=Sum('unidades_vendidas'), monto=Sum('monto_total'))
+            .order_by('periodo')
+        )
+        por_metodo_pago = (
+            resumen
+            .values('metodo_pago')
+            .annotate(unidades=Sum('unidades_vendidas'), monto=Sum('monto_total'))
+            .order_by('-monto')
+        )
+        
+        serie = list(serie)
+        return Response({
+            'desde': desde,
+            'hasta': hasta,
+            'agrupar': agrupar,
+            'unidades_vendidas': sum(fila['unidades'] for fila in serie),
+            'monto_total': sum(fila['monto'] for fila in serie),
+            'serie': serie,
+            'por_metodo_pago': list(por_metodo_pago),
+        })
+
+    @action(detail=False, methods=['get'], url_path='reportes/productos')
+    def reporte_productos(self, request):
+        """
+        Productos más vendidos en un rango, leídos desde ventas_diarias.
+        Parámetros: ?desde, ?hasta (YYYY-MM-DD), ?metodo_pago y ?top=N (por defecto 20).
+        """
+        desde, hasta, error = rango_fechas_reporte(request)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            top = int(request.query_params.get('top', 20))
+            if top < 1:
+                raise ValueError
+        except ValueError:
+            return Response(
+                {'error': 'top debe ser un entero positivo'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        resumen = VentaDiaria.objects.filter(fecha__range=(desde, hasta))
+        metodo_pago = request.query_params.get('metodo_pago')
+        if metodo_pago:
+            resumen = resumen.filter(metodo_pago=metodo_pago)
+        productos = (
+            resumen
+            .values('inventario_id')
+            .annotate(
+                codigo_producto=F('inventario__codigo_producto'),
+                nombre_producto=F('inventario__nombre_producto'),
+                cantidad_ventas=Sum('cantidad_ventas'),
+                unidades=Sum('unidades_vendidas'),
+                monto=Sum('monto_total'),
+            )
+            .order_by('-monto', 'inventario_id')[:min(top, MAX_TOP_PRODUCTOS)]
+        )
+        
+        return Response({
+            'desde': desde,
+            'hasta': hasta,
+            'productos': list(productos),
+        })